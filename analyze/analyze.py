@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+MapReduce slowstart 实验分析的统一入口
+
+    python analyze/analyze.py scan        扫描并解析所有运行（同时刷新解析缓存）
+    python analyze/analyze.py summarize   只解析阶段数据，打印各数据集 x slowstart 的平均结果
+    python analyze/analyze.py plot        一次平均，同时生成 CPU 和内存趋势图
+    python analyze/analyze.py plot-cpu    只生成平均 CPU 趋势图
+    python analyze/analyze.py plot-mem    只生成平均内存趋势图
+    python analyze/analyze.py export      导出 result_raw.csv 和 result_*.csv；
+                                          --columnar parquet|arrow 另外导出列式表（需要 pyarrow）
+    python analyze/analyze.py skew        逐节点负载不均衡与落后节点分析，导出 result_node_skew.csv 等
+    python analyze/analyze.py resource    按作业阶段积分 CPU 核·秒与内存 GB·秒，导出 result_resource.csv 等
+    python analyze/analyze.py timeline    单次运行的逐采样时间线：每个 CPU / MEM 采样附上当时的 map% / reduce%
+    python analyze/analyze.py concurrency 单次运行的任务并发曲线：由 .jhist 计算每秒运行中的 Map / Reduce 数
+    python analyze/analyze.py follow      跟踪正在进行的运行，实时输出进度和 CPU / 内存
+    python analyze/analyze.py ingest      把新增的运行收录到 SQLite 索引
+    python analyze/analyze.py query       按数据集 / slowstart / 时间查询索引，例如
+                                          query --dataset 5G --min-slowstart 0.8 --days 7
+    python analyze/analyze.py recommend   按索引中的运行拟合模型，为新的输入大小推荐 slowstart，
+                                          例如 recommend 2G 20G
+
+各子命令只导入自己需要的模块：summarize 不加载 pandas，
+matplotlib / seaborn / scipy 只在 plot* 真正绘图时才加载
+
+全局选项 --profile trace.json|trace.csv 记录各阶段（扫描、逐次解析、平均、平滑、渲染、导出）
+的墙钟 / CPU 时间、行数、进程峰值 RSS 及阶段内的峰值增长；--cprofile out.prof 另存 cProfile 统计，例如
+    python analyze/analyze.py --profile trace.csv --cprofile export.prof export
+也可以用环境变量开启：MR_PROFILE=1 只打印各阶段汇总，MR_PROFILE=trace.json 同时写出该文件
+"""
+import os
+import sys
+import argparse
+
+
+def scan_options(args):
+    """子命令共用的 scan_multiple_runs 参数"""
+    return {
+        'workers': args.workers,
+        'executor': args.executor,
+        'use_cache': not args.no_cache,
+        'chunked': args.chunked,
+    }
+
+
+def cmd_scan(args):
+    from common_utils import scan_multiple_runs
+
+    scan_multiple_runs(args.base_dir, **scan_options(args))
+
+
+def cmd_summarize(args):
+    from common_utils import scan_multiple_runs, average_stage_data, sort_dataset_key
+    from export_results import RESULT_METRICS, BYTES_PER_MB
+
+    _, stage_data = scan_multiple_runs(args.base_dir, monitor=False, **scan_options(args))
+    if not any(ss_dict for ss_dict in stage_data.values()):
+        print("未找到实验数据")
+        return 1
+
+    print("\n计算平均值...")
+    averaged_stages = average_stage_data(stage_data)
+
+    # Avg_CPU 需要 monitor 数据，summarize 不输出
+    metrics = [(column, key) for column, key, _, _ in RESULT_METRICS
+               if key is not None
+               and any(key in stage for ss_dict in averaged_stages.values()
+                       for stage in ss_dict.values())]
+
+    for dataset in sorted(averaged_stages, key=sort_dataset_key):
+        ss_dict = averaged_stages[dataset]
+        if not ss_dict:
+            continue
+
+        print("\n" + "=" * 60)
+        print(f"数据集: {dataset}")
+        for slowstart in sorted(ss_dict):
+            stage = ss_dict[slowstart]
+            print(f"  SlowStart {slowstart}:")
+            for column, key in metrics:
+                if key not in stage:
+                    continue
+                value = stage[key] / BYTES_PER_MB if key.endswith('(B)') else stage[key]
+                print(f"    {column:<20} {value:>12.2f}")
+    return 0
+
+
+def cmd_plot(args):
+    from common_utils import scan_multiple_runs, average_monitor_metrics
+    from plot_engine import render_charts
+
+    monitor_data, _ = scan_multiple_runs(args.base_dir, packed=not args.chunked,
+                                         **scan_options(args))
+    if not len(monitor_data):
+        print("未找到 monitor 数据")
+        return 1
+
+    print("\n计算 Monitor 数据平均值（CPU / 内存）...")
+    averaged = average_monitor_metrics(monitor_data, ['CPU', 'MEM'])
+
+    print("\n生成平均趋势图...")
+    saved = render_charts(averaged, ['CPU', 'MEM'], args.jobs, args.force)
+    print(f"\n图表生成完成！CPU {len(saved['CPU'])} 张，内存 {len(saved['MEM'])} 张")
+    return 0
+
+
+def cmd_plot_cpu(args):
+    import analyze_cpu_slowstart
+
+    analyze_cpu_slowstart.main(args.base_dir, args.jobs, args.force, **scan_options(args))
+
+
+def cmd_plot_mem(args):
+    import analyze_mem_slowstart
+
+    analyze_mem_slowstart.main(args.base_dir, args.jobs, args.force, **scan_options(args))
+
+
+def cmd_export(args):
+    import export_results
+
+    if args.columnar:
+        try:
+            export_results.import_pyarrow()
+        except ImportError as e:
+            print(e)
+            return 1
+    export_results.main(args.base_dir, args.output_dir, args.columnar, not args.no_csv,
+                        **scan_options(args))
+    return 0
+
+
+def cmd_skew(args):
+    import node_skew
+
+    if args.chunked:
+        print("chunked 模式只保留按时间步的统计，没有逐节点数据，skew 不支持 --chunked")
+        return 1
+    node_skew.main(args.base_dir, args.output_dir, args.workers, args.executor, not args.no_cache)
+    return 0
+
+
+def cmd_resource(args):
+    import resource_usage
+
+    if args.chunked:
+        print("chunked 模式只保留按时间步的统计，没有逐节点数据，resource 不支持 --chunked")
+        return 1
+    resource_usage.main(args.base_dir, args.output_dir, args.workers, args.executor, not args.no_cache,
+                        args.cores, args.memory_gb)
+    return 0
+
+
+def run_output_path(output_dir, prefix, run_path):
+    """
+    单次运行的派生结果写到 output_dir 而不是运行目录：运行目录里多出的文件会改变
+    run_cache.run_signature，使解析缓存失效并让 ingest 把运行记为已变化
+    文件名形如 <prefix>_<数据集目录>_<运行目录>.csv
+    """
+    run_path = os.path.normpath(run_path)
+    group = os.path.basename(os.path.dirname(run_path)).strip('_')
+    return os.path.join(output_dir, f"{prefix}_{group}_{os.path.basename(run_path)}.csv")
+
+
+def cmd_timeline(args):
+    from common_utils import (find_latest_run, parse_run, parse_job_progress,
+                              align_monitor_with_progress)
+
+    run_path = args.run or find_latest_run(args.base_dir)
+    if run_path is None:
+        print(f"{args.base_dir} 下没有运行")
+        return 1
+    df, _ = parse_run(run_path)
+    if df is None or df.empty:
+        print(f"{run_path} 没有 monitor 数据")
+        return 1
+
+    aligned = align_monitor_with_progress(df, parse_job_progress(os.path.join(run_path, 'job_output.log')))
+    columns = ['Timestamp', 'Elapsed', 'Time_Step', 'Node', 'CPU', 'MEM', 'Map_Pct', 'Reduce_Pct']
+    output = args.output or run_output_path(args.output_dir, 'timeline', run_path)
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    aligned[columns].to_csv(output, index=False, float_format='%.2f')
+    print(f"  已保存: {output}（{len(aligned)} 个采样）")
+    return 0
+
+
+def cmd_concurrency(args):
+    from common_utils import find_latest_run
+    from jhist_parser import run_task_concurrency
+
+    run_path = args.run or find_latest_run(args.base_dir)
+    if run_path is None:
+        print(f"{args.base_dir} 下没有运行")
+        return 1
+    curves = run_task_concurrency(run_path, int(args.step * 1000))
+    if curves is None:
+        print(f"{run_path} 下没有 .jhist 文件")
+        return 1
+    if curves.empty:
+        print(f"{run_path} 的 .jhist 中没有完整的 task attempt")
+        return 1
+
+    output = args.output or run_output_path(args.output_dir, 'task_concurrency', run_path)
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    curves.to_csv(output, index=False, float_format='%.2f')
+    print(f"  已保存: {output}")
+    overlap = ((curves['Running_MAP'] > 0) & (curves['Running_REDUCE'] > 0)).sum() * args.step
+    print(f"  最大并发: Map {curves['Running_MAP'].max()}  Reduce {curves['Running_REDUCE'].max()}  "
+          f"Map 与 Reduce 同时运行约 {overlap:g}s")
+    return 0
+
+
+def cmd_follow(args):
+    from common_utils import find_latest_run, follow_run
+
+    run_path = args.run or find_latest_run(args.base_dir)
+    if run_path is None:
+        print(f"{args.base_dir} 下没有可跟踪的运行")
+        return 1
+    follow_run(run_path, args.interval, args.window, args.max_updates)
+    return 0
+
+
+def cmd_ingest(args):
+    from run_catalog import ingest_runs
+
+    ingest_runs(args.base_dir, args.catalog, args.refresh, **scan_options(args))
+
+
+def cmd_query(args):
+    import datetime
+    from run_catalog import default_catalog_path, query_runs
+
+    catalog_path = args.catalog or default_catalog_path(args.base_dir)
+    if not os.path.exists(catalog_path):
+        print(f"找不到索引 {catalog_path}，请先运行 ingest")
+        return 1
+
+    since = args.since
+    if args.days is not None:
+        since = (datetime.datetime.now() - datetime.timedelta(days=args.days)).isoformat(sep=' ')
+    rows = query_runs(catalog_path, args.dataset, args.min_slowstart, args.max_slowstart,
+                      since, args.until, args.metric, args.limit)
+
+    columns = ['dataset', 'slowstart', 'run_time', 'total_time', 'map_time',
+               'shuffle_time', 'reduce_time', 'overlap_ratio', 'cpu_mean', 'mem_mean']
+    columns += args.metric or []
+    print('\t'.join(columns + ['run_path']))
+    for row in rows:
+        values = [row[c] for c in columns]
+        print('\t'.join('' if v is None else f'{v:.2f}' if isinstance(v, float) else str(v)
+                        for v in values + [row['run_path']]))
+    print(f"共 {len(rows)} 次运行")
+    return 0
+
+
+def cmd_recommend(args):
+    import time
+    from run_catalog import default_catalog_path, ingest_runs
+    from recommend import (load_training_rows, fit_model, recommend, parse_size,
+                           cross_validate, in_sample_check, check_recommendation, observed_best)
+
+    catalog_path = args.catalog or default_catalog_path(args.base_dir)
+    if not os.path.exists(catalog_path):
+        print(f"找不到索引 {catalog_path}，先收录已有运行...")
+        ingest_runs(args.base_dir, catalog_path)
+
+    start = time.perf_counter()
+    samples = load_training_rows(catalog_path)
+    if len({s['dataset'] for s in samples}) < 2:
+        print("索引中的数据集少于 2 个，无法拟合推荐模型")
+        return 1
+    model = fit_model(samples, args.ridge)
+    print(f"模型: {model['n_samples']} 次运行，数据集 {', '.join(model['datasets'])}，"
+          f"log 耗时残差 RMSE {model['rmse_log']:.3f}（{(time.perf_counter() - start) * 1000:.1f} ms）")
+
+    if args.validate:
+        print("\n样本内检验（全部运行拟合后预测各数据集）:")
+        for dataset, chosen, actual, error in in_sample_check(samples, args.ridge, args.step):
+            mark = '' if abs(chosen - actual) < 1e-9 else '  ← 与实测不符'
+            print(f"  {dataset:>6}: 推荐 {chosen:.2f}，实测最优 {actual:.2f}，耗时平均误差 {error:.1f}%{mark}")
+
+        print("\n留一个数据集验证:")
+        results = cross_validate(samples, args.ridge, args.step)
+        if not results:
+            print("  数据集少于 3 个，无法验证")
+        for dataset, chosen, actual, error in results:
+            print(f"  {dataset:>6}: 推荐 {chosen:.2f}，实测最优 {actual:.2f}，耗时平均误差 {error:.1f}%")
+
+    known = {'map_tasks': args.map_tasks, 'reduce_tasks': args.reduce_tasks,
+             'shuffle_bytes': parse_size(args.shuffle_bytes) if args.shuffle_bytes else None,
+             'cpu_mean': args.cpu}
+    for size in args.sizes:
+        start = time.perf_counter()
+        best, best_time, grid, times = recommend(model, parse_size(size), args.step, **known)
+        elapsed = (time.perf_counter() - start) * 1000
+        warnings = check_recommendation(model, parse_size(size), times)
+        observed = observed_best(model, parse_size(size))
+
+        print(f"\n输入 {size}: 模型推荐 slowstart = {best:.2f}，预测总耗时 {best_time:.1f} s（{elapsed:.2f} ms）")
+        for warning in warnings:
+            print(f"  警告: {warning}")
+        if observed is not None and abs(observed[1] - best) > 1e-9:
+            dataset, best, best_time = observed
+            print(f"  与数据集 {dataset} 的实测结果不符，改用实测最优: slowstart = {best:.2f}，"
+                  f"平均总耗时 {best_time:.1f} s")
+        elif observed is None and warnings:
+            print("  没有同等规模的实测数据可参考，以上推荐仅供参考")
+        for ss, t in zip(grid, times):
+            marker = '  <-' if abs(ss - best) < 1e-9 else ''
+            print(f"    SlowStart {ss:.2f}: {t:10.1f} s{marker}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="MapReduce slowstart 实验分析")
+    parser.add_argument('--profile', default=None, metavar='TRACE',
+                        help="记录各阶段耗时和资源，写出到 TRACE（.json 或 .csv）")
+    parser.add_argument('--cprofile', default=None, metavar='PROF',
+                        help="用 cProfile 分析整个命令，统计写出到 PROF（可用 pstats / snakeviz 查看）")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--base-dir', default='./MapReduceLog', help="实验日志根目录")
+    common.add_argument('--workers', type=int, default=None, help="并发解析的进程 / 线程数")
+    common.add_argument('--executor', choices=['process', 'thread'], default='process',
+                        help="并发解析方式")
+    common.add_argument('--no-cache', action='store_true', help="不读写解析缓存")
+    common.add_argument('--chunked', action='store_true',
+                        help="分块统计 monitor.log（日志超过内存时使用），内存只与时间步数有关")
+
+    sub = parser.add_subparsers(dest='command', metavar='command')
+    sub.required = True
+
+    commands = [
+        ('scan', cmd_scan, "扫描并解析所有运行"),
+        ('summarize', cmd_summarize, "打印平均阶段耗时等结果（不绘图）"),
+        ('plot', cmd_plot, "生成平均 CPU 和内存趋势图"),
+        ('plot-cpu', cmd_plot_cpu, "只生成平均 CPU 趋势图"),
+        ('plot-mem', cmd_plot_mem, "只生成平均内存趋势图"),
+        ('export', cmd_export, "导出结果 CSV"),
+        ('skew', cmd_skew, "逐节点负载不均衡与落后节点分析"),
+        ('resource', cmd_resource, "按作业阶段的 CPU 核·秒与内存 GB·秒"),
+    ]
+    for name, func, help_text in commands:
+        p = sub.add_parser(name, parents=[common], help=help_text, description=help_text)
+        p.set_defaults(func=func)
+        if name.startswith('plot'):
+            p.add_argument('--jobs', type=int, default=None, help="渲染进程数（默认 CPU 核数）")
+            p.add_argument('--force', action='store_true', help="忽略数据哈希，全部重绘")
+        if name in ('export', 'skew', 'resource'):
+            p.add_argument('--output-dir', default='Analysis_Results', help="结果 CSV 输出目录")
+        if name == 'export':
+            p.add_argument('--columnar', choices=['parquet', 'arrow'], default=None,
+                           help="另外导出 result_runs / result_summary / result_best_mean 列式表（需要 pyarrow）")
+            p.add_argument('--no-csv', action='store_true', help="不写透视表 CSV")
+        if name == 'resource':
+            p.add_argument('--cores', type=float, default=2, help="每节点核数（默认同 yarn-site.xml）")
+            p.add_argument('--memory-gb', type=float, default=8.0, help="每节点内存 GB（默认同 yarn-site.xml）")
+
+    p = sub.add_parser('timeline', help="单次运行的采样与作业进度时间线",
+                       description="把单次运行的每个 CPU / MEM 采样与当时的 map%% / reduce%% 对齐，写出 CSV")
+    p.add_argument('run', nargs='?', default=None, help="运行目录（默认为最近修改的运行）")
+    p.add_argument('--base-dir', default='./MapReduceLog', help="实验日志根目录")
+    p.add_argument('--output-dir', default='Analysis_Results', help="结果 CSV 输出目录")
+    p.add_argument('--output', default=None,
+                   help="输出 CSV（默认 <输出目录>/timeline_<数据集>_<运行>.csv）")
+    p.set_defaults(func=cmd_timeline)
+
+    p = sub.add_parser('concurrency', help="单次运行的任务并发曲线（需要 .jhist）",
+                       description="由运行目录下的 .jhist 计算每个时刻运行中的 Map / Reduce attempt 数，写出 CSV")
+    p.add_argument('run', nargs='?', default=None, help="运行目录（默认为最近修改的运行）")
+    p.add_argument('--base-dir', default='./MapReduceLog', help="实验日志根目录")
+    p.add_argument('--step', type=float, default=1.0, help="时间步长（秒）")
+    p.add_argument('--output-dir', default='Analysis_Results', help="结果 CSV 输出目录")
+    p.add_argument('--output', default=None,
+                   help="输出 CSV（默认 <输出目录>/task_concurrency_<数据集>_<运行>.csv）")
+    p.set_defaults(func=cmd_concurrency)
+
+    p = sub.add_parser('follow', help="跟踪正在进行的运行",
+                       description="跟踪正在进行的运行（默认为最近修改的运行目录）")
+    p.add_argument('run', nargs='?', default=None, help="运行目录")
+    p.add_argument('--base-dir', default='./MapReduceLog', help="实验日志根目录")
+    p.add_argument('--interval', type=float, default=5.0, help="刷新间隔（秒）")
+    p.add_argument('--window', type=int, default=30, help="滚动窗口的时间步数")
+    p.add_argument('--max-updates', type=int, default=None, help="最多刷新次数")
+    p.set_defaults(func=cmd_follow)
+
+    p = sub.add_parser('ingest', parents=[common], help="把新增的运行收录到索引",
+                       description="把新增的运行收录到 SQLite 索引（默认 <base-dir>/.catalog.sqlite）")
+    p.add_argument('--catalog', default=None, help="索引文件路径")
+    p.add_argument('--refresh', action='store_true', help="同时重新收录文件有改动的运行")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser('query', help="查询索引", description="按条件查询已收录的运行")
+    p.add_argument('--base-dir', default='./MapReduceLog', help="实验日志根目录")
+    p.add_argument('--catalog', default=None, help="索引文件路径")
+    p.add_argument('--dataset', default=None, help="数据集，如 5G / 100MB")
+    p.add_argument('--min-slowstart', type=float, default=None)
+    p.add_argument('--max-slowstart', type=float, default=None)
+    p.add_argument('--since', default=None, help="运行时间下限，如 2025-11-28")
+    p.add_argument('--until', default=None, help="运行时间上限")
+    p.add_argument('--days', type=float, default=None, help="只看最近 N 天的运行")
+    p.add_argument('--metric', action='append', default=None,
+                   help="附带输出的指标（阶段 / 计数器键名，如 GC占比(%%)），可重复")
+    p.add_argument('--limit', type=int, default=None)
+    p.set_defaults(func=cmd_query)
+
+    p = sub.add_parser('recommend', help="为新的输入大小推荐 slowstart",
+                       description="用索引中的运行拟合耗时模型，为新的输入大小推荐 slowstart")
+    p.add_argument('sizes', nargs='+', help="输入大小，如 2G / 20G / 750MB")
+    p.add_argument('--base-dir', default='./MapReduceLog', help="实验日志根目录")
+    p.add_argument('--catalog', default=None, help="索引文件路径（不存在时自动 ingest）")
+    p.add_argument('--map-tasks', type=int, default=None, help="Map 任务数（默认按输入大小估算）")
+    p.add_argument('--reduce-tasks', type=int, default=None, help="Reduce 任务数")
+    p.add_argument('--shuffle-bytes', default=None, help="Shuffle 数据量，如 2G")
+    p.add_argument('--cpu', type=float, default=None, help="集群平均 CPU 利用率 (%%)")
+    p.add_argument('--step', type=float, default=0.05, help="slowstart 搜索步长")
+    p.add_argument('--ridge', type=float, default=1e-2, help="岭回归系数")
+    p.add_argument('--validate', action='store_true', help="输出样本内检验与留一个数据集验证的结果")
+    p.set_defaults(func=cmd_recommend)
+
+    return parser
+
+
+def run_profiled(args):
+    """按 --profile / --cprofile（或环境变量 MR_PROFILE）包装子命令的执行"""
+    import profiling
+
+    trace_path = args.profile or profiling.env_trace_path()
+    if args.profile or profiling.enabled():
+        profiling.enable()
+
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        with profiling.stage(args.command):
+            return args.func(args) or 0
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+            print(f"\ncProfile 统计已保存: {args.cprofile}")
+        if profiling.enabled():
+            profiling.print_summary()
+        if trace_path:
+            n = profiling.write_trace(trace_path)
+            print(f"阶段记录已保存: {trace_path}（{n} 条）")
+
+
+def main(argv=None):
+    import profiling
+
+    args = build_parser().parse_args(argv)
+    if args.profile or args.cprofile or profiling.enabled():
+        return run_profiled(args)
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
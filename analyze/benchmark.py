@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+解析 / 平均化流水线的基准测试
+
+先用 synth_logs 生成一份确定性的合成实验目录，再逐个阶段计时：
+    parse_monitor_log / summarize_monitor_log / parse_job_stages / parse_job_counters /
+    scan（无缓存、缓存命中）/ average（嵌套字典、MonitorStore）/ average_stage_data
+每个阶段报告墙钟时间（重复 --repeat 次取最短）、吞吐（行/s 或 运行/s）和峰值内存
+（单独一遍在 tracemalloc 下测得，包含 numpy / pandas 的数组分配）。
+
+结果可保存为基线 JSON，之后的运行与基线逐阶段比较，慢于基线超过 --tolerance 时退出码为 1：
+
+    python analyze/benchmark.py --nodes 20 --duration 1800 --save-baseline
+    python analyze/benchmark.py --nodes 20 --duration 1800
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+
+from synth_logs import generate_archive, BYTES_PER_MB
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+DEFAULT_TOLERANCE = 0.2
+# 绝对差小于该值（秒）的阶段不判为退化，避免毫秒级阶段的计时抖动
+MIN_DELTA_S = 0.05
+# 生成参数都会写入结果，比较基线时参数不同只给出提示
+ARCHIVE_PARAMS = ('datasets', 'slowstarts', 'runs', 'nodes', 'duration', 'interval', 'seed')
+
+
+def _run_paths(base_dir):
+    from common_utils import discover_runs
+    return [p for _, _, paths in discover_runs(base_dir) for p in paths]
+
+
+def build_stages(base_dir, workers):
+    """
+    基准阶段列表：(名称, 计数单位, 准备函数, 被测函数)
+    准备函数不计时，返回值作为被测函数的参数
+    """
+    from common_utils import (parse_monitor_log, summarize_monitor_log, parse_job_stages,
+                              parse_job_counters, scan_multiple_runs, average_monitor_metrics,
+                              average_stage_data)
+
+    run_paths = _run_paths(base_dir)
+    monitor_logs = [os.path.join(p, 'monitor.log') for p in run_paths]
+    job_logs = [os.path.join(p, 'job_output.log') for p in run_paths]
+    cache_dir = os.path.join(base_dir, '.parse_cache')
+
+    def scan(use_cache=False, packed=False, monitor=True):
+        return scan_multiple_runs(base_dir, workers, use_cache=use_cache, cache_dir=cache_dir,
+                                  packed=packed, monitor=monitor)
+
+    def warm_cache():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        scan(use_cache=True)
+
+    return [
+        ('parse_monitor_log', 'monitor_lines', None,
+         lambda: [parse_monitor_log(p) for p in monitor_logs]),
+        ('summarize_monitor_log', 'monitor_lines', None,
+         lambda: [summarize_monitor_log(p) for p in monitor_logs]),
+        ('parse_job_stages', 'job_lines', None,
+         lambda: [parse_job_stages(p) for p in job_logs]),
+        ('parse_job_counters', 'job_lines', None,
+         lambda: [parse_job_counters(p) for p in job_logs]),
+        ('scan', 'runs', None, lambda: scan()),
+        ('scan_stages_only', 'runs', None, lambda: scan(monitor=False)),
+        ('scan_cached', 'runs', warm_cache, lambda _: scan(use_cache=True)),
+        ('average_nested', 'runs', lambda: scan()[0],
+         lambda data: average_monitor_metrics(data)),
+        ('average_store', 'runs', lambda: scan(packed=True)[0],
+         lambda data: average_monitor_metrics(data)),
+        ('average_stage_data', 'runs', lambda: scan(monitor=False)[1],
+         lambda data: average_stage_data(data)),
+    ]
+
+
+def measure(setup, func, repeat):
+    """返回 (最短墙钟时间, tracemalloc 峰值字节)；阶段内部的 print 不输出"""
+    sink = io.StringIO()
+    best = float('inf')
+    with contextlib.redirect_stdout(sink):
+        for _ in range(repeat):
+            arg = setup() if setup else None
+            start = time.perf_counter()
+            result = func(arg) if setup else func()
+            best = min(best, time.perf_counter() - start)
+            del result
+
+        arg = setup() if setup else None
+        tracemalloc.start()
+        result = func(arg) if setup else func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+    return best, peak
+
+
+def run_benchmark(params, workers=1, repeat=3, only=None, data_dir=None):
+    """
+    生成合成数据并运行各阶段，返回结果字典
+    data_dir 为 None 时使用临时目录并在结束后删除；给出时复用（不存在才生成）
+    """
+    keep = data_dir is not None
+    base_dir = data_dir or tempfile.mkdtemp(prefix='mr_bench_')
+    try:
+        stamp = os.path.join(base_dir, '.synth_stats.json')
+        if keep and os.path.exists(stamp):
+            with open(stamp, 'r', encoding='utf-8') as f:
+                archive = json.load(f)
+        else:
+            print("生成合成日志...")
+            start = time.perf_counter()
+            archive = generate_archive(base_dir, **{k: params[k] for k in ARCHIVE_PARAMS})
+            archive['generate_s'] = round(time.perf_counter() - start, 3)
+            with open(stamp, 'w', encoding='utf-8') as f:
+                json.dump(archive, f)
+        print(f"  {archive['runs']} 次运行，monitor {archive['monitor_lines']} 行，"
+              f"job {archive['job_lines']} 行，{archive['bytes'] / BYTES_PER_MB:.1f} MB")
+
+        stages = {}
+        for name, unit, setup, func in build_stages(base_dir, workers):
+            if only and name not in only:
+                continue
+            wall, peak = measure(setup, func, repeat)
+            stages[name] = {
+                'wall_s': round(wall, 4),
+                'unit': unit,
+                'throughput': round(archive[unit] / max(wall, 1e-6), 1),
+                'peak_mb': round(peak / BYTES_PER_MB, 2),
+            }
+            print(f"  {name:<22} {wall:9.3f} s  {stages[name]['throughput']:>12,.1f} "
+                  f"{unit.replace('_', ' ')}/s  峰值 {stages[name]['peak_mb']:8.1f} MB")
+    finally:
+        if not keep:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    return {
+        'params': params,
+        'workers': workers,
+        'repeat': repeat,
+        'archive': archive,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'stages': stages,
+    }
+
+
+def compare_with_baseline(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    """逐阶段与基线比较墙钟时间，返回变慢超过 tolerance（且超过 MIN_DELTA_S 秒）的阶段名列表"""
+    if baseline.get('params') != result['params'] or baseline.get('workers') != result['workers']:
+        print("  [提示] 基线的生成参数或进程数不同，结果仅供参考")
+
+    regressions = []
+    print(f"\n{'阶段':<22} {'基线(s)':>9} {'本次(s)':>9} {'变化':>8}  {'峰值内存变化':>10}")
+    for name, stage in result['stages'].items():
+        old = baseline.get('stages', {}).get(name)
+        if old is None:
+            print(f"{name:<22} {'-':>9} {stage['wall_s']:9.3f}")
+            continue
+        change = stage['wall_s'] / old['wall_s'] - 1 if old['wall_s'] > 0 else 0.0
+        mem_change = stage['peak_mb'] - old['peak_mb']
+        flag = ''
+        if change > tolerance and stage['wall_s'] - old['wall_s'] > MIN_DELTA_S:
+            regressions.append(name)
+            flag = '  <- 变慢'
+        print(f"{name:<22} {old['wall_s']:9.3f} {stage['wall_s']:9.3f} {change:+8.1%}  "
+              f"{mem_change:+9.1f} MB{flag}")
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="解析 / 平均化流水线基准测试")
+    parser.add_argument('--datasets', nargs='+', default=['100MB', '500MB'])
+    parser.add_argument('--slowstarts', type=float, nargs='+', default=[0.2, 0.5, 0.8, 1.0])
+    parser.add_argument('--runs', type=int, default=3, help="每组运行次数")
+    parser.add_argument('--nodes', type=int, default=3, help="节点数")
+    parser.add_argument('--duration', type=float, default=300.0, help="第一个数据集的作业时长（秒）")
+    parser.add_argument('--interval', type=float, default=1.0, help="采样间隔（秒）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1, help="scan 的并发解析进程数")
+    parser.add_argument('--repeat', type=int, default=3, help="每个阶段重复次数（取最短）")
+    parser.add_argument('--stage', action='append', default=None, help="只运行指定阶段，可重复")
+    parser.add_argument('--data-dir', default=None, help="保留并复用合成数据的目录")
+    parser.add_argument('--output', default=None, help="结果 JSON 的保存路径")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线 JSON 路径")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="比基线慢超过该比例视为退化")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    params = {k: getattr(args, k) for k in ARCHIVE_PARAMS}
+
+    result = run_benchmark(params, args.workers, args.repeat, args.stage, args.data_dir)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+        print(f"\n  已保存: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+        print(f"\n  基线已保存: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n没有基线 {args.baseline}，可用 --save-baseline 保存本次结果")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(result, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} 个阶段比基线慢超过 {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\n所有阶段均未超过基线容差")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,179 +1,735 @@
 import os
 import re
 import datetime
-import pandas as pd
-import numpy as np
+import concurrent.futures
+import functools
+import itertools
+import time
+import collections
+
+import profiling
+
+# pandas / numpy 以及 jhist_parser、run_cache 在用到的函数内部才导入，
+# 只需要阶段数据（如导出 result_*.csv）或仅打印帮助时不必加载它们
+
+
+# monitor.log 中单个节点的采样行，例如 "[worker1-zzh] CPU: 8.00% | MEM: 20%"
+# 新版采集器在行首带有采样时间戳 "2025-11-28 19:11:13,464 "，旧日志没有
+MONITOR_LINE_PATTERN = re.compile(
+    r'(?:(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) )?'
+    r'.*\[(\w+-\w+)\] CPU: (\d+\.\d+)% \| MEM: (\d+)%')
+# 按块解析 monitor.log 时一次匹配一行：分隔行（各组为空）或采样行（时间戳含毫秒、节点、CPU、MEM 四组）。
+# 完整版与 iter_monitor_records 的规则相同（任何含 "----" 的行都是分隔行，节点取行内最后一个匹配）；
+# 快速版只认整行 "----"，节点前用非贪婪匹配。块内 "----" 或 "] CPU: " 的出现次数与快速版的结果不符时
+# （分隔符不单独成行、一行多个采样），该块改用完整版
+_MONITOR_TIMESTAMP_REGEX = r'(?:(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) )?'
+_MONITOR_SAMPLE_REGEX = r'\[(\w+-\w+)\] CPU: (\d+\.\d+)% \| MEM: (\d+)%'
+MONITOR_BLOCK_PATTERN = re.compile(
+    r'^(?:----$|' + _MONITOR_TIMESTAMP_REGEX + '.*?' + _MONITOR_SAMPLE_REGEX + ')', re.MULTILINE)
+MONITOR_BLOCK_PATTERN_EXACT = re.compile(
+    r'^(?:[^\n]*----|' + _MONITOR_TIMESTAMP_REGEX + '.*' + _MONITOR_SAMPLE_REGEX + ')', re.MULTILINE)
+# monitor.log 头部的启动时间，兼容 "2025-11-28 19:11:09"、中文和英文 locale 的 date 输出
+MONITOR_START_PATTERNS = (
+    (re.compile(r'Started at (\d{4})-(\d{1,2})-(\d{1,2}) (\d{1,2}):(\d{2}):(\d{2})'),
+     (1, 2, 3, 4, 5, 6)),
+    (re.compile(r'Started at (\d{4})年\s*(\d{1,2})月\s*(\d{1,2})日\D*(\d{1,2}):(\d{2}):(\d{2})'),
+     (1, 2, 3, 4, 5, 6)),
+    (re.compile(r'Started at \w+ (\w{3})\s+(\d{1,2}) (\d{1,2}):(\d{2}):(\d{2}) \w+ (\d{4})'),
+     (6, 1, 2, 3, 4, 5)),
+)
+# 平均化时公共时间网格的步长（秒）；没有时间信息的日志也按此把 Time_Step 换算成秒
+SAMPLING_INTERVAL = 1
+MONTH_ABBR = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+              'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+# job_output.log 中的进度行：时间戳、毫秒、map%、reduce%
+JOB_PROGRESS_PATTERN = re.compile(
+    r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d+)\s+INFO\s+mapreduce\.Job:\s+map\s+(\d+)%\s+reduce\s+(\d+)%',
+    re.MULTILINE
+)
+# 作业结束行："Job job_xxx completed successfully" 或 "Job job_xxx failed with state FAILED"
+JOB_DONE_PATTERN = re.compile(r'mapreduce\.Job:\s+Job \S+ (completed successfully|failed with state \w+)')
+# 作业结束时打印的计数器块："... mapreduce.Job: Counters: 55" 之后以 Tab 缩进的若干行
+JOB_COUNTERS_HEADER = re.compile(r'INFO\s+mapreduce\.Job:\s+Counters:\s*\d+')
+JOB_COUNTER_LINE = re.compile(r'\t\t(.+?)\s*=\s*(-?\d+)\s*$')
+# 每次运行保留的计数器（Hadoop 显示名 -> stage 字典中的列名）
+JOB_COUNTER_FIELDS = {
+    'HDFS: Number of bytes read': 'HDFS读取(B)',
+    'HDFS: Number of bytes written': 'HDFS写入(B)',
+    'FILE: Number of bytes read': '本地读取(B)',
+    'FILE: Number of bytes written': '本地写入(B)',
+    'Launched map tasks': 'Map任务数',
+    'Launched reduce tasks': 'Reduce任务数',
+    'Killed map tasks': 'Killed Map任务数',
+    'Map output records': 'Map输出记录数',
+    'Map output materialized bytes': 'Map输出物化(B)',
+    'Reduce shuffle bytes': 'Shuffle字节数(B)',
+    'Spilled Records': 'Spill记录数',
+    'GC time elapsed (ms)': 'GC耗时(ms)',
+    'CPU time spent (ms)': 'CPU时间(ms)',
+    'Physical memory (bytes) snapshot': '物理内存快照(B)',
+}
+# 判断日志是否使用 "----" 分隔时间步时只检查文件头部的行数
+MONITOR_HEAD_LINES = 20
+# monitor 数据各列的紧凑类型（MEM 为 0~100 的整数百分比）
+MONITOR_DTYPES = {'Time_Step': 'uint32', 'CPU': 'float32', 'MEM': 'uint8'}
+# 分块模式下每块处理的采样行数，以及文件读缓冲大小
+MONITOR_CHUNK_ROWS = 1 << 16
+MONITOR_READ_BUFFER = 1 << 20
+# 按块解析 monitor.log 时每次 findall 的字节数（匹配结果的临时对象与块大小成正比）
+MONITOR_PARSE_BLOCK = 1 << 18
+# 分块统计的指标
+STEP_METRICS = ('CPU', 'MEM')
+
+
+def iter_monitor_records(f):
+    """逐行流式解析 monitor.log，依次产出 (Time_Step, Node, CPU, MEM, 时间戳字符串或 None)"""
+    head = list(itertools.islice(f, MONITOR_HEAD_LINES))
+    has_separator = any('----' in line for line in head)
+
+    match_line = MONITOR_LINE_PATTERN.match
+    current_time_step = -1
+    count = 0
+
+    for line in itertools.chain(head, f):
+        if 'Real Performance Monitor Started' in line or not line.strip():
+            continue
+
+        if '----' in line:
+            current_time_step += 1
+            continue
+
+        match = match_line(line)
+        if match:
+            # 无分隔符的旧格式日志：按每 3 个节点推算起始时间步
+            if current_time_step == -1 and not has_separator:
+                current_time_step = count // 3
+            count += 1
+
+            ts = match.group(1)
+            yield (max(0, current_time_step), match.group(3),
+                   float(match.group(4)), int(match.group(5)),
+                   f'{ts}.{match.group(2)}' if ts else None)
+
+
+def iter_monitor_blocks(f, buffer_size=MONITOR_PARSE_BLOCK):
+    """
+    按块解析 monitor.log：每次读入 buffer_size 字节（在最后一个换行处截断），用 MONITOR_BLOCK_PATTERN
+    一次 findall 取出块内所有分隔行和采样行，时间步由分隔行的累计数得到
+    依次产出每块的 (Time_Step, 节点名, CPU, MEM, 时间戳) 数组；时间戳为 datetime64[ms]，块内没有时间戳时为 None。
+    时间步规则与 iter_monitor_records 一致
+    """
+    import numpy as np
+
+    head = ''.join(itertools.islice(f, MONITOR_HEAD_LINES))
+    has_separator = '----' in head
+
+    seps_seen = 0
+    # 第一个分隔行之前的采样记为时间步 0；有分隔符的日志第一个分隔行之后仍为 0（与逐行解析一致），
+    # 头部没有分隔符的旧日志若采样先于分隔行出现，之后的分隔行从 1 开始计
+    offset = None
+    tail = head
+    while True:
+        block = f.read(buffer_size)
+        text = tail + block
+        cut = len(text) if not block else text.rfind('\n') + 1
+        tail = text[cut:]
+        # 列：时间戳、节点、CPU、MEM（一次转为二维 object 数组，避免逐列拆元组）；节点为空的是分隔行
+        cols = np.array(MONITOR_BLOCK_PATTERN.findall(text, 0, cut), dtype=object).reshape(-1, 4)
+        is_sep = cols[:, 1] == ''
+        if (text.count('----', 0, cut) != is_sep.sum()
+                or text.count('] CPU: ', 0, cut) != len(cols) - is_sep.sum()):
+            cols = np.array(MONITOR_BLOCK_PATTERN_EXACT.findall(text, 0, cut), dtype=object).reshape(-1, 4)
+            is_sep = cols[:, 1] == ''
+
+        if len(cols):
+            before = seps_seen + np.cumsum(is_sep)
+            seps_seen = int(before[-1])
+            samples = cols[~is_sep]
+            if len(samples):
+                if offset is None:
+                    offset = 0 if (not has_separator and before[~is_sep][0] == 0) else -1
+                stamps = None
+                if samples[:, 0].any():
+                    # "YYYY-MM-DD HH:MM:SS,mmm" 的逗号换成小数点后由 numpy 直接解析，没有时间戳的行为 NaT
+                    stamps = samples[:, 0].astype('U23')
+                    chars = stamps.view('U1').reshape(-1, 23)
+                    chars[chars[:, 19] == ',', 19] = '.'
+                    stamps = stamps.astype('datetime64[ms]')
+                yield (np.maximum(before[~is_sep] + offset, 0), samples[:, 1],
+                       samples[:, 2].astype(MONITOR_DTYPES['CPU']),
+                       samples[:, 3].astype(MONITOR_DTYPES['MEM']), stamps)
+        if not block:
+            break
 
 
 def parse_monitor_log(log_path):
-    """解析单个 monitor.log 文件"""
+    """
+    解析单个 monitor.log 文件（按块 findall，见 iter_monitor_blocks）
+    列使用紧凑类型：Time_Step uint32、Node 分类（节点名字典 + 整数码）、CPU float32、MEM uint8
+    Timestamp 列为采样时刻，旧格式日志（行首没有时间戳）为 NaT
+    """
+    import numpy as np
+    import pandas as pd
+
     if not os.path.exists(log_path):
         return pd.DataFrame()
 
+    # 每块的节点名立即转为整数码（节点按首次出现的顺序编号），只保留紧凑类型的列
+    node_ids = {}
+    steps, codes, cpus, mems, stamps = [], [], [], [], []
     with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
-
-    data_by_time = []
-    current_time_step = -1
+        for block_steps, nodes, block_cpus, block_mems, block_stamps in iter_monitor_blocks(f):
+            block_codes, names = pd.factorize(nodes)
+            ids = np.array([node_ids.setdefault(name, len(node_ids)) for name in names], dtype=np.int32)
+            steps.append(block_steps.astype(MONITOR_DTYPES['Time_Step']))
+            codes.append(ids[block_codes])
+            cpus.append(block_cpus)
+            mems.append(block_mems)
+            stamps.append(block_stamps)
+
+    if not steps:
+        return pd.DataFrame()
 
-    for line in lines:
-        if 'Real Performance Monitor Started' in line or not line.strip():
-            continue
+    n = sum(len(s) for s in steps)
+    if any(s is not None for s in stamps):
+        times = np.concatenate([s if s is not None else np.full(len(st), np.datetime64('NaT'), dtype='datetime64[ms]')
+                                for s, st in zip(stamps, steps)]).astype('datetime64[ns]')
+    else:
+        times = np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
+
+    return pd.DataFrame({
+        'Time_Step': np.concatenate(steps),
+        'Node': pd.Categorical.from_codes(np.concatenate(codes), categories=list(node_ids)),
+        'CPU': np.concatenate(cpus),
+        'MEM': np.concatenate(mems),
+        'Timestamp': times
+    })
+
+
+def _new_step_state(metrics):
+    """按时间步下标存放的增量统计量（计数、最早时刻、各指标的均值 / M2 / 最小 / 最大）"""
+    import numpy as np
+
+    state = {'count': np.zeros(0, dtype=np.int64),
+             'ts': np.zeros(0, dtype=np.int64)}
+    for metric in metrics:
+        for stat in ('mean', 'm2', 'min', 'max'):
+            state[f'{metric}_{stat}'] = np.zeros(0)
+    return state
+
+
+def _grow_step_state(state, size):
+    """把统计数组扩到至少能容纳 size 个时间步"""
+    import numpy as np
+
+    current = len(state['count'])
+    if size <= current:
+        return
+    size = max(size, current * 2, 1024)
+    for key, values in state.items():
+        if key.endswith('_min'):
+            fill = np.inf
+        elif key.endswith('_max'):
+            fill = -np.inf
+        elif key == 'ts':
+            fill = np.iinfo(np.int64).max
+        else:
+            fill = 0
+        grown = np.full(size, fill, dtype=values.dtype)
+        grown[:current] = values
+        state[key] = grown
 
-        if '----' in line:
-            current_time_step += 1
-            continue
 
-        match = re.match(r'.*\[(\w+-\w+)\] CPU: (\d+\.\d+)% \| MEM: (\d+)%', line)
-        if not match:
-            match = re.match(r'\[(\w+-\w+)\] CPU: (\d+\.\d+)% \| MEM: (\d+)%', line)
+def _merge_step_chunk(state, steps, values, timestamps):
+    """
+    把一块采样合并进按时间步的统计量
+    块内先按时间步求 计数 / 均值 / M2，再用 Chan 的并行 Welford 公式与已有统计合并
+    """
+    import numpy as np
+
+    _grow_step_state(state, int(steps.max()) + 1)
+    uniq, inverse = np.unique(steps, return_inverse=True)
+    n_b = np.bincount(inverse).astype(np.float64)
+    n_a = state['count'][uniq].astype(np.float64)
+    n = n_a + n_b
+
+    for metric, x in values.items():
+        mean_b = np.bincount(inverse, weights=x) / n_b
+        m2_b = np.bincount(inverse, weights=(x - mean_b[inverse]) ** 2)
+        mean_a = state[f'{metric}_mean'][uniq]
+        delta = mean_b - mean_a
+        state[f'{metric}_mean'][uniq] = mean_a + delta * n_b / n
+        state[f'{metric}_m2'][uniq] += m2_b + delta ** 2 * n_a * n_b / n
+
+        chunk_min = np.full(len(uniq), np.inf)
+        chunk_max = np.full(len(uniq), -np.inf)
+        np.minimum.at(chunk_min, inverse, x)
+        np.maximum.at(chunk_max, inverse, x)
+        state[f'{metric}_min'][uniq] = np.minimum(state[f'{metric}_min'][uniq], chunk_min)
+        state[f'{metric}_max'][uniq] = np.maximum(state[f'{metric}_max'][uniq], chunk_max)
+
+    chunk_ts = np.full(len(uniq), np.iinfo(np.int64).max)
+    np.minimum.at(chunk_ts, inverse, timestamps)
+    state['ts'][uniq] = np.minimum(state['ts'][uniq], chunk_ts)
+    state['count'][uniq] += n_b.astype(np.int64)
+
+
+def summarize_monitor_log(log_path, chunk_rows=MONITOR_CHUNK_ROWS):
+    """
+    分块解析 monitor.log，按时间步增量统计各节点的 CPU / MEM
+    每次只持有 chunk_rows 行采样，内存只与时间步数有关、与文件大小无关；
+    返回每个时间步一行的 DataFrame：Time_Step、Timestamp（该步最早的采样时刻）、Nodes（采样数）、
+    CPU / MEM（节点均值）以及 <指标>_std / _min / _max
+    """
+    import numpy as np
+    import pandas as pd
 
-        if match:
-            if current_time_step == -1 and '----' not in "".join(lines[:20]):
-                current_time_step = len(data_by_time) // 3
-
-            cpu_usage = float(match.group(2))
-            mem_usage = int(match.group(3))
-            step_val = max(0, current_time_step)
-
-            data_by_time.append({
-                'Time_Step': step_val,
-                'Node': match.group(1),
-                'CPU': cpu_usage,
-                'MEM': mem_usage
-            })
+    if not os.path.exists(log_path):
+        return pd.DataFrame()
 
-    if not data_by_time:
+    missing_ts = np.iinfo(np.int64).max
+    state = _new_step_state(STEP_METRICS)
+
+    def flush(rows):
+        steps, _, cpus, mems, ts = zip(*rows)
+        ts_ns = np.full(len(rows), missing_ts, dtype=np.int64)
+        present = [i for i, t in enumerate(ts) if t is not None]
+        if present:
+            parsed = pd.to_datetime([ts[i] for i in present], format='%Y-%m-%d %H:%M:%S.%f')
+            ts_ns[present] = parsed.to_numpy('datetime64[ns]').view(np.int64)
+        _merge_step_chunk(state, np.asarray(steps, dtype=np.int64),
+                          {'CPU': np.asarray(cpus, dtype=np.float64),
+                           'MEM': np.asarray(mems, dtype=np.float64)},
+                          ts_ns)
+
+    with open(log_path, 'r', encoding='utf-8', errors='ignore',
+              buffering=MONITOR_READ_BUFFER) as f:
+        rows = []
+        for record in iter_monitor_records(f):
+            rows.append(record)
+            if len(rows) >= chunk_rows:
+                flush(rows)
+                rows = []
+        if rows:
+            flush(rows)
+
+    return step_summary(state)
+
+
+def step_summary(state):
+    """把按时间步的增量统计量整理成 summarize_monitor_log 返回的统计表"""
+    import numpy as np
+    import pandas as pd
+
+    missing_ts = np.iinfo(np.int64).max
+    counts = state['count']
+    valid = np.flatnonzero(counts)
+    if len(valid) == 0:
         return pd.DataFrame()
-    return pd.DataFrame(data_by_time)
 
+    ts = state['ts'][valid]
+    summary = {
+        'Time_Step': valid.astype(MONITOR_DTYPES['Time_Step']),
+        'Timestamp': np.where(ts == missing_ts, np.iinfo(np.int64).min, ts).view('datetime64[ns]'),
+        'Nodes': counts[valid],
+    }
+    for metric in STEP_METRICS:
+        n = counts[valid]
+        m2 = state[f'{metric}_m2'][valid]
+        summary[metric] = state[f'{metric}_mean'][valid]
+        # 与 pandas 一致的样本标准差，只有一个采样时为 NaN
+        with np.errstate(invalid='ignore', divide='ignore'):
+            summary[f'{metric}_std'] = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+        summary[f'{metric}_min'] = state[f'{metric}_min'][valid]
+        summary[f'{metric}_max'] = state[f'{metric}_max'][valid]
+    return pd.DataFrame(summary)
+
+
+def parse_monitor_start(log_path):
+    """读取 monitor.log 头部的启动时间，找不到时返回 None"""
+    if not os.path.exists(log_path):
+        return None
+
+    with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in itertools.islice(f, MONITOR_HEAD_LINES):
+            if 'Real Performance Monitor Started' not in line:
+                continue
+            for pattern, order in MONITOR_START_PATTERNS:
+                match = pattern.search(line)
+                if not match:
+                    continue
+                parts = [match.group(i) for i in order]
+                if parts[1] in MONTH_ABBR:
+                    parts[1] = MONTH_ABBR.index(parts[1]) + 1
+                try:
+                    return datetime.datetime(*(int(p) for p in parts))
+                except ValueError:
+                    return None
+    return None
+
+
+def parse_job_progress(job_log_path):
+    """解析 job_output.log 的 map% / reduce% 进度行，返回按时间排序的 DataFrame(Time, Map_Pct, Reduce_Pct)"""
+    import numpy as np
+    import pandas as pd
 
-def parse_job_stages(job_log_path):
-    """解析 job_output.log 获取阶段时间信息（修复 Reduce 时间）"""
     if not os.path.exists(job_log_path):
-        return None
+        return pd.DataFrame(columns=['Time', 'Map_Pct', 'Reduce_Pct'])
 
     with open(job_log_path, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
-
-    prog_pattern = re.compile(
-        r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d+\s+INFO\s+mapreduce\.Job:\s+map\s+(\d+)%\s+reduce\s+(\d+)%',
-        re.MULTILINE
-    )
+        matches = JOB_PROGRESS_PATTERN.findall(f.read())
 
-    matches = prog_pattern.findall(content)
     if not matches:
-        return None
+        return pd.DataFrame(columns=['Time', 'Map_Pct', 'Reduce_Pct'])
 
-    records = []
-    for ts_str, map_p, red_p in matches:
-        t = datetime.datetime.strptime(ts_str, '%Y-%m-%d %H:%M:%S')
-        records.append({
-            'time': t,
-            'map_pct': int(map_p),
-            'red_pct': int(red_p)
-        })
+    ts_str, ms, map_p, red_p = zip(*matches)
+    times = pd.to_datetime([f'{t}.{m}' for t, m in zip(ts_str, ms)],
+                           format='%Y-%m-%d %H:%M:%S.%f').to_numpy('datetime64[ns]')
+    progress = pd.DataFrame({
+        'Time': times,
+        'Map_Pct': np.array(map_p, dtype=np.int64),
+        'Reduce_Pct': np.array(red_p, dtype=np.int64)
+    })
+    return progress.sort_values('Time', kind='stable').reset_index(drop=True)
 
-    records.sort(key=lambda x: x['time'])
 
-    if not records:
-        return None
+def attach_elapsed(df, monitor_start=None, job_end=None):
+    """
+    为单次运行的 monitor 数据补充 Elapsed 列（距监控启动的秒数）
+    有采样时间戳时直接使用；旧格式日志用 启动时间 ~ 作业结束时间 按时间步均分，
+    同时回填估算的 Timestamp；两者都没有时退化为 Time_Step * SAMPLING_INTERVAL
+    """
+    import pandas as pd
+
+    if df is None or df.empty:
+        return df
+
+    df = df.copy()
+    timestamps = df['Timestamp'] if 'Timestamp' in df else pd.Series(pd.NaT, index=df.index)
+
+    if timestamps.notna().all():
+        origin = pd.Timestamp(monitor_start) if monitor_start is not None else timestamps.min()
+        df['Elapsed'] = (timestamps - origin).dt.total_seconds()
+    elif monitor_start is not None and job_end is not None and job_end > monitor_start:
+        # 每个时间步的采样大致落在该步区间的中点
+        n_steps = int(df['Time_Step'].max()) + 1
+        step_seconds = (job_end - monitor_start).total_seconds() / n_steps
+        df['Elapsed'] = (df['Time_Step'] + 0.5) * step_seconds
+        df['Timestamp'] = pd.Timestamp(monitor_start) + pd.to_timedelta(df['Elapsed'], unit='s')
+    else:
+        df['Elapsed'] = df['Time_Step'] * float(SAMPLING_INTERVAL)
 
-    t0 = records[0]['time']
+    return df
 
-    # 1. Map 完成时间
-    t_map_done = None
-    for r in records:
-        if r['map_pct'] == 100:
-            t_map_done = r['time']
-            break
 
-    if t_map_done is None:
-        return None
+def align_monitor_with_progress(monitor_df, progress_df):
+    """
+    按时间把每个采样与作业当时的进度对齐（merge_asof，取采样时刻之前最近的一条进度）
+    返回增加了 Map_Pct / Reduce_Pct 列的 DataFrame，作业开始前的采样进度记为 0
+    """
+    import numpy as np
+    import pandas as pd
 
-    # 2. Shuffle 开始时间
-    t_shuf_start = None
-    for r in records:
-        if r['red_pct'] > 0:
-            t_shuf_start = r['time']
-            break
+    if monitor_df is None or monitor_df.empty or 'Timestamp' not in monitor_df:
+        return monitor_df
 
-    # 3. Shuffle 结束 / Reduce 开始时间
-    # 使用启发式：Map完成后，Reduce进度达到90%以上
-    t_shuf_end = None
-    t_reduce_start = None
+    samples = monitor_df.dropna(subset=['Timestamp']).sort_values('Timestamp', kind='stable')
+    samples = samples.astype({'Timestamp': 'datetime64[ns]'})
+    if progress_df is None or progress_df.empty:
+        return samples.assign(Map_Pct=0, Reduce_Pct=0)
 
-    for r in records:
-        if r['map_pct'] == 100 and r['red_pct'] >= 90:
-            t_shuf_end = r['time']
-            t_reduce_start = r['time']
-            break
+    progress = progress_df.rename(columns={'Time': 'Timestamp'}).astype({'Timestamp': 'datetime64[ns]'})
+    merged = pd.merge_asof(samples, progress, on='Timestamp', direction='backward')
+    merged[['Map_Pct', 'Reduce_Pct']] = merged[['Map_Pct', 'Reduce_Pct']].fillna(0).astype(np.int64)
+    return merged
 
-    # 如果没找到，使用倒数第二条记录作为Shuffle结束
-    if t_shuf_end is None:
-        if len(records) >= 2:
-            t_shuf_end = records[-2]['time']
-            t_reduce_start = records[-2]['time']
-        else:
-            t_shuf_end = records[-1]['time']
-            t_reduce_start = records[-1]['time']
 
-    # 4. 任务完成时间 
-    t_job_done = records[-1]['time']
+def resample_run(df, grid_step=None, metrics=None):
+    """
+    把单次运行的集群均值曲线插值到从 0 开始、间隔 grid_step 秒的公共时间网格上
+    返回 DataFrame(Time_Step=网格序号, 各指标)，便于不同长度的运行逐点对齐
+    """
+    import numpy as np
+    import pandas as pd
+
+    grid_step = grid_step or SAMPLING_INTERVAL
+    if metrics is None:
+        metrics = [c for c in df.select_dtypes('number').columns
+                   if c not in ('Time_Step', 'Elapsed')]
+
+    # 同一时间步的各节点采样先取集群均值；各节点依次采样、时间戳互不相同，
+    # 所以按 Time_Step 分组，有 Elapsed 时以该步各采样的平均时刻作为横坐标
+    grouped = df.groupby('Time_Step')
+    per_step = grouped[list(metrics)].mean()
+    if 'Elapsed' in df:
+        x = grouped['Elapsed'].mean().to_numpy()
+    else:
+        x = per_step.index.to_numpy() * float(SAMPLING_INTERVAL)
 
-    # 5. 计算各阶段耗时
-    total_time = (t_job_done - t0).total_seconds()
-    map_time = (t_map_done - t0).total_seconds()
+    grid = np.arange(0, x.max() + grid_step / 2, grid_step)
+    resampled = {'Time_Step': np.arange(len(grid))}
+    for metric in metrics:
+        resampled[metric] = np.interp(grid, x, per_step[metric].to_numpy())
+    return pd.DataFrame(resampled)
 
-    if t_shuf_start and t_shuf_end:
-        shuffle_duration = (t_shuf_end - t_shuf_start).total_seconds()
+
+def resample_monitor_data(monitor_data, grid_step=None, metrics=None):
+    """对 {dataset: {slowstart: [df, ...]}} 中的每次运行做 resample_run"""
+    return {
+        dataset: {
+            slowstart: [resample_run(df, grid_step, metrics) for df in df_list]
+            for slowstart, df_list in ss_dict.items()
+        }
+        for dataset, ss_dict in monitor_data.items()
+    }
+
+
+def read_job_progress(job_log_path, buffer_size=MONITOR_READ_BUFFER):
+    """
+    流式读取 job_output.log 的进度行，返回 (时间, map%, reduce%) 三个数组（按文件顺序）
+    时间为 datetime64[s]（与原逐行 strptime 一样忽略毫秒）；按块读取，每块在最后一个换行处截断，
+    块内用 findall 一次取出所有匹配，时间字符串整体交给 NumPy 转换
+    """
+    import numpy as np
+
+    stamps = []
+    map_pct = []
+    red_pct = []
+    tail = ''
+    with open(job_log_path, 'r', encoding='utf-8', errors='ignore') as f:
+        while True:
+            block = f.read(buffer_size)
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind('\n') + 1
+            tail = block[cut:]
+            for ts_str, _, map_p, red_p in JOB_PROGRESS_PATTERN.findall(block, 0, cut):
+                stamps.append(ts_str)
+                map_pct.append(map_p)
+                red_pct.append(red_p)
+    for ts_str, _, map_p, red_p in JOB_PROGRESS_PATTERN.findall(tail):
+        stamps.append(ts_str)
+        map_pct.append(map_p)
+        red_pct.append(red_p)
+
+    return (np.array(stamps, dtype='datetime64[s]'),
+            np.array(map_pct, dtype=np.int64),
+            np.array(red_pct, dtype=np.int64))
+
+
+def job_stage_times(job_log_path):
+    """
+    job_output.log 中的阶段边界时刻（秒级时间戳，与 datetime64[s] 的整数值相同）
+    返回 {'start', 'map_done', 'shuffle_start', 'shuffle_end', 'job_done'}，没有 reduce>0% 时
+    shuffle_start 为 None；Map 完成：第一条 map=100%；Shuffle 开始：第一条 reduce>0%；
+    Shuffle 结束 / Reduce 开始：Map 完成后第一条 reduce≥90%，没有时取倒数第二条；作业完成：最后一条
+    文件不存在、没有进度行或 Map 未完成时返回 None
+    """
+    import numpy as np
+
+    if not os.path.exists(job_log_path):
+        return None
+
+    stamps, map_pct, red_pct = read_job_progress(job_log_path)
+    if len(stamps) == 0:
+        return None
+
+    # 按时间稳定排序，时间相同的行保持文件顺序
+    order = np.argsort(stamps, kind='stable')
+    seconds = stamps[order].astype(np.int64)
+    map_pct = map_pct[order]
+    red_pct = red_pct[order]
+
+    # 三个阶段边界一次求出：每行一个条件，argmax 取第一个满足的位置
+    flags = np.stack([map_pct == 100, red_pct > 0, (map_pct == 100) & (red_pct >= 90)])
+    first = flags.argmax(axis=1)
+    found = flags[np.arange(len(flags)), first]
+
+    if not found[0]:
+        return None
+
+    if found[2]:
+        t_shuf_end = seconds[first[2]]
     else:
-        shuffle_duration = 0.0
-        t_shuf_start = t_map_done
-        t_shuf_end = t_map_done
+        # 没找到时使用倒数第二条记录作为 Shuffle 结束
+        t_shuf_end = seconds[-2] if len(seconds) >= 2 else seconds[-1]
 
-    reduce_time = (t_job_done - t_reduce_start).total_seconds()
+    return {
+        'start': int(seconds[0]),
+        'map_done': int(seconds[first[0]]),
+        'shuffle_start': int(seconds[first[1]]) if found[1] else None,
+        'shuffle_end': int(t_shuf_end),
+        'job_done': int(seconds[-1]),
+    }
 
-    #  6. 计算重叠比例
-    if shuffle_duration > 0:
-        overlap_start = max(t0, t_shuf_start)
-        overlap_end = min(t_map_done, t_shuf_end)
 
-        if overlap_end > overlap_start:
-            overlap_time = (overlap_end - overlap_start).total_seconds()
-        else:
-            overlap_time = 0.0
+def parse_job_stages(job_log_path):
+    """解析 job_output.log 获取阶段时间信息（修复 Reduce 时间），阶段边界见 job_stage_times"""
+    times = job_stage_times(job_log_path)
+    if times is None:
+        return None
 
+    t0 = times['start']
+    t_map_done = times['map_done']
+    t_job_done = times['job_done']
+    t_shuf_end = t_reduce_start = times['shuffle_end']
+
+    if times['shuffle_start'] is not None:
+        t_shuf_start = times['shuffle_start']
+        shuffle_duration = float(t_shuf_end - t_shuf_start)
+    else:
+        shuffle_duration = 0.0
+        t_shuf_start = t_shuf_end = t_map_done
+
+    # 重叠比例
+    if shuffle_duration > 0:
+        overlap_time = float(max(0, min(t_map_done, t_shuf_end) - max(t0, t_shuf_start)))
         overlap_ratio = (overlap_time / shuffle_duration) * 100.0
     else:
         overlap_ratio = 0.0
 
     return {
-        'Map耗时(s)': round(map_time, 2),
+        'Map耗时(s)': round(float(t_map_done - t0), 2),
         'Shuffle耗时(s)': round(shuffle_duration, 2),
-        'Reduce耗时(s)': round(reduce_time, 2),
-        '总耗时(s)': round(total_time, 2),
+        'Reduce耗时(s)': round(float(t_job_done - t_reduce_start), 2),
+        '总耗时(s)': round(float(t_job_done - t0), 2),
         'Shuffle重叠比(%)': round(overlap_ratio, 2)
     }
 
-def scan_multiple_runs(base_dir='./MapReduceLog'):
+
+def parse_job_counters(job_log_path):
     """
-    扫描多轮实验数据（新目录结构）
+    解析 job_output.log 末尾的 Hadoop 计数器块
+    返回 {计数器显示名: int}，如 {'Spilled Records': 6111990, ...}；没有计数器块时返回 {}
     """
-    if not os.path.exists(base_dir):
-        print(f"错误：找不到目录 {base_dir}")
-        return {}, {}
+    if not os.path.exists(job_log_path):
+        return {}
 
-    monitor_data = {}
-    stage_data = {}
+    counters = {}
+    group = None
+    in_block = False
 
-    print(f"扫描目录: {base_dir}")
+    with open(job_log_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            if not in_block:
+                # 计数器块之前的进度行很多，先用子串过滤再做正则
+                if 'Counters:' in line and JOB_COUNTERS_HEADER.search(line):
+                    in_block = True
+                continue
+
+            if not line.startswith('\t'):
+                break
+
+            if not line.startswith('\t\t'):
+                group = line.strip()
+                continue
+
+            match = JOB_COUNTER_LINE.match(line)
+            if match:
+                name = match.group(1)
+                # 不同分组的同名计数器用 "分组: 名称" 区分
+                if name in counters:
+                    name = f'{group}: {name}'
+                counters[name] = int(match.group(2))
+
+    return counters
+
+
+def summarize_job_counters(counters, stage_info=None):
+    """
+    从计数器中提取每次运行的关键指标，以及 Shuffle 吞吐、GC 占比等派生指标
+    stage_info 提供 Shuffle 耗时时计算 Shuffle 吞吐(MB/s)
+    """
+    if not counters:
+        return {}
+
+    summary = {label: counters[name]
+               for name, label in JOB_COUNTER_FIELDS.items() if name in counters}
+
+    shuffle_bytes = counters.get('Reduce shuffle bytes')
+    shuffle_time = stage_info.get('Shuffle耗时(s)') if stage_info else None
+    if shuffle_bytes is not None and shuffle_time:
+        summary['Shuffle吞吐(MB/s)'] = round(shuffle_bytes / 1024 / 1024 / shuffle_time, 2)
+
+    map_records = counters.get('Map output records')
+    spilled = counters.get('Spilled Records')
+    if map_records and spilled is not None:
+        summary['Spill倍数'] = round(spilled / map_records, 4)
+
+    gc_ms = counters.get('GC time elapsed (ms)')
+    cpu_ms = counters.get('CPU time spent (ms)')
+    if gc_ms is not None and cpu_ms:
+        summary['GC占比(%)'] = round(gc_ms / cpu_ms * 100, 2)
+
+    return summary
+
+
+def parse_run(run_path, monitor=True, chunked=False):
+    """
+    解析单次实验运行目录，返回 (monitor DataFrame, stage 字典)，文件缺失时对应项为 None
+    没有 monitor.log 时读取二进制采样 monitor.bin（见 monitor_binary）
+    monitor=False 时跳过 monitor.log，只解析阶段数据；
+    chunked 时用 summarize_monitor_log 分块统计，monitor DataFrame 为每个时间步一行的统计表
+    """
+    from jhist_parser import parse_run_jhist
+
+    monitor_log = os.path.join(run_path, 'monitor.log')
+    monitor_bin = os.path.join(run_path, 'monitor.bin')
+    job_log = os.path.join(run_path, 'job_output.log')
+
+    with profiling.stage('parse_run', run=run_path) as record:
+        df = None
+        monitor_start = None
+        if monitor and os.path.exists(monitor_log):
+            with profiling.stage('parse_monitor', run=run_path) as monitor_record:
+                df = summarize_monitor_log(monitor_log) if chunked else parse_monitor_log(monitor_log)
+                monitor_start = parse_monitor_start(monitor_log)
+                monitor_record['rows'] = len(df)
+        elif monitor and os.path.exists(monitor_bin):
+            # monitor_real.py --format binary 采集的定长二进制采样
+            import monitor_binary
+            with profiling.stage('parse_monitor', run=run_path) as monitor_record:
+                if chunked:
+                    df = monitor_binary.summarize_monitor_binary(monitor_bin)
+                else:
+                    df = monitor_binary.read_monitor_binary(monitor_bin)
+                monitor_start = monitor_binary.monitor_start(monitor_bin)
+                monitor_record['rows'] = len(df)
+
+        with profiling.stage('parse_job', run=run_path):
+            stage_info = parse_job_stages(job_log) if os.path.exists(job_log) else None
+
+            # 有作业历史文件时用 task 级时间替换基于进度行的阶段估算
+            jhist_stages = parse_run_jhist(run_path)
+            if jhist_stages:
+                stage_info = {**(stage_info or {}), **jhist_stages}
+
+            if stage_info:
+                stage_info.update(summarize_job_counters(parse_job_counters(job_log), stage_info))
+
+        if df is not None and not df.empty:
+            progress = parse_job_progress(job_log)
+            job_end = progress['Time'].iloc[-1] if not progress.empty else None
+            df = attach_elapsed(df, monitor_start, job_end)
+        record['rows'] = len(df) if df is not None else 0
+
+    return df, stage_info
+
+
+def discover_runs(base_dir):
+    """
+    发现实验目录下的所有运行，按 (文件夹, 时间戳) 排序
+    返回 [(dataset, slowstart, [run_path, ...]), ...]
+    """
+    groups = []
 
     # 遍历第一层：数据集_slowstart_值
-    for dataset_folder in os.listdir(base_dir):
+    for dataset_folder in sorted(os.listdir(base_dir)):
         dataset_path = os.path.join(base_dir, dataset_folder)
 
-        if not os.path.isdir(dataset_path):
+        # 跳过隐藏目录（如解析缓存 .parse_cache）
+        if dataset_folder.startswith('.') or not os.path.isdir(dataset_path):
             continue
 
         # 解析文件夹名：100mb_slowstart_0.2
@@ -186,6 +742,112 @@ def scan_multiple_runs(base_dir='./MapReduceLog'):
         dataset = match.group(1).upper()  # 统一转大写
         slowstart = float(match.group(2))
 
+        # 遍历第二层：时间戳文件夹
+        run_folders = [f for f in os.listdir(dataset_path)
+                       if os.path.isdir(os.path.join(dataset_path, f))]
+
+        run_folders.sort()
+
+        groups.append((dataset, slowstart,
+                       [os.path.join(dataset_path, f) for f in run_folders]))
+
+    return groups
+
+
+def _map_runs(run_paths, workers, executor, monitor=True, chunked=False):
+    """按顺序解析所有运行；workers > 1 时使用进程池 / 线程池并发解析"""
+    parse = functools.partial(parse_run, monitor=monitor, chunked=chunked)
+    if not workers or workers <= 1 or len(run_paths) <= 1:
+        return [parse(p) for p in run_paths]
+
+    if executor == 'thread':
+        pool_cls = concurrent.futures.ThreadPoolExecutor
+    elif executor == 'process':
+        pool_cls = concurrent.futures.ProcessPoolExecutor
+    else:
+        raise ValueError(f"未知的执行方式: {executor}（可选 process / thread）")
+
+    with pool_cls(max_workers=workers) as pool:
+        if executor == 'process':
+            chunksize = max(1, len(run_paths) // (workers * 4))
+            return profiling.map_recorded(pool, parse, run_paths, chunksize=chunksize)
+        return profiling.map_recorded(pool, parse, run_paths)
+
+
+def _load_runs(run_paths, workers, executor, cache_dir, monitor=True, chunked=False):
+    """
+    解析所有运行；cache_dir 不为 None 时只重新解析新增或有改动的运行
+    monitor=False 时缓存命中也不解码 monitor 数据；未命中的只解析阶段数据，且不写缓存
+    """
+    if cache_dir is None:
+        return _map_runs(run_paths, workers, executor, monitor, chunked)
+
+    from run_cache import run_signature, load_cached_run, save_cached_run
+
+    with profiling.stage('cache_load') as record:
+        results = [load_cached_run(cache_dir, p, monitor) for p in run_paths]
+        missing = [i for i, r in enumerate(results) if r is None]
+        record['rows'] = len(run_paths) - len(missing)
+    print(f"缓存命中 {len(run_paths) - len(missing)}/{len(run_paths)} 次运行")
+
+    if missing:
+        signatures = [run_signature(run_paths[i]) for i in missing]
+        parsed = _map_runs([run_paths[i] for i in missing], workers, executor, monitor, chunked)
+        for i, signature, (df, stage_info) in zip(missing, signatures, parsed):
+            if monitor:
+                save_cached_run(cache_dir, run_paths[i], df, stage_info, signature)
+            results[i] = (df, stage_info)
+
+    return results
+
+
+def count_runs(stage_data):
+    """{dataset: {slowstart: [stage 字典, ...]}} 中的运行总数"""
+    return sum(len(runs) for ss_dict in stage_data.values() for runs in ss_dict.values())
+
+
+def count_groups(nested):
+    """{dataset: {slowstart: ...}} 中的 数据集 x slowstart 组数"""
+    return sum(len(ss_dict) for ss_dict in nested.values())
+
+
+@profiling.timed('scan', rows=lambda result: count_runs(result[1]))
+def scan_multiple_runs(base_dir='./MapReduceLog', workers=None, executor='process',
+                       use_cache=True, cache_dir=None, monitor=True, packed=False,
+                       chunked=False):
+    """
+    扫描多轮实验数据（新目录结构）
+    workers > 1 时按 executor（process / thread）并发解析各次运行，结果顺序与串行一致
+    use_cache 时解析结果缓存在 cache_dir（默认 <base_dir>/.parse_cache），按文件大小和 mtime 失效
+    monitor=False 时只返回阶段数据，monitor_data 中各列表为空
+    packed 时 monitor_data 以 MonitorStore（所有运行连续存放的紧凑列数组）返回
+    chunked 时分块解析超大的 monitor.log，每次运行只保留按时间步的统计表（不能与 packed 同时使用）
+    """
+    if chunked and packed:
+        raise ValueError("chunked 模式的按时间步统计表不能打包为 MonitorStore")
+
+    if not os.path.exists(base_dir):
+        print(f"错误：找不到目录 {base_dir}")
+        return {}, {}
+
+    monitor_data = {}
+    stage_data = {}
+
+    print(f"扫描目录: {base_dir}")
+
+    if use_cache and cache_dir is None:
+        from run_cache import default_cache_dir
+        cache_dir = default_cache_dir(base_dir)
+    if use_cache and chunked:
+        # 统计表与逐行采样的缓存分开存放
+        cache_dir = os.path.join(cache_dir, 'steps')
+
+    groups = discover_runs(base_dir)
+    run_paths = [p for _, _, paths in groups for p in paths]
+    results = iter(_load_runs(run_paths, workers, executor,
+                              cache_dir if use_cache else None, monitor, chunked))
+
+    for dataset, slowstart, paths in groups:
         print(f"\n处理: {dataset} - SlowStart {slowstart}")
 
         if dataset not in monitor_data:
@@ -195,38 +857,29 @@ def scan_multiple_runs(base_dir='./MapReduceLog'):
             monitor_data[dataset][slowstart] = []
             stage_data[dataset][slowstart] = []
 
-        # 遍历第二层：时间戳文件夹
-        run_folders = [f for f in os.listdir(dataset_path)
-                       if os.path.isdir(os.path.join(dataset_path, f))]
-
-        run_folders.sort()
-
-        print(f"  发现 {len(run_folders)} 次实验运行")
+        print(f"  发现 {len(paths)} 次实验运行")
 
-        for run_idx, run_folder in enumerate(run_folders, 1):
-            run_path = os.path.join(dataset_path, run_folder)
+        for run_idx, run_path in enumerate(paths, 1):
+            df, stage_info = next(results)
 
-            monitor_log = os.path.join(run_path, 'monitor.log')
-            if os.path.exists(monitor_log):
-                df = parse_monitor_log(monitor_log)
-                if not df.empty:
-                    min_time = df['Time_Step'].min()
-                    df['Time_Step'] = df['Time_Step'] - min_time
-                    monitor_data[dataset][slowstart].append(df)
-                    print(f"    [Monitor] 第 {run_idx} 次 - ✓ 数据点: {len(df)}")
-                else:
-                    print(f"    [Monitor] 第 {run_idx} 次 - ✗ 空数据")
-            else:
+            if not monitor:
+                # 只扫描阶段数据
+                pass
+            elif df is None:
                 print(f"    [Monitor] 第 {run_idx} 次 - ✗ 文件缺失")
+            elif not df.empty:
+                min_time = df['Time_Step'].min()
+                df['Time_Step'] = df['Time_Step'] - min_time
+                monitor_data[dataset][slowstart].append(df)
+                print(f"    [Monitor] 第 {run_idx} 次 - ✓ 数据点: {len(df)}")
+            else:
+                print(f"    [Monitor] 第 {run_idx} 次 - ✗ 空数据")
 
-            job_log = os.path.join(run_path, 'job_output.log')
-            if os.path.exists(job_log):
-                stage_info = parse_job_stages(job_log)
-                if stage_info:
-                    stage_data[dataset][slowstart].append(stage_info)
-                    print(f"    [Stage]   第 {run_idx} 次 - ✓ 总耗时: {stage_info['总耗时(s)']:.1f}s")
-                else:
-                    print(f"    [Stage]   第 {run_idx} 次 - ✗ 解析失败")
+            if stage_info:
+                stage_data[dataset][slowstart].append(stage_info)
+                print(f"    [Stage]   第 {run_idx} 次 - ✓ 总耗时: {stage_info['总耗时(s)']:.1f}s")
+            elif os.path.exists(os.path.join(run_path, 'job_output.log')):
+                print(f"    [Stage]   第 {run_idx} 次 - ✗ 解析失败")
             else:
                 print(f"    [Stage]   第 {run_idx} 次 - ✗ 文件缺失")
 
@@ -239,86 +892,125 @@ def scan_multiple_runs(base_dir='./MapReduceLog'):
             stage_count = len(stage_data[dataset][slowstart])
             print(f"  SlowStart {slowstart}: Monitor={monitor_count}次, Stage={stage_count}次")
 
+    if packed:
+        from monitor_store import pack_monitor_data
+        monitor_data = pack_monitor_data(monitor_data)
+
     return monitor_data, stage_data
 
 
-def average_monitor_data(monitor_data):
+# 长表中用于分组的键列，其余数值列都视为指标
+MONITOR_KEY_COLUMNS = ('Dataset', 'SlowStart', 'Run', 'Time_Step')
+AGGREGATE_STATS = ('mean', 'std', 'min', 'max', 'count')
+
+
+def build_monitor_frame(monitor_data):
+    """把 {dataset: {slowstart: [df, ...]}} 拼接成带 Dataset / SlowStart / Run 列的长表"""
+    import pandas as pd
+
+    frames = []
+    keys = []
+    for dataset, ss_dict in monitor_data.items():
+        for slowstart, df_list in ss_dict.items():
+            for run_id, df in enumerate(df_list):
+                frames.append(df)
+                keys.append((dataset, slowstart, run_id))
+
+    if not frames:
+        return pd.DataFrame(columns=list(MONITOR_KEY_COLUMNS))
+
+    long_df = pd.concat(frames, keys=keys, names=['Dataset', 'SlowStart', 'Run', None])
+    return long_df.reset_index(level=['Dataset', 'SlowStart', 'Run']).reset_index(drop=True)
+
+
+def aggregate_monitor_runs(monitor_data, metrics=None):
     """
-    将多轮 monitor 数据平均（CPU）
+    多轮 monitor 数据的向量化聚合
+    先对每轮每个时间步的节点取均值，再对 (Dataset, SlowStart, Time_Step) 跨轮统计
+    返回长表，每个指标生成 <指标>_mean / _std / _min / _max / _count 列
+    metrics 默认取所有数值列（CPU、MEM 以及以后新增的列）
     """
-    SAMPLING_INTERVAL = 1  # ← 添加这一行
+    import pandas as pd
 
-    averaged_data = {}
+    long_df = build_monitor_frame(monitor_data)
 
-    for dataset, ss_dict in monitor_data.items():
-        averaged_data[dataset] = {}
+    if metrics is None:
+        metrics = [c for c in long_df.select_dtypes('number').columns
+                   if c not in MONITOR_KEY_COLUMNS]
 
-        for slowstart, df_list in ss_dict.items():
-            if not df_list:
-                continue
+    if long_df.empty or not metrics:
+        return pd.DataFrame(columns=['Dataset', 'SlowStart', 'Time_Step'])
 
-            print(f"  平均化 {dataset} SS:{slowstart} - {len(df_list)} 轮数据")
+    per_run = long_df.groupby(list(MONITOR_KEY_COLUMNS), sort=False)[list(metrics)].mean()
+    stats = per_run.groupby(level=['Dataset', 'SlowStart', 'Time_Step']).agg(list(AGGREGATE_STATS))
+    stats.columns = [f'{metric}_{stat}' for metric, stat in stats.columns]
+    return stats.reset_index()
 
-            time_cpu_values = {}
 
-            for df in df_list:
-                cpu_by_time = df.groupby('Time_Step')['CPU'].mean()
-                for time_step, cpu_val in cpu_by_time.items():
-                    if time_step not in time_cpu_values:
-                        time_cpu_values[time_step] = []
-                    time_cpu_values[time_step].append(cpu_val)
+def split_aggregated(aggregated, monitor_data, metric):
+    """
+    把聚合长表拆回 {dataset: {slowstart: DataFrame(Time_Step(秒), 指标均值)}}
+    metric 可以是单个指标名，也可以是指标列表（每个指标一列）
+    """
+    import pandas as pd
 
-            averaged_records = []
-            for time_step in sorted(time_cpu_values.keys()):
-                avg_cpu = np.mean(time_cpu_values[time_step])
-                averaged_records.append({
-                    'Time_Step': time_step * SAMPLING_INTERVAL,  # ← 修改这一行
-                    'CPU': avg_cpu
-                })
+    metrics = [metric] if isinstance(metric, str) else list(metric)
+    averaged_data = {dataset: {} for dataset in monitor_data}
+    if aggregated.empty:
+        return averaged_data
 
-            if averaged_records:
-                averaged_data[dataset][slowstart] = pd.DataFrame(averaged_records)
+    for (dataset, slowstart), group in aggregated.groupby(['Dataset', 'SlowStart'], sort=False):
+        columns = {'Time_Step': group['Time_Step'].to_numpy() * SAMPLING_INTERVAL}
+        for name in metrics:
+            columns[name] = group[f'{name}_mean'].to_numpy()
+        averaged_data[dataset][slowstart] = pd.DataFrame(columns)
 
+    # 保持与输入相同的 slowstart 顺序
+    for dataset, ss_dict in monitor_data.items():
+        averaged_data[dataset] = {ss: averaged_data[dataset][ss]
+                                  for ss in ss_dict if ss in averaged_data[dataset]}
     return averaged_data
 
-def average_monitor_data_mem(monitor_data):
+
+@profiling.timed('average_monitor', rows=count_groups)
+def average_monitor_metrics(monitor_data, metrics=('CPU', 'MEM'),
+                            message='  平均化 {dataset} SS:{slowstart} - {n} 轮数据'):
     """
-    将多轮 monitor 数据平均（MEM）
+    将多轮 monitor 数据的多个指标一次平均
+    monitor_data 可以是嵌套字典，也可以是 pack_monitor_data 打包的 MonitorStore
+    返回 {dataset: {slowstart: DataFrame(Time_Step(秒), 各指标均值)}}，CPU 和 MEM 图可共用同一份结果
     """
-    averaged_data = {}
+    if not isinstance(monitor_data, dict):
+        from monitor_store import average_store
+        return average_store(monitor_data, metrics, SAMPLING_INTERVAL, message)
 
     for dataset, ss_dict in monitor_data.items():
-        averaged_data[dataset] = {}
-
         for slowstart, df_list in ss_dict.items():
-            if not df_list:
-                continue
+            if df_list:
+                print(message.format(dataset=dataset, slowstart=slowstart, n=len(df_list)))
 
-            print(f"  平均化内存数据 {dataset} SS:{slowstart} - {len(df_list)} 轮")
+    # 先把每次运行插值到公共的秒级网格，再跨轮聚合
+    metrics = list(metrics)
+    resampled = resample_monitor_data(monitor_data, SAMPLING_INTERVAL, metrics=metrics)
+    aggregated = aggregate_monitor_runs(resampled, metrics=metrics)
+    return split_aggregated(aggregated, monitor_data, metrics)
 
-            time_mem_values = {}
 
-            for df in df_list:
-                mem_by_time = df.groupby('Time_Step')['MEM'].mean()
-                for time_step, mem_val in mem_by_time.items():
-                    if time_step not in time_mem_values:
-                        time_mem_values[time_step] = []
-                    time_mem_values[time_step].append(mem_val)
-
-            averaged_records = []
-            for time_step in sorted(time_mem_values.keys()):
-                avg_mem = np.mean(time_mem_values[time_step])
-                averaged_records.append({
-                    'Time_Step': time_step,
-                    'MEM': avg_mem
-                })
+def average_monitor_data(monitor_data):
+    """
+    将多轮 monitor 数据平均（CPU）
+    """
+    return average_monitor_metrics(monitor_data, ['CPU'], '  平均化 {dataset} SS:{slowstart} - {n} 轮数据')
 
-            if averaged_records:
-                averaged_data[dataset][slowstart] = pd.DataFrame(averaged_records)
 
-    return averaged_data
+def average_monitor_data_mem(monitor_data):
+    """
+    将多轮 monitor 数据平均（MEM）
+    """
+    return average_monitor_metrics(monitor_data, ['MEM'], '  平均化内存数据 {dataset} SS:{slowstart} - {n} 轮')
 
 
+@profiling.timed('average_stages', rows=count_groups)
 def average_stage_data(stage_data):
     """
     将多轮 stage 数据平均
@@ -334,10 +1026,13 @@ def average_stage_data(stage_data):
 
             print(f"  平均化阶段数据 {dataset} SS:{slowstart} - {len(stage_list)} 轮")
 
+            # 取所有轮次键的并集，部分轮次缺少计数器时不影响其它列
+            keys = dict.fromkeys(key for stage in stage_list for key in stage)
+
             avg_stage = {}
-            for key in stage_list[0].keys():
+            for key in keys:
                 values = [stage[key] for stage in stage_list if key in stage]
-                avg_stage[key] = np.mean(values) if values else 0.0
+                avg_stage[key] = sum(values) / len(values) if values else 0.0
 
             averaged_stages[dataset][slowstart] = avg_stage
 
@@ -353,13 +1048,214 @@ def sort_dataset_key(name):
     return v
 
 
+# 跟踪模式下滚动窗口包含的时间步数
+FOLLOW_WINDOW_STEPS = 30
+
+
+class LogTail:
+    """跟踪一个不断追加的日志文件：记录已读的字节偏移，每次只读取新增的完整行"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self._partial = b''
+
+    def read_lines(self):
+        """返回上次读取之后新写入的完整行（末尾不完整的行留到下次）"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+
+        if size < self.offset:
+            # 文件被截断或重新创建，从头读
+            self.offset = 0
+            self._partial = b''
+        if size == self.offset:
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        return [line.decode('utf-8', 'ignore') for line in lines]
+
+
+class RunFollower:
+    """
+    运行中实验的增量分析：跟踪 monitor.log 和 job_output.log，只解析新追加的行
+    维护作业进度（map% / reduce% / 当前重叠）和集群 CPU / MEM 的累计及滚动窗口统计，
+    每次 update 的开销只与两次更新之间新写入的行数有关
+    """
+
+    def __init__(self, run_path, window=FOLLOW_WINDOW_STEPS):
+        self.run_path = run_path
+        self.monitor_tail = LogTail(os.path.join(run_path, 'monitor.log'))
+        self.job_tail = LogTail(os.path.join(run_path, 'job_output.log'))
+
+        # monitor：当前时间步的节点采样、最近 window 步的集群均值、累计值
+        self.step_samples = []
+        self.recent = collections.deque(maxlen=window)
+        self.steps = 0
+        self.cpu_sum = 0.0
+        self.mem_sum = 0.0
+        self.cpu_peak = 0.0
+        self.monitor_done = False
+
+        # job：最新进度及各阶段的关键时刻
+        self.map_pct = 0
+        self.reduce_pct = 0
+        self.job_start = None
+        self.last_progress = None
+        self.reduce_start = None
+        self.map_done = None
+        self.job_result = None
+
+    def _close_step(self):
+        if not self.step_samples:
+            return
+        cpu = sum(s[0] for s in self.step_samples) / len(self.step_samples)
+        mem = sum(s[1] for s in self.step_samples) / len(self.step_samples)
+        self.recent.append((cpu, mem))
+        self.steps += 1
+        self.cpu_sum += cpu
+        self.mem_sum += mem
+        self.cpu_peak = max(self.cpu_peak, cpu)
+        self.step_samples = []
+
+    def _feed_monitor(self, lines):
+        for line in lines:
+            if '----' in line:
+                self._close_step()
+            elif 'Job Finished' in line:
+                self._close_step()
+                self.monitor_done = True
+            else:
+                match = MONITOR_LINE_PATTERN.match(line)
+                if match:
+                    self.step_samples.append((float(match.group(4)), int(match.group(5))))
+
+    def _feed_job(self, lines):
+        for line in lines:
+            match = JOB_PROGRESS_PATTERN.search(line)
+            if match:
+                t = datetime.datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S')
+                t += datetime.timedelta(milliseconds=int(match.group(2)))
+                self.map_pct, self.reduce_pct = int(match.group(3)), int(match.group(4))
+                self.job_start = self.job_start or t
+                self.last_progress = t
+                if self.reduce_pct > 0 and self.reduce_start is None:
+                    self.reduce_start = t
+                if self.map_pct >= 100 and self.map_done is None:
+                    self.map_done = t
+                continue
+
+            done = JOB_DONE_PATTERN.search(line)
+            if done:
+                self.job_result = done.group(1)
+
+    def update(self):
+        """读取两个日志的新增内容，返回当前的快照字典"""
+        self._feed_monitor(self.monitor_tail.read_lines())
+        self._feed_job(self.job_tail.read_lines())
+        return self.snapshot()
+
+    def snapshot(self):
+        snap = {
+            'Map(%)': self.map_pct,
+            'Reduce(%)': self.reduce_pct,
+            '已运行(s)': 0.0,
+            '重叠(s)': 0.0,
+            '重叠比(%)': 0.0,
+            '时间步': self.steps,
+            '结束': self.job_result is not None or self.monitor_done,
+        }
+        if self.job_start is not None:
+            snap['已运行(s)'] = round((self.last_progress - self.job_start).total_seconds(), 1)
+
+        # Reduce 启动后与 Map 并行的时长；占 Reduce 已运行时长的比例即当前重叠比
+        if self.reduce_start is not None:
+            overlap_end = self.map_done or self.last_progress
+            overlap = max(0.0, (overlap_end - self.reduce_start).total_seconds())
+            reduce_running = (self.last_progress - self.reduce_start).total_seconds()
+            snap['重叠(s)'] = round(overlap, 1)
+            snap['重叠比(%)'] = round(overlap / reduce_running * 100, 1) if reduce_running > 0 else 0.0
+
+        if self.recent:
+            cpu, mem = self.recent[-1]
+            window = len(self.recent)
+            snap.update({
+                'CPU(%)': round(cpu, 2),
+                'CPU窗口均值(%)': round(sum(c for c, _ in self.recent) / window, 2),
+                'CPU均值(%)': round(self.cpu_sum / self.steps, 2),
+                'CPU峰值(%)': round(self.cpu_peak, 2),
+                'MEM(%)': round(mem, 2),
+                'MEM窗口均值(%)': round(sum(m for _, m in self.recent) / window, 2),
+                'MEM均值(%)': round(self.mem_sum / self.steps, 2),
+            })
+        return snap
+
+
+def format_follow_snapshot(snap):
+    """把 RunFollower 快照格式化为一行状态"""
+    line = (f"[{snap['已运行(s)']:>7.1f}s] map {snap['Map(%)']:>3d}% reduce {snap['Reduce(%)']:>3d}%"
+            f" | 重叠 {snap['重叠(s)']:.1f}s ({snap['重叠比(%)']:.1f}%)")
+    if 'CPU(%)' in snap:
+        line += (f" | CPU {snap['CPU(%)']:.1f}% (窗口 {snap['CPU窗口均值(%)']:.1f}%, 均值 {snap['CPU均值(%)']:.1f}%)"
+                 f" | MEM {snap['MEM(%)']:.1f}% (窗口 {snap['MEM窗口均值(%)']:.1f}%)")
+    return line
+
+
+def find_latest_run(base_dir='./MapReduceLog'):
+    """实验目录下最近修改的运行目录，没有时返回 None"""
+    run_paths = [p for _, _, paths in discover_runs(base_dir) for p in paths]
+    return max(run_paths, key=os.path.getmtime) if run_paths else None
+
+
+def follow_run(run_path, interval=5.0, window=FOLLOW_WINDOW_STEPS, max_updates=None):
+    """
+    跟踪一次正在进行的运行，每 interval 秒输出一行状态，作业结束后返回最后的快照
+    max_updates 限制更新次数（None 为直到作业结束或 Ctrl-C）
+    """
+    follower = RunFollower(run_path, window)
+    print(f"跟踪运行: {run_path}")
+
+    snap = None
+    updates = 0
+    try:
+        while True:
+            snap = follower.update()
+            print(format_follow_snapshot(snap), flush=True)
+            updates += 1
+            if snap['结束'] or (max_updates is not None and updates >= max_updates):
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+    if follower.job_result:
+        print(f"作业结束: {follower.job_result}")
+    return snap
+
+
 if __name__ == '__main__':
     print(" common_utils.py 加载成功")
     print("可用函数:")
     print("  - scan_multiple_runs")
+    print("  - aggregate_monitor_runs")
     print("  - average_monitor_data")
     print("  - average_monitor_data_mem")
+    print("  - average_monitor_metrics")
     print("  - average_stage_data")
     print("  - parse_monitor_log")
+    print("  - summarize_monitor_log")
     print("  - parse_job_stages")
+    print("  - parse_job_progress")
+    print("  - parse_job_counters")
+    print("  - align_monitor_with_progress")
+    print("  - resample_monitor_data")
     print("  - sort_dataset_key")
+    print("  - follow_run / RunFollower")
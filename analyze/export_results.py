@@ -0,0 +1,314 @@
+import os
+
+import profiling
+from common_utils import (scan_multiple_runs, average_monitor_data,
+                          average_stage_data, sort_dataset_key)
+
+
+# (CSV 列名, stage 字典中的键, 最优方向, 透视表文件名)；Avg_CPU 来自 monitor 数据
+RESULT_METRICS = [
+    ('Total_Time(s)', '总耗时(s)', 'min', 'result_time.csv'),
+    ('Avg_CPU(%)', None, 'max', 'result_cpu.csv'),
+    ('Map_Time(s)', 'Map耗时(s)', 'min', 'result_map.csv'),
+    ('Shuffle_Time(s)', 'Shuffle耗时(s)', 'min', 'result_shuffle.csv'),
+    ('Reduce_Time(s)', 'Reduce耗时(s)', 'min', 'result_reduce.csv'),
+    # Sort 耗时只有带 .jhist 的运行才有
+    ('Sort_Time(s)', 'Sort耗时(s)', 'min', 'result_sort.csv'),
+    ('Overlap_Ratio(%)', 'Shuffle重叠比(%)', 'max', 'result_overlap.csv'),
+    # 以下来自作业计数器
+    ('Shuffle_Bytes(MB)', 'Shuffle字节数(B)', 'min', None),
+    ('Shuffle_Rate(MB/s)', 'Shuffle吞吐(MB/s)', 'max', 'result_shuffle_rate.csv'),
+    ('Spilled_Records', 'Spill记录数', 'min', 'result_spill.csv'),
+    ('GC_Ratio(%)', 'GC占比(%)', 'min', 'result_gc.csv'),
+]
+# 计数器列：多轮均值取整后按整数写出，不套用两位小数的格式
+COUNT_COLUMNS = ('Spilled_Records',)
+BYTES_PER_MB = 1024 * 1024
+# 列式导出的格式及扩展名（需要 pyarrow）
+COLUMNAR_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def import_pyarrow():
+    """按需加载 pyarrow；未安装时给出明确提示（只导出 CSV 时不需要）"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("列式导出需要 pyarrow，请先 pip install pyarrow（不加 --columnar 时只导出 CSV）") from None
+    return pyarrow
+
+
+@profiling.timed('build_result_table', rows=len)
+def build_result_table(averaged_stages, averaged_cpu=None):
+    """把平均后的阶段数据（及 CPU 曲线）整理成 result_raw.csv 的长表"""
+    import pandas as pd
+
+    averaged_cpu = averaged_cpu or {}
+    rows = []
+
+    datasets = set(averaged_stages) | set(averaged_cpu)
+    for dataset in sorted(datasets, key=sort_dataset_key):
+        stage_dict = averaged_stages.get(dataset, {})
+        cpu_dict = averaged_cpu.get(dataset, {})
+
+        for slowstart in sorted(set(stage_dict) | set(cpu_dict)):
+            stage = stage_dict.get(slowstart, {})
+            row = {'Dataset': dataset, 'SlowStart': slowstart}
+
+            for column, key, _, _ in RESULT_METRICS:
+                if key is None:
+                    cpu_df = cpu_dict.get(slowstart)
+                    row[column] = cpu_df['CPU'].mean() if cpu_df is not None else None
+                elif key.endswith('(B)'):
+                    row[column] = stage[key] / BYTES_PER_MB if key in stage else None
+                else:
+                    row[column] = stage.get(key)
+
+            rows.append(row)
+
+    columns = ['Dataset', 'SlowStart'] + [m[0] for m in RESULT_METRICS]
+    raw = pd.DataFrame(rows, columns=columns)
+    # 旧数据没有计数器时不输出空列
+    return raw.dropna(axis=1, how='all')
+
+
+def best_slowstart(pivot, direction):
+    """每个数据集的最优 slowstart（按两位小数比较，并列时以逗号连接）"""
+    rounded = pivot.round(2)
+    target = rounded.min(axis=1) if direction == 'min' else rounded.max(axis=1)
+    best = []
+    for dataset, row in rounded.iterrows():
+        hits = [str(ss) for ss, value in row.items() if value == target[dataset]]
+        best.append(','.join(hits))
+    return best
+
+
+def round_counts(df, columns):
+    """把 df 中的指定列取整为可空整数类型（Int64），缺失值保持为空"""
+    columns = [c for c in columns if c in df]
+    if not columns:
+        return df
+    df = df.copy()
+    for column in columns:
+        df[column] = df[column].astype('Float64').round().astype('Int64')
+    return df
+
+
+@profiling.timed('write_result_csvs')
+def write_result_csvs(raw, output_dir='Analysis_Results'):
+    """写出 result_raw.csv 以及每个指标一张 数据集 x slowstart 的透视表"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    raw_path = os.path.join(output_dir, 'result_raw.csv')
+    round_counts(raw, COUNT_COLUMNS).to_csv(raw_path, index=False, float_format='%.2f')
+    print(f"  已保存: {raw_path}")
+
+    for column, _, direction, filename in RESULT_METRICS:
+        if filename is None or column not in raw:
+            continue
+
+        pivot = raw.pivot(index='Dataset', columns='SlowStart', values=column)
+        pivot = pivot.reindex(raw['Dataset'].drop_duplicates())
+        best = best_slowstart(pivot, direction)
+        if column in COUNT_COLUMNS:
+            pivot = round_counts(pivot, pivot.columns)
+        pivot['Best_SlowStart'] = best
+
+        path = os.path.join(output_dir, filename)
+        pivot.to_csv(path, float_format='%.2f')
+        print(f"  已保存: {path}")
+
+
+def per_run_metrics(stage_data):
+    """把每轮的 stage 字典换成 RESULT_METRICS 的列名（字节换算为 MB），供 run_stats 统计"""
+    renamed = {}
+    for dataset, ss_dict in stage_data.items():
+        renamed[dataset] = {}
+        for slowstart, stage_list in ss_dict.items():
+            runs = []
+            for stage in stage_list:
+                run = {}
+                for column, key, _, _ in RESULT_METRICS:
+                    if key is None or key not in stage:
+                        continue
+                    run[column] = stage[key] / BYTES_PER_MB if key.endswith('(B)') else stage[key]
+                runs.append(run)
+            renamed[dataset][slowstart] = runs
+    return renamed
+
+
+@profiling.timed('build_run_table', rows=len)
+def build_run_table(stage_data):
+    """每次运行一行的长表：Dataset, SlowStart, Run 以及 RESULT_METRICS 中的阶段 / 计数器指标"""
+    import pandas as pd
+
+    renamed = per_run_metrics(stage_data)
+    rows = []
+    for dataset in sorted(renamed, key=sort_dataset_key):
+        for slowstart in sorted(renamed[dataset]):
+            for run_idx, run in enumerate(renamed[dataset][slowstart], 1):
+                rows.append({'Dataset': dataset, 'SlowStart': slowstart, 'Run': run_idx, **run})
+
+    columns = ['Dataset', 'SlowStart', 'Run'] + [m[0] for m in RESULT_METRICS if m[1] is not None]
+    return pd.DataFrame(rows, columns=columns).dropna(axis=1, how='all')
+
+
+@profiling.timed('build_best_table', rows=len)
+def build_best_table(raw):
+    """
+    每个指标按各轮简单均值的最优 slowstart 长表 (Dataset, Metric, SlowStart, Value)，并列时每个 slowstart 一行
+    与透视表的 Best_SlowStart 一样按两位小数比较；写出为 result_best_mean，
+    与 result_best.csv（剔除离群后按 bootstrap 检验的最优，见 write_stats_csvs）是不同的口径
+    """
+    import pandas as pd
+
+    parts = []
+    for column, _, direction, _ in RESULT_METRICS:
+        if column not in raw:
+            continue
+        rounded = raw[column].round(2)
+        target = rounded.groupby(raw['Dataset'], sort=False).transform(direction)
+        hits = raw.loc[rounded == target, ['Dataset', 'SlowStart', column]]
+        hits = hits.rename(columns={column: 'Value'})
+        hits.insert(1, 'Metric', column)
+        parts.append(hits)
+
+    columns = ['Dataset', 'Metric', 'SlowStart', 'Value']
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(parts, ignore_index=True)[columns]
+
+
+@profiling.timed('write_columnar')
+def write_columnar(tables, output_dir='Analysis_Results', fmt='parquet'):
+    """
+    把 {表名: DataFrame} 写成 result_<表名>.parquet 或 .arrow（Arrow IPC / Feather v2），返回 {表名: 路径}
+    Arrow 文件不压缩，读取时可直接 memory-map
+    """
+    pa = import_pyarrow()
+    os.makedirs(output_dir, exist_ok=True)
+
+    paths = {}
+    for name, df in tables.items():
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        path = os.path.join(output_dir, f'result_{name}{COLUMNAR_FORMATS[fmt]}')
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, path)
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, path, compression='uncompressed')
+        print(f"  已保存: {path}")
+        paths[name] = path
+    return paths
+
+
+def read_columnar(path, columns=None):
+    """读回 write_columnar 写出的表，columns 给出时只读这些列；两种格式都以 memory-map 方式打开"""
+    import_pyarrow()
+    if path.endswith(COLUMNAR_FORMATS['parquet']):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+@profiling.timed('write_stats_csvs')
+def write_stats_csvs(stage_data, output_dir='Analysis_Results'):
+    """
+    写出 result_stats.csv（每个 数据集 x slowstart x 指标 的均值 / 中位数 / 置信区间 / 离群值）
+    和 result_best.csv（每个指标的最优 slowstart 及其相对次优的显著性）
+
+    result_best.csv 的 Robust_Best_SlowStart 按剔除离群后的均值选出（select_best），
+    Mean_Best_SlowStart 则与透视表的 Best_SlowStart 相同，按所有轮次的简单均值选出；
+    两者不同说明结论取决于被剔除的离群轮次，会逐条提示
+    """
+    import pandas as pd
+    from run_stats import run_statistics, select_best
+
+    metrics = [m[0] for m in RESULT_METRICS if m[1] is not None]
+    stats, boot = run_statistics(per_run_metrics(stage_data), metrics)
+    if stats.empty:
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    order = {dataset: i for i, dataset in enumerate(sorted(stats['Dataset'].unique(), key=sort_dataset_key))}
+    stats_path = os.path.join(output_dir, 'result_stats.csv')
+    stats.sort_values(['Dataset', 'SlowStart'], key=lambda s: s.map(order) if s.name == 'Dataset' else s,
+                      kind='stable').to_csv(stats_path, index=False, float_format='%.2f')
+    print(f"  已保存: {stats_path}")
+
+    best = pd.concat([select_best(stats, boot, column, direction)
+                      for column, key, direction, _ in RESULT_METRICS
+                      if key is not None and column in set(stats['Metric'])], ignore_index=True)
+    best = best.sort_values('Dataset', key=lambda s: s.map(order), kind='stable')
+    directions = {column: direction for column, _, direction, _ in RESULT_METRICS}
+    mean_best = {}
+    for metric, group in stats.groupby('Metric', sort=False):
+        pivot = group.pivot(index='Dataset', columns='SlowStart', values='Mean_All')
+        for dataset, value in zip(pivot.index, best_slowstart(pivot, directions[metric])):
+            mean_best[(dataset, metric)] = value
+    best.insert(4, 'Mean_Best_SlowStart', [mean_best[key] for key in zip(best['Dataset'], best['Metric'])])
+    best = best.rename(columns={'Best_SlowStart': 'Robust_Best_SlowStart', 'Best_Mean': 'Robust_Best_Mean'})
+    best_path = os.path.join(output_dir, 'result_best.csv')
+    best.to_csv(best_path, index=False, float_format='%.2f')
+    print(f"  已保存: {best_path}")
+
+    # 均值完全相同（如数据量、Spill 记录数）的并列不提示
+    unclear = best[~best['Significant'] & best['Runner_Up'].notna()
+                   & (best['Robust_Best_Mean'] != best['Runner_Up_Mean'])]
+    for _, row in unclear.iterrows():
+        print(f"  [提示] {row['Dataset']} {row['Metric']}: SlowStart {row['Robust_Best_SlowStart']} 与 "
+              f"{row['Runner_Up']} 差异不显著（P={row['P_Better']:.2f}），需要更多轮次")
+
+    differ = best[[str(ss) not in str(mean).split(',')
+                   for ss, mean in zip(best['Robust_Best_SlowStart'], best['Mean_Best_SlowStart'])]]
+    for _, row in differ.iterrows():
+        print(f"  [提示] {row['Dataset']} {row['Metric']}: 剔除离群后最优为 SlowStart {row['Robust_Best_SlowStart']}，"
+              f"按简单均值（透视表 Best_SlowStart）为 {row['Mean_Best_SlowStart']}")
+
+
+def main(base_dir='./MapReduceLog', output_dir='Analysis_Results', columnar=None, csv=True,
+         **scan_options):
+    """
+    columnar 为 'parquet' / 'arrow' 时另外写出 result_runs（每次运行）、result_summary（平均值）、
+    result_best_mean（各指标按简单均值的最优 slowstart）三张列式表，透视表 CSV 由读回的 result_summary 生成
+    """
+    if columnar:
+        # 扫描前就检查，避免解析完才发现缺少 pyarrow
+        import_pyarrow()
+
+    print("=" * 60)
+    print("实验结果汇总导出")
+    print("=" * 60)
+
+    print("\n1. 扫描多轮实验数据...")
+    monitor_data, stage_data = scan_multiple_runs(
+        base_dir, packed=not scan_options.get('chunked'), **scan_options)
+
+    if not stage_data:
+        print("未找到实验数据")
+        return
+
+    print("\n2. 计算平均值...")
+    averaged_stages = average_stage_data(stage_data)
+    averaged_cpu = average_monitor_data(monitor_data)
+
+    print("\n3. 导出结果表...")
+    raw = build_result_table(averaged_stages, averaged_cpu)
+    if columnar:
+        paths = write_columnar({'runs': build_run_table(stage_data), 'summary': raw,
+                                'best_mean': build_best_table(raw)}, output_dir, columnar)
+        raw = read_columnar(paths['summary'])
+    if csv:
+        write_result_csvs(raw, output_dir)
+
+    print("\n4. 统计置信区间与最优设置的显著性...")
+    write_stats_csvs(stage_data, output_dir)
+
+    print("\n结果导出完成！")
+
+
+if __name__ == "__main__":
+    main()
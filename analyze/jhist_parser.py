@@ -0,0 +1,228 @@
+import os
+import re
+import glob
+import json
+import itertools
+
+
+# .jhist 中每行一个事件：{"type": "...", "event": {"org.apache.hadoop.mapreduce.jobhistory.Xxx": {...}}}
+ATTEMPT_STARTED = ('MAP_ATTEMPT_STARTED', 'REDUCE_ATTEMPT_STARTED')
+ATTEMPT_FINISHED = ('MAP_ATTEMPT_FINISHED', 'REDUCE_ATTEMPT_FINISHED')
+ATTEMPT_UNSUCCESSFUL = ('MAP_ATTEMPT_FAILED', 'MAP_ATTEMPT_KILLED',
+                        'REDUCE_ATTEMPT_FAILED', 'REDUCE_ATTEMPT_KILLED')
+JOB_EVENTS = ('JOB_SUBMITTED', 'JOB_INITED', 'JOB_FINISHED',
+              'JOB_FAILED', 'JOB_KILLED', 'JOB_UNSUCCESSFUL_COMPLETION')
+WANTED_EVENTS = frozenset(ATTEMPT_STARTED + ATTEMPT_FINISHED + ATTEMPT_UNSUCCESSFUL + JOB_EVENTS)
+
+# .jhist 第一行为格式标记
+BINARY_HEADER = 'Avro-Binary'
+
+EVENT_TYPE_PATTERN = re.compile(r'"type"\s*:\s*"(\w+)"')
+
+# 任务表的列；时间均为毫秒时间戳，缺失记为 -1
+TASK_COLUMNS = ('Attempt', 'Task', 'Type', 'Status', 'Host',
+                'Start', 'Finish', 'Map_Finish', 'Shuffle_Finish', 'Sort_Finish')
+
+
+def find_jhist(run_path):
+    """运行目录下的 .jhist 文件，没有时返回 None"""
+    paths = sorted(glob.glob(os.path.join(run_path, '*.jhist')))
+    return paths[0] if paths else None
+
+
+def iter_jhist_events(jhist_path):
+    """
+    流式读取 .jhist（Avro-Json），逐个产出 (事件类型, 事件内容)，只解析关心的事件
+    Avro-Binary 格式（Hadoop 的默认格式）无法解析，打印警告后不产出任何事件
+    """
+    with open(jhist_path, 'r', encoding='utf-8', errors='ignore') as f:
+        header = f.readline().strip()
+        if header == BINARY_HEADER:
+            print(f"  警告: {jhist_path} 是 Avro-Binary 格式，只支持 Avro-Json"
+                  f"（提交作业时加 -D mapreduce.jobhistory.jhist.format=json）")
+            return
+
+        for line in itertools.chain([header], f):
+            # 跳过文件头 "Avro-Json"、schema 行，以及不关心的事件（不必 json 解析）
+            match = EVENT_TYPE_PATTERN.search(line, 0, 64)
+            if not match or match.group(1) not in WANTED_EVENTS:
+                continue
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+
+            event = record.get('event')
+            if not isinstance(event, dict) or not event:
+                continue
+            yield record['type'], next(iter(event.values()))
+
+
+def _unwrap(value):
+    """Avro-Json 中可空字段编码为 {"string": "..."}，取出其中的值"""
+    if isinstance(value, dict):
+        return next(iter(value.values()), None)
+    return value
+
+
+def parse_jhist(jhist_path):
+    """
+    解析作业历史文件
+    返回 (tasks, job)：tasks 为每个 task attempt 一行的列式 DataFrame，
+    job 为 {'submit', 'launch', 'finish'} 毫秒时间戳
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = {name: [] for name in TASK_COLUMNS}
+    index = {}
+    job = {'submit': -1, 'launch': -1, 'finish': -1}
+
+    def row_of(attempt, task, task_type):
+        i = index.get(attempt)
+        if i is None:
+            i = index[attempt] = len(columns['Attempt'])
+            columns['Attempt'].append(attempt)
+            columns['Task'].append(task)
+            columns['Type'].append(task_type)
+            columns['Status'].append('RUNNING')
+            columns['Host'].append('')
+            for name in TASK_COLUMNS[5:]:
+                columns[name].append(-1)
+        return i
+
+    for event_type, e in iter_jhist_events(jhist_path):
+        if event_type in ATTEMPT_STARTED:
+            i = row_of(e['attemptId'], e['taskid'], e['taskType'])
+            columns['Start'][i] = e['startTime']
+            columns['Host'][i] = _unwrap(e.get('trackerName')) or ''
+        elif event_type in ATTEMPT_FINISHED:
+            i = row_of(e['attemptId'], e['taskid'], e['taskType'])
+            columns['Status'][i] = _unwrap(e.get('taskStatus')) or 'SUCCEEDED'
+            columns['Finish'][i] = e['finishTime']
+            columns['Host'][i] = _unwrap(e.get('hostname')) or columns['Host'][i]
+            if event_type == 'MAP_ATTEMPT_FINISHED':
+                columns['Map_Finish'][i] = e.get('mapFinishTime', -1)
+            else:
+                columns['Shuffle_Finish'][i] = e.get('shuffleFinishTime', -1)
+                columns['Sort_Finish'][i] = e.get('sortFinishTime', -1)
+        elif event_type in ATTEMPT_UNSUCCESSFUL:
+            i = row_of(e['attemptId'], e['taskid'], e['taskType'])
+            columns['Status'][i] = _unwrap(e.get('status')) or event_type.rsplit('_', 1)[-1]
+            columns['Finish'][i] = e['finishTime']
+        elif event_type == 'JOB_SUBMITTED':
+            job['submit'] = e.get('submitTime', -1)
+        elif event_type == 'JOB_INITED':
+            job['launch'] = e.get('launchTime', -1)
+        else:
+            job['finish'] = e.get('finishTime', -1)
+
+    tasks = pd.DataFrame({
+        'Attempt': columns['Attempt'],
+        'Task': columns['Task'],
+        'Type': pd.Categorical(columns['Type'], categories=['MAP', 'REDUCE']),
+        'Status': pd.Categorical(columns['Status']),
+        'Host': pd.Categorical(columns['Host']),
+        **{name: np.asarray(columns[name], dtype=np.int64) for name in TASK_COLUMNS[5:]}
+    })
+    return tasks, job
+
+
+def jhist_phase_metrics(tasks, job):
+    """
+    由 task attempt 时间计算精确的阶段耗时，键与 parse_job_stages 一致，另加 Sort耗时(s)
+    没有成功的 Map，或缺少作业 / Reduce 的启动时间时返回 None
+    Map: 作业启动 ~ 最后一个 Map 完成；Shuffle: 第一个 Reduce 启动 ~ 最后一次 Shuffle 完成；
+    Sort: Shuffle 完成 ~ 最后一次 Sort 完成；Reduce: Sort 完成 ~ 最后一个 Reduce 完成
+    """
+    ok = tasks[tasks['Status'] == 'SUCCEEDED']
+    maps = ok[ok['Type'] == 'MAP']
+    reduces = ok[ok['Type'] == 'REDUCE']
+    if maps.empty:
+        return None
+
+    # 没有作业启动时间也没有任何有效的启动时间时无法确定起点
+    starts = tasks['Start'].to_numpy()
+    starts = starts[starts > 0]
+    if job['launch'] <= 0 and starts.size == 0:
+        return None
+    t0 = job['launch'] if job['launch'] > 0 else starts.min()
+    t_map_done = maps['Finish'].max()
+    t_job_done = job['finish'] if job['finish'] > 0 else ok['Finish'].max()
+
+    if reduces.empty:
+        t_shuf_start = t_shuf_end = t_sort_end = t_red_done = t_map_done
+    else:
+        reduce_starts = tasks.loc[tasks['Type'] == 'REDUCE', 'Start'].to_numpy()
+        reduce_starts = reduce_starts[reduce_starts > 0]
+        if reduce_starts.size == 0:
+            return None
+        t_shuf_start = reduce_starts.min()
+        t_shuf_end = reduces['Shuffle_Finish'].max()
+        t_sort_end = reduces['Sort_Finish'].max()
+        t_red_done = reduces['Finish'].max()
+
+    shuffle_duration = max(0, t_shuf_end - t_shuf_start) / 1000
+    if shuffle_duration > 0:
+        overlap = max(0, min(t_map_done, t_shuf_end) - max(t0, t_shuf_start)) / 1000
+        overlap_ratio = overlap / shuffle_duration * 100.0
+    else:
+        overlap_ratio = 0.0
+
+    return {
+        'Map耗时(s)': round(float(t_map_done - t0) / 1000, 2),
+        'Shuffle耗时(s)': round(float(shuffle_duration), 2),
+        'Sort耗时(s)': round(float(max(0, t_sort_end - t_shuf_end)) / 1000, 2),
+        'Reduce耗时(s)': round(float(max(0, t_red_done - t_sort_end)) / 1000, 2),
+        '总耗时(s)': round(float(t_job_done - t0) / 1000, 2),
+        'Shuffle重叠比(%)': round(float(overlap_ratio), 2)
+    }
+
+
+def task_concurrency(tasks, step_ms=1000, origin=None):
+    """
+    每种任务类型同时运行的 attempt 数随时间的变化
+    返回 DataFrame(Time(s), Running_MAP, Running_REDUCE)，Time 为距 origin（默认最早启动）的秒数
+    """
+    import numpy as np
+    import pandas as pd
+
+    valid = tasks[(tasks['Start'] > 0) & (tasks['Finish'] >= tasks['Start'])]
+    if valid.empty:
+        return pd.DataFrame(columns=['Time(s)', 'Running_MAP', 'Running_REDUCE'])
+
+    origin = valid['Start'].min() if origin is None else origin
+    end = valid['Finish'].max()
+    grid = np.arange(origin, end + step_ms, step_ms)
+
+    curves = {'Time(s)': (grid - origin) / 1000}
+    for task_type in ('MAP', 'REDUCE'):
+        sub = valid[valid['Type'] == task_type]
+        starts = np.sort(sub['Start'].to_numpy())
+        finishes = np.sort(sub['Finish'].to_numpy())
+        # t 时刻运行中的数量 = 已启动数 - 已结束数
+        curves[f'Running_{task_type}'] = (np.searchsorted(starts, grid, side='right')
+                                          - np.searchsorted(finishes, grid, side='right'))
+    return pd.DataFrame(curves)
+
+
+def run_task_concurrency(run_path, step_ms=1000):
+    """
+    运行目录下 .jhist 的任务并发曲线，Time 从作业启动（JOB_INITED）算起
+    没有 .jhist 时返回 None
+    """
+    jhist_path = find_jhist(run_path)
+    if jhist_path is None:
+        return None
+    tasks, job = parse_jhist(jhist_path)
+    return task_concurrency(tasks, step_ms, origin=job['launch'] if job['launch'] > 0 else None)
+
+
+def parse_run_jhist(run_path):
+    """解析运行目录下的 .jhist，返回阶段耗时字典；没有 .jhist 或无法解析时返回 None"""
+    jhist_path = find_jhist(run_path)
+    if jhist_path is None:
+        return None
+    tasks, job = parse_jhist(jhist_path)
+    return jhist_phase_metrics(tasks, job) if not tasks.empty else None
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+monitor_real.py --format binary 写出的定长二进制采样文件（monitor.bin）
+
+文件布局（小端）：
+    文件头  HEADER_DTYPE，40 字节：魔数、版本、节点数、启动 / 结束时刻（Unix 秒，结束前为 0）、
+            采集端的 UTC 偏移（秒），用于还原与 job_output.log 一致的本地时间
+    节点表  节点数 x NODE_NAME_BYTES 字节，UTF-8，以 \\0 填充
+    采样    SAMPLE_DTYPE，每条 20 字节，按时间步、节点下标排序
+
+采样区可以直接 np.memmap；进程被杀时末尾不完整的记录会被忽略。布局须与 wheel/monitor_real.py
+中的 HEADER / RECORD 保持一致。
+
+采样区记录的是采集端的周期序号；读取时按文本格式的规则重新编号（见 text_steps），
+使二进制与转换出的 monitor.log 得到相同的 Time_Step。
+
+    python analyze/monitor_binary.py monitor.bin [monitor.log]     转换为 monitor.log 文本格式
+    python analyze/monitor_binary.py monitor.bin --check           检查二进制读取与转换后的文本解析结果一致
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+
+from common_utils import MONITOR_DTYPES, MONITOR_CHUNK_ROWS
+
+
+MAGIC = b'MRMONBIN'
+VERSION = 1
+NODE_NAME_BYTES = 64
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('nodes', '<u4'),
+                         ('start', '<f8'), ('end', '<f8'), ('utc_offset', '<i4'), ('reserved', '<u4')])
+SAMPLE_DTYPE = np.dtype([('ts', '<f8'), ('step', '<u4'), ('node', '<u2'), ('mem', 'u1'),
+                         ('pad', 'u1'), ('cpu', '<f4')])
+BINARY_NAME = 'monitor.bin'
+
+
+def read_header(path):
+    """读取文件头和节点表，返回字典（含采样区的起始偏移 data_offset）"""
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_DTYPE.itemsize)
+        if len(raw) < HEADER_DTYPE.itemsize:
+            raise ValueError(f"{path} 不是完整的 monitor 二进制文件")
+        header = np.frombuffer(raw, dtype=HEADER_DTYPE)[0]
+        if header['magic'] != MAGIC:
+            raise ValueError(f"{path} 不是 monitor 二进制文件")
+        if header['version'] != VERSION:
+            raise ValueError(f"{path} 的格式版本为 {header['version']}，当前为 {VERSION}")
+        n_nodes = int(header['nodes'])
+        names = f.read(n_nodes * NODE_NAME_BYTES)
+
+    nodes = [names[i * NODE_NAME_BYTES:(i + 1) * NODE_NAME_BYTES].rstrip(b'\0').decode('utf-8')
+             for i in range(n_nodes)]
+    return {
+        'nodes': nodes,
+        'start': float(header['start']),
+        'end': float(header['end']) or None,
+        'utc_offset': int(header['utc_offset']),
+        'data_offset': HEADER_DTYPE.itemsize + n_nodes * NODE_NAME_BYTES,
+    }
+
+
+def open_samples(path):
+    """返回 (文件头, 采样的只读 np.memmap)；没有采样时为长度 0 的数组"""
+    header = read_header(path)
+    count = (os.path.getsize(path) - header['data_offset']) // SAMPLE_DTYPE.itemsize
+    if count <= 0:
+        return header, np.zeros(0, dtype=SAMPLE_DTYPE)
+    return header, np.memmap(path, dtype=SAMPLE_DTYPE, mode='r', offset=header['data_offset'],
+                             shape=(count,))
+
+
+def local_times(ts, utc_offset):
+    """Unix 秒转为采集端本地时间的 datetime64[ms]（不带时区，与文本日志中的时间戳一致）"""
+    return np.floor((np.asarray(ts, dtype=np.float64) + utc_offset) * 1000).astype(np.int64).view('datetime64[ms]')
+
+
+def monitor_start(path):
+    """采集启动时间（本地时间，秒级，与 parse_monitor_start 一致）"""
+    import datetime
+
+    header = read_header(path)
+    start = local_times([header['start']], header['utc_offset'])[0]
+    return datetime.datetime.fromisoformat(str(start.astype('datetime64[s]')))
+
+
+def text_steps(steps, carry=(None, 0)):
+    """
+    把采集端的周期序号换成文本解析器给出的时间步
+    文本格式在周期变化处写 "----"，解析器从 -1 开始逐个分隔行加 1 并截到 0，
+    因此前两个周期都记为第 0 步，之后依次减 1，序号的空缺也不保留。
+    carry 为 (上一条采样的周期序号, 之前的分隔行数)，便于分块处理；返回 (时间步, 新的 carry)
+    """
+    steps = np.asarray(steps, dtype=np.int64)
+    if len(steps) == 0:
+        return steps, carry
+    prev_step, separators = carry
+    changed = np.empty(len(steps), dtype=np.int64)
+    changed[0] = prev_step is not None and steps[0] != prev_step
+    changed[1:] = steps[1:] != steps[:-1]
+    counts = separators + np.cumsum(changed)
+    return np.maximum(counts - 1, 0), (int(steps[-1]), int(counts[-1]))
+
+
+def read_monitor_binary(path):
+    """
+    读取 monitor.bin，返回与 parse_monitor_log 相同列和类型的 DataFrame
+    Time_Step 按 text_steps 编号，与解析 write_text_log 转换出的文本一致（check_text_equivalence 可验证）
+    """
+    import pandas as pd
+
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    header, samples = open_samples(path)
+    if len(samples) == 0:
+        return pd.DataFrame()
+
+    return pd.DataFrame({
+        'Time_Step': text_steps(samples['step'])[0].astype(MONITOR_DTYPES['Time_Step']),
+        'Node': pd.Categorical.from_codes(samples['node'].astype(np.int32), categories=header['nodes']),
+        'CPU': samples['cpu'].astype(MONITOR_DTYPES['CPU']),
+        'MEM': samples['mem'].astype(MONITOR_DTYPES['MEM']),
+        'Timestamp': local_times(samples['ts'], header['utc_offset']).astype('datetime64[ns]'),
+    })
+
+
+def summarize_monitor_binary(path, chunk_rows=MONITOR_CHUNK_ROWS):
+    """summarize_monitor_log 的二进制版本：在 memmap 上按块合并按时间步的统计量"""
+    import pandas as pd
+    from common_utils import STEP_METRICS, _new_step_state, _merge_step_chunk, step_summary
+
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    header, samples = open_samples(path)
+
+    state = _new_step_state(STEP_METRICS)
+    carry = (None, 0)
+    for begin in range(0, len(samples), chunk_rows):
+        chunk = samples[begin:begin + chunk_rows]
+        ts_ns = local_times(chunk['ts'], header['utc_offset']).astype('datetime64[ns]').view(np.int64)
+        steps, carry = text_steps(chunk['step'], carry)
+        _merge_step_chunk(state, steps,
+                          {'CPU': chunk['cpu'].astype(np.float64),
+                           'MEM': chunk['mem'].astype(np.float64)},
+                          ts_ns)
+    return step_summary(state)
+
+
+def write_text_log(path, out_path, batch_rows=MONITOR_CHUNK_ROWS):
+    """把 monitor.bin 转为 monitor_real.py 文本格式的 monitor.log，返回写出的采样数"""
+    header, samples = open_samples(path)
+    nodes = np.array(header['nodes'], dtype=object)
+
+    start = local_times([header['start']], header['utc_offset'])[0].astype('datetime64[s]')
+    with open(out_path, 'w', encoding='utf-8') as out:
+        out.write(f"===== Real Performance Monitor Started at {str(start).replace('T', ' ')} =====\n")
+
+        prev_step = None
+        for begin in range(0, len(samples), batch_rows):
+            chunk = samples[begin:begin + batch_rows]
+            stamps = np.datetime_as_string(local_times(chunk['ts'], header['utc_offset']), unit='ms')
+            lines = []
+            for stamp, step, node, cpu, mem in zip(stamps, chunk['step'].tolist(), nodes[chunk['node']],
+                                                   chunk['cpu'].tolist(), chunk['mem'].tolist()):
+                if prev_step is not None and step != prev_step:
+                    lines.append('----')
+                prev_step = step
+                lines.append(f"{stamp[:10]} {stamp[11:19]},{stamp[20:23]} [{node}] "
+                             f"CPU: {cpu:.2f}% | MEM: {mem}%")
+            out.write('\n'.join(lines) + '\n')
+        if prev_step is not None:
+            out.write('----\n')
+
+        if header['end'] is not None:
+            out.write("===== Job Finished =====\n")
+            out.write(f"===== Total Duration: {int(header['end'] - header['start'])}s =====\n")
+    return len(samples)
+
+
+def check_text_equivalence(path):
+    """
+    把 monitor.bin 转为临时的文本日志再用 parse_monitor_log 解析，与 read_monitor_binary 逐列比较
+    CPU 在文本中只保留两位小数，允许 0.005 的误差；返回不一致之处的说明列表，一致时为空
+    """
+    import tempfile
+    from common_utils import parse_monitor_log
+
+    binary = read_monitor_binary(path)
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, 'monitor.log')
+        write_text_log(path, text_path)
+        text = parse_monitor_log(text_path)
+
+    if len(binary) != len(text):
+        return [f"采样数不同：二进制 {len(binary)}，文本 {len(text)}"]
+    if len(binary) == 0:
+        return []
+
+    problems = []
+    for column in ('Time_Step', 'MEM', 'Timestamp'):
+        if binary[column].dtype != text[column].dtype:
+            problems.append(f"{column} 类型不同：二进制 {binary[column].dtype}，文本 {text[column].dtype}")
+        mismatch = int((binary[column].to_numpy() != text[column].to_numpy()).sum())
+        if mismatch:
+            problems.append(f"{column} 有 {mismatch} 条不一致")
+    mismatch = int((binary['Node'].astype(str).to_numpy() != text['Node'].astype(str).to_numpy()).sum())
+    if mismatch:
+        problems.append(f"Node 有 {mismatch} 条不一致")
+    cpu_diff = np.abs(binary['CPU'].to_numpy(np.float64) - text['CPU'].to_numpy(np.float64))
+    if cpu_diff.max() > 0.005 + 1e-6:
+        problems.append(f"CPU 最大误差 {cpu_diff.max():.4f}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把 monitor.bin 转换为 monitor.log 文本格式")
+    parser.add_argument('input', help="monitor.bin 路径")
+    parser.add_argument('output', nargs='?', default=None, help="输出路径（默认同目录下的 monitor.log）")
+    parser.add_argument('--check', action='store_true',
+                        help="不写出文件，只检查二进制读取与转换后的文本解析结果是否一致")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        problems = check_text_equivalence(args.input)
+        for problem in problems:
+            print(f"  不一致: {problem}")
+        if not problems:
+            print(f"  {args.input} 与其文本格式的解析结果一致")
+        return 1 if problems else 0
+
+    out_path = args.output or os.path.join(os.path.dirname(args.input), 'monitor.log')
+    count = write_text_log(args.input, out_path)
+    print(f"  已保存: {out_path}（{count} 条采样）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
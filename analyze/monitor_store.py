@@ -0,0 +1,157 @@
+"""
+所有运行的 monitor 数据的紧凑列式存储
+
+scan_multiple_runs 返回的 {dataset: {slowstart: [DataFrame, ...]}} 每次运行一个
+DataFrame；运行数很多时改用 MonitorStore：所有运行首尾相接放在一组连续的列数组中，
+第 i 次运行占 [offsets[i], offsets[i+1])，节点名只在 nodes 字典中存一份。
+平均化直接在这些数组上按运行切片计算，不再拼接长表。
+"""
+import numpy as np
+
+from common_utils import MONITOR_DTYPES, SAMPLING_INTERVAL
+
+
+# 打包后各列的类型；Node 为 nodes 字典中的下标，Elapsed 为距监控启动的秒数
+STORE_DTYPES = {
+    'Time_Step': MONITOR_DTYPES['Time_Step'],
+    'Node': 'int16',
+    'CPU': MONITOR_DTYPES['CPU'],
+    'MEM': MONITOR_DTYPES['MEM'],
+    'Elapsed': 'float32',
+}
+
+
+class MonitorStore:
+    """
+    多次运行的 monitor 数据，按运行连续存放
+    groups 为 [(dataset, slowstart, 运行次数), ...]，顺序与嵌套字典一致（包括没有运行的分组）
+    """
+
+    def __init__(self, columns, nodes, offsets, groups):
+        self.columns = columns
+        self.nodes = nodes
+        self.offsets = offsets
+        self.groups = groups
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.columns.values()) + self.offsets.nbytes
+
+    def run_columns(self, i):
+        """第 i 次运行各列的视图（不复制）"""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return {name: values[start:end] for name, values in self.columns.items()}
+
+    def run_frame(self, i):
+        """第 i 次运行还原为 parse_run 形式的 DataFrame（Node 为分类列）"""
+        import pandas as pd
+
+        cols = self.run_columns(i)
+        data = {name: values for name, values in cols.items() if name != 'Node'}
+        data['Node'] = pd.Categorical.from_codes(cols['Node'], categories=list(self.nodes))
+        return pd.DataFrame(data, columns=list(self.columns))
+
+    def iter_groups(self):
+        """逐个产出 (dataset, slowstart, 该分组各次运行的下标 range)"""
+        i = 0
+        for dataset, slowstart, n_runs in self.groups:
+            yield dataset, slowstart, range(i, i + n_runs)
+            i += n_runs
+
+    def to_nested(self):
+        """还原为 {dataset: {slowstart: [DataFrame, ...]}}"""
+        nested = {}
+        for dataset, slowstart, runs in self.iter_groups():
+            nested.setdefault(dataset, {})[slowstart] = [self.run_frame(i) for i in runs]
+        return nested
+
+
+def pack_monitor_data(monitor_data):
+    """把 {dataset: {slowstart: [DataFrame, ...]}} 打包为 MonitorStore"""
+    groups = []
+    frames = []
+    for dataset, ss_dict in monitor_data.items():
+        for slowstart, df_list in ss_dict.items():
+            groups.append((dataset, slowstart, len(df_list)))
+            frames.extend(df_list)
+
+    lengths = np.fromiter((len(df) for df in frames), dtype=np.int64, count=len(frames))
+    offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    total = int(offsets[-1])
+
+    columns = {name: np.empty(total, dtype=dtype) for name, dtype in STORE_DTYPES.items()}
+    node_ids = {}
+
+    for df, start, end in zip(frames, offsets[:-1], offsets[1:]):
+        columns['Time_Step'][start:end] = df['Time_Step'].to_numpy()
+        columns['CPU'][start:end] = df['CPU'].to_numpy()
+        columns['MEM'][start:end] = df['MEM'].to_numpy()
+        if 'Elapsed' in df:
+            columns['Elapsed'][start:end] = df['Elapsed'].to_numpy()
+        else:
+            columns['Elapsed'][start:end] = df['Time_Step'].to_numpy() * float(SAMPLING_INTERVAL)
+
+        # 每次运行的节点分类映射到全局节点字典
+        nodes = df['Node'].astype('category')
+        mapping = np.array([node_ids.setdefault(name, len(node_ids))
+                            for name in nodes.cat.categories], dtype=np.int16)
+        columns['Node'][start:end] = mapping[nodes.cat.codes.to_numpy()]
+
+    nodes = np.array(list(node_ids), dtype=object)
+    return MonitorStore(columns, nodes, offsets, groups)
+
+
+def run_curve(cols, metrics, grid_step):
+    """
+    单次运行：同一时间步的各节点取集群均值（横坐标为该步的平均采样时刻），
+    再插值到从 0 开始、间隔 grid_step 秒的网格
+    与 resample_run 的结果一致，返回 {指标: 网格上的数组}
+    """
+    _, inverse = np.unique(cols['Time_Step'], return_inverse=True)
+    counts = np.bincount(inverse)
+    x = np.bincount(inverse, weights=cols['Elapsed']) / counts
+    grid = np.arange(0, x[-1] + grid_step / 2, grid_step)
+    return {metric: np.interp(grid, x, np.bincount(inverse, weights=cols[metric]) / counts)
+            for metric in metrics}
+
+
+def average_store(store, metrics=('CPU', 'MEM'), grid_step=None,
+                  message='  平均化 {dataset} SS:{slowstart} - {n} 轮数据'):
+    """
+    在 MonitorStore 上做 average_monitor_metrics：各次运行插值到公共网格后逐点跨轮平均
+    返回 {dataset: {slowstart: DataFrame(Time_Step(秒), 各指标均值)}}
+    """
+    import pandas as pd
+
+    grid_step = grid_step or SAMPLING_INTERVAL
+    metrics = list(metrics)
+    averaged_data = {}
+
+    for dataset, slowstart, runs in store.iter_groups():
+        averaged_data.setdefault(dataset, {})
+        if not runs:
+            continue
+        print(message.format(dataset=dataset, slowstart=slowstart, n=len(runs)))
+
+        curves = [run_curve(store.run_columns(i), metrics, grid_step) for i in runs]
+        length = max(len(curve[metrics[0]]) for curve in curves)
+
+        # 不同长度的运行：每个网格点只对覆盖到该点的运行求平均
+        counts = np.zeros(length, dtype=np.int64)
+        sums = {metric: np.zeros(length) for metric in metrics}
+        for curve in curves:
+            n = len(curve[metrics[0]])
+            counts[:n] += 1
+            for metric in metrics:
+                sums[metric][:n] += curve[metric]
+
+        frame = {'Time_Step': np.arange(length) * SAMPLING_INTERVAL}
+        for metric in metrics:
+            frame[metric] = sums[metric] / counts
+        averaged_data[dataset][slowstart] = pd.DataFrame(frame)
+
+    return averaged_data
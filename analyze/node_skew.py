@@ -0,0 +1,245 @@
+"""
+逐节点的负载不均衡与落后节点（straggler）分析
+
+平均化流程在每个时间步先对各节点取均值，节点间的差异就丢掉了。这里把单次运行的
+monitor 数据整理成 (时间步 x 节点) 矩阵，所有统计都在矩阵上向量化完成：
+
+  * 不均衡指标：max/mean 比、变异系数、空闲节点秒数（集群繁忙时 CPU 低于 IDLE_CPU 的节点秒数）
+  * 落后窗口：某个节点 CPU 饱和而其余节点平均处于空闲的连续时间步，并标注所处的作业阶段
+"""
+import os
+
+import numpy as np
+
+from common_utils import SAMPLING_INTERVAL
+
+
+IDLE_CPU = 20.0
+BUSY_CPU = 50.0
+SATURATED_CPU = 90.0
+# 落后窗口至少持续的时间步数
+MIN_STRAGGLER_STEPS = 2
+
+# 按 map% / reduce% 划分的作业阶段
+PHASES = ('Setup', 'Map', 'Map+Shuffle', 'Reduce', 'Done')
+
+SKEW_COLUMNS = ['Dataset', 'SlowStart', 'Run', 'Nodes', 'Steps', 'Busy_Steps',
+                'Max_Mean_Ratio', 'Max_Mean_P95', 'CV', 'Idle_Node_Seconds', 'Idle_Share(%)',
+                'Busiest_Node', 'Idlest_Node', 'Straggler_Windows', 'Straggler_Seconds']
+STRAGGLER_COLUMNS = ['Dataset', 'SlowStart', 'Run', 'Node', 'Start(s)', 'End(s)',
+                     'Duration(s)', 'Phase', 'Node_CPU', 'Others_CPU']
+
+
+def node_matrix(df, metric='CPU'):
+    """
+    单次运行的 monitor DataFrame 转为矩阵
+    返回 (各时间步的秒数, 各时间步的首个采样时间或 None, 节点名列表, (时间步, 节点) 矩阵)，缺失的采样为 NaN
+    同一节点在同一时间步有多个采样时取均值（文本解析器把前两轮采样都记为第 0 步）
+    """
+    nodes = df['Node'].astype('category')
+    codes = nodes.cat.codes.to_numpy()
+    steps, inverse = np.unique(df['Time_Step'].to_numpy(), return_inverse=True)
+
+    shape = (len(steps), len(nodes.cat.categories))
+    values = df[metric].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    sums = np.zeros(shape)
+    counts = np.zeros(shape)
+    np.add.at(sums, (inverse[valid], codes[valid]), values[valid])
+    np.add.at(counts, (inverse[valid], codes[valid]), 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        matrix = np.where(counts > 0, sums / counts, np.nan)
+
+    if 'Elapsed' in df:
+        seconds = np.full(len(steps), np.inf)
+        np.minimum.at(seconds, inverse, df['Elapsed'].to_numpy(dtype=np.float64))
+    else:
+        seconds = steps * float(SAMPLING_INTERVAL)
+
+    timestamps = None
+    if 'Timestamp' in df and df['Timestamp'].notna().all():
+        stamps = df['Timestamp'].to_numpy('datetime64[ns]').astype(np.int64)
+        first = np.full(len(steps), np.iinfo(np.int64).max)
+        np.minimum.at(first, inverse, stamps)
+        timestamps = first.astype('datetime64[ns]')
+
+    return seconds, timestamps, list(nodes.cat.categories), matrix
+
+
+def step_phases(timestamps, progress):
+    """
+    每个时间步所处的作业阶段（PHASES 下标）：取该时刻之前最近的一条 map% / reduce% 进度
+    没有时间信息或进度时返回 None
+    """
+    if timestamps is None or progress is None or progress.empty:
+        return None
+
+    times = progress['Time'].to_numpy('datetime64[ns]')
+    idx = np.searchsorted(times, timestamps, side='right') - 1
+    started = idx >= 0
+    idx = np.clip(idx, 0, None)
+    map_pct = np.where(started, progress['Map_Pct'].to_numpy()[idx], 0)
+    red_pct = np.where(started, progress['Reduce_Pct'].to_numpy()[idx], 0)
+
+    return np.select(
+        [~started, red_pct >= 100, map_pct >= 100, red_pct > 0],
+        [PHASES.index('Setup'), PHASES.index('Done'), PHASES.index('Reduce'),
+         PHASES.index('Map+Shuffle')],
+        default=PHASES.index('Map'))
+
+
+def imbalance_metrics(matrix, step_seconds):
+    """
+    矩阵上的不均衡指标，只统计至少一个节点 CPU 达到 BUSY_CPU 的时间步
+    返回字典（键与 SKEW_COLUMNS 一致）及各节点在繁忙时间步的平均 CPU
+    """
+    # 每个时间步至少有一个节点的采样（时间步来自采样本身），nan* 函数不会遇到全空行
+    counts = np.sum(~np.isnan(matrix), axis=1)
+    mean = np.nanmean(matrix, axis=1)
+    top = np.nanmax(matrix, axis=1)
+    std = np.nanstd(matrix, axis=1)
+
+    busy = top >= BUSY_CPU
+    ratio = top[busy] / np.maximum(mean[busy], 1e-9)
+    idle = (matrix[busy] < IDLE_CPU).sum()
+    node_seconds = np.sum(counts[busy]) * step_seconds
+    node_mean = np.full(matrix.shape[1], np.nan)
+    if busy.any():
+        # 繁忙时间步里完全没有采样的节点保持 NaN
+        seen = ~np.isnan(matrix[busy])
+        node_mean = np.where(seen.any(axis=0),
+                             np.nansum(matrix[busy], axis=0) / np.maximum(seen.sum(axis=0), 1), np.nan)
+
+    metrics = {
+        'Steps': len(matrix),
+        'Busy_Steps': int(busy.sum()),
+        'Max_Mean_Ratio': float(ratio.mean()) if len(ratio) else None,
+        'Max_Mean_P95': float(np.percentile(ratio, 95)) if len(ratio) else None,
+        'CV': float(np.mean(std[busy] / np.maximum(mean[busy], 1e-9))) if busy.any() else None,
+        'Idle_Node_Seconds': float(idle * step_seconds),
+        'Idle_Share(%)': float(idle * step_seconds / node_seconds * 100) if node_seconds else None,
+    }
+    return metrics, node_mean
+
+
+def straggler_windows(matrix, seconds, phases=None, min_steps=MIN_STRAGGLER_STEPS):
+    """
+    某个节点 CPU ≥ SATURATED_CPU、其余节点平均 ≤ IDLE_CPU 的连续时间步（同一节点）
+    返回 [(节点下标, 起始秒, 结束秒, 阶段名, 该节点平均 CPU, 其余节点平均 CPU), ...]
+    """
+    counts = np.sum(~np.isnan(matrix), axis=1)
+    filled = np.where(np.isnan(matrix), -np.inf, matrix)
+    arg = np.argmax(filled, axis=1)
+    top = filled[np.arange(len(matrix)), arg]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rest = (np.nansum(matrix, axis=1) - top) / (counts - 1)
+
+    mask = (counts >= 2) & (top >= SATURATED_CPU) & (rest <= IDLE_CPU)
+    key = np.where(mask, arg, -1)
+    if not mask.any():
+        return []
+
+    # 按 key 变化的位置切分连续段
+    change = np.flatnonzero(np.diff(key)) + 1
+    starts = np.concatenate([[0], change])
+    ends = np.concatenate([change, [len(key)]])
+    keep = (key[starts] >= 0) & (ends - starts >= min_steps)
+
+    step = np.median(np.diff(seconds)) if len(seconds) > 1 else float(SAMPLING_INTERVAL)
+    windows = []
+    for start, end in zip(starts[keep], ends[keep]):
+        phase = None
+        if phases is not None:
+            phase = PHASES[np.bincount(phases[start:end], minlength=len(PHASES)).argmax()]
+        windows.append((int(key[start]), float(seconds[start]), float(seconds[end - 1] + step),
+                        phase, float(top[start:end].mean()), float(rest[start:end].mean())))
+    return windows
+
+
+def analyze_run(df, progress=None):
+    """
+    单次运行的逐节点分析
+    返回 (指标字典, 落后窗口列表)；窗口中节点以名称表示
+    """
+    seconds, timestamps, nodes, matrix = node_matrix(df)
+    step_seconds = float(np.median(np.diff(seconds))) if len(seconds) > 1 else float(SAMPLING_INTERVAL)
+
+    metrics, node_mean = imbalance_metrics(matrix, step_seconds)
+    metrics['Nodes'] = len(nodes)
+    if np.isfinite(node_mean).any():
+        metrics['Busiest_Node'] = nodes[int(np.nanargmax(node_mean))]
+        metrics['Idlest_Node'] = nodes[int(np.nanargmin(node_mean))]
+
+    windows = [(nodes[i], *rest) for i, *rest in
+               straggler_windows(matrix, seconds, step_phases(timestamps, progress))]
+    metrics['Straggler_Windows'] = len(windows)
+    metrics['Straggler_Seconds'] = round(sum(end - start for _, start, end, *_ in windows), 2)
+    return metrics, windows
+
+
+def skew_report(base_dir='./MapReduceLog', workers=None, executor='process', use_cache=True):
+    """
+    对目录下的所有运行做逐节点分析
+    返回 (skew DataFrame（每次运行一行）, stragglers DataFrame（每个落后窗口一行）)
+    """
+    import pandas as pd
+    from common_utils import discover_runs, _load_runs, parse_job_progress
+    from run_cache import default_cache_dir
+
+    groups = discover_runs(base_dir)
+    run_paths = [p for _, _, paths in groups for p in paths]
+    cache_dir = default_cache_dir(base_dir) if use_cache else None
+    results = iter(_load_runs(run_paths, workers, executor, cache_dir))
+
+    rows = []
+    windows = []
+    for dataset, slowstart, paths in groups:
+        for run_idx, run_path in enumerate(paths, 1):
+            df, _ = next(results)
+            if df is None or df.empty:
+                continue
+            progress = parse_job_progress(os.path.join(run_path, 'job_output.log'))
+            metrics, run_windows = analyze_run(df, progress)
+            rows.append({'Dataset': dataset, 'SlowStart': slowstart, 'Run': run_idx, **metrics})
+            windows.extend({'Dataset': dataset, 'SlowStart': slowstart, 'Run': run_idx,
+                            'Node': node, 'Start(s)': start, 'End(s)': end,
+                            'Duration(s)': end - start, 'Phase': phase,
+                            'Node_CPU': node_cpu, 'Others_CPU': others_cpu}
+                           for node, start, end, phase, node_cpu, others_cpu in run_windows)
+
+    return (pd.DataFrame(rows, columns=SKEW_COLUMNS),
+            pd.DataFrame(windows, columns=STRAGGLER_COLUMNS))
+
+
+def main(base_dir='./MapReduceLog', output_dir='Analysis_Results', workers=None,
+         executor='process', use_cache=True):
+    from common_utils import sort_dataset_key
+
+    skew, stragglers = skew_report(base_dir, workers, executor, use_cache)
+    if skew.empty:
+        print("未找到 monitor 数据")
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    skew_path = os.path.join(output_dir, 'result_node_skew.csv')
+    skew.to_csv(skew_path, index=False, float_format='%.2f')
+    print(f"  已保存: {skew_path}")
+    straggler_path = os.path.join(output_dir, 'result_stragglers.csv')
+    stragglers.to_csv(straggler_path, index=False, float_format='%.2f')
+    print(f"  已保存: {straggler_path}")
+
+    summary = skew.groupby(['Dataset', 'SlowStart'], sort=False).agg(
+        Runs=('Run', 'size'), Max_Mean_Ratio=('Max_Mean_Ratio', 'mean'), CV=('CV', 'mean'),
+        Idle_Node_Seconds=('Idle_Node_Seconds', 'mean'), Stragglers=('Straggler_Windows', 'sum'))
+    print("\n各组平均（繁忙时间步）:")
+    for dataset in sorted(skew['Dataset'].unique(), key=sort_dataset_key):
+        for (ds, slowstart), row in summary.loc[[dataset]].iterrows():
+            print(f"  {ds:>6} SS {slowstart}: max/mean {row['Max_Mean_Ratio']:.2f}  "
+                  f"CV {row['CV']:.2f}  空闲节点秒 {row['Idle_Node_Seconds']:.0f}  "
+                  f"落后窗口 {int(row['Stragglers'])}")
+
+    if not stragglers.empty:
+        by_phase = stragglers.groupby('Phase', dropna=False)['Duration(s)'].agg(['size', 'sum'])
+        print("\n落后窗口按作业阶段:")
+        for phase, row in by_phase.iterrows():
+            print(f"  {phase}: {int(row['size'])} 个，共 {row['sum']:.0f} 秒")
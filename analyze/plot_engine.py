@@ -0,0 +1,358 @@
+"""
+平均趋势图的共用绘图引擎
+
+每个 (指标, 数据集) 一张图，作为一个任务交给进程池渲染；每条曲线先在等间隔网格上做 Savitzky–Golay
+平滑，再用 LTTB 抽稀到 DECIMATE_POINTS 个点，渲染耗时与运行时长无关。每个工作进程只加载一次
+matplotlib 并复用同一个已设置样式的 Agg Figure。输入数据（及渲染参数）的哈希记录在
+输出目录的 .chart_hashes.json 中，数据未变化且图片仍存在时跳过重绘。
+"""
+import os
+import json
+import hashlib
+import concurrent.futures
+
+import profiling
+
+
+# 每种指标的图表配置
+CHART_SPECS = {
+    'CPU': {
+        'label': 'CPU',
+        'output_dir': 'Averaged_CPU_Charts',
+        'filename': 'Averaged_CPU_Trend_{dataset}.png',
+        'title': '数据集 {dataset} 的集群 CPU 负载特征 (三次实验平均)',
+        'ylabel': '集群平均 CPU 利用率 (%)',
+    },
+    'MEM': {
+        'label': '内存',
+        'output_dir': 'Averaged_MEM_Charts',
+        'filename': 'Averaged_MEM_Trend_{dataset}.png',
+        'title': '数据集 {dataset} 的集群内存利用率特征 (三次实验平均)',
+        'ylabel': '集群平均内存利用率 (%)',
+    },
+}
+
+COLORS = ["#4C72B0", "#DD8452", "#55A868", "#C44E52"]
+FIGSIZE = (12, 7)
+DPI = 300
+# 每条曲线抽稀后的点数上限
+DECIMATE_POINTS = 400
+# Savitzky–Golay 平滑窗口（点数，奇数）与多项式阶数
+SMOOTH_WINDOW = 11
+SMOOTH_POLYORDER = 3
+
+# 绘图样式或逻辑变化时递增，使已有图表全部重绘
+RENDER_VERSION = 3
+MANIFEST_NAME = '.chart_hashes.json'
+
+# 工作进程内复用的 Figure
+_figure = None
+
+
+def apply_plot_style():
+    """
+    加载绘图库并应用全局样式配置
+    matplotlib / seaborn 加载较慢，只在真正绘图时调用（进程池中每个进程调用一次）
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    config = {
+        "font.family": 'serif',
+        "font.size": 12,
+        "mathtext.fontset": 'stix',
+        "font.serif": ['SimHei'],
+    }
+    plt.rcParams.update(config)
+    plt.rcParams['axes.unicode_minus'] = False
+    sns.set_context("paper", font_scale=1.2)
+    sns.set_style("whitegrid", {"font.sans-serif": ['SimHei', 'Microsoft YaHei']})
+    plt.rcParams['figure.dpi'] = DPI
+
+
+def _template_figure():
+    """本进程复用的 Agg Figure，每次使用前清空；不经过 pyplot，也就无需 close"""
+    global _figure
+    if _figure is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        apply_plot_style()
+        _figure = Figure(figsize=FIGSIZE)
+        FigureCanvasAgg(_figure)
+    _figure.clear()
+    return _figure
+
+
+def calculate_x_limit(max_times_sorted):
+    """计算图表 X 轴限制：去掉稳健判定（中位数 / MAD）为离群的过长线条"""
+    from run_stats import robust_upper_limit
+
+    if len(max_times_sorted) < 2:
+        return int(max_times_sorted[-1]) if max_times_sorted else 100
+
+    max_val = max_times_sorted[-1]
+    x_limit = int(robust_upper_limit(max_times_sorted))
+
+    if x_limit < int(max_val):
+        print(f"    [判断] 异常偏大，取非离群的最高值: {x_limit}")
+    else:
+        print(f"    [判断] 差异正常，保留最高值: {x_limit}")
+
+    return x_limit
+
+
+def lttb_indices(x, y, n_out=DECIMATE_POINTS):
+    """
+    Largest-Triangle-Three-Buckets 抽稀，返回保留点的下标（升序，含首尾两点）
+    中间的点均分为 n_out - 2 个桶，每个桶保留与上一个保留点、下一个桶均值所成三角形面积最大的点，
+    峰谷因此不会被平均掉；点数不超过 n_out 时全部保留
+    """
+    import numpy as np
+
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    edges = (np.arange(n_out - 1) * (n - 2) // (n_out - 2) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    # 各桶均值用前缀和一次算出；最后一个桶的“下一个桶”是末尾的点
+    cx = np.concatenate([[0.0], np.cumsum(x)])
+    cy = np.concatenate([[0.0], np.cumsum(y)])
+    sizes = np.diff(edges)
+    next_x = np.append(((cx[edges[1:]] - cx[edges[:-1]]) / sizes)[1:], x[-1])
+    next_y = np.append(((cy[edges[1:]] - cy[edges[:-1]]) / sizes)[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def decimate(x, y, n_out=DECIMATE_POINTS):
+    """用 LTTB 把曲线抽稀到最多 n_out 个点"""
+    idx = lttb_indices(x, y, n_out)
+    return x[idx], y[idx]
+
+
+@profiling.timed('smooth', rows=lambda result: len(result[0]))
+def smooth_curve(x, y):
+    """
+    Savitzky–Golay 平滑；点数不足一个窗口时返回原始数据
+    savgol_filter 假定采样等间隔，x 不等距（如缺失时间步）时先线性插值到以中位步长为间隔的均匀网格
+    指标为百分比，平滑后仍限制在 0~100
+    """
+    import numpy as np
+    from scipy.signal import savgol_filter
+
+    if len(x) <= 10:
+        return x, y
+
+    gaps = np.diff(x)
+    step = float(np.median(gaps))
+    if not np.allclose(gaps, step):
+        n = int(round((x[-1] - x[0]) / step)) + 1 if step > 0 else len(x)
+        grid = np.linspace(x[0], x[-1], max(n, 2))
+        x, y = grid, np.interp(grid, x, y)
+
+    # 不超过点数的最大奇数窗口
+    window = min(SMOOTH_WINDOW, len(y) if len(y) % 2 else len(y) - 1)
+    if window <= SMOOTH_POLYORDER:
+        return x, y
+    return x, np.clip(savgol_filter(y, window, SMOOTH_POLYORDER), 0, 100)
+
+
+def build_chart_tasks(averaged_data, metric):
+    """
+    把 {dataset: {slowstart: DataFrame(Time_Step, 指标...)}} 整理成渲染任务
+    每个任务只携带截断后的 numpy 数组，便于传给工作进程和计算哈希
+    """
+    import numpy as np
+
+    spec = CHART_SPECS[metric]
+    tasks = []
+
+    for ds_name, ss_dict in averaged_data.items():
+        if not ss_dict:
+            continue
+
+        print(f"准备平均{spec['label']}趋势图: {ds_name}")
+
+        max_times = [df['Time_Step'].max() for df in ss_dict.values()]
+        max_times_sorted = sorted(max_times)
+        print(f"    所有线条的长度: {max_times_sorted}")
+        x_limit = calculate_x_limit(max_times_sorted)
+
+        lines = []
+        for slowstart in sorted(ss_dict.keys()):
+            df = ss_dict[slowstart]
+            x = np.ascontiguousarray(df['Time_Step'].to_numpy(), dtype=np.float64)
+            y = np.ascontiguousarray(df[metric].to_numpy(), dtype=np.float64)
+
+            # 截断到 x_limit
+            mask = x <= x_limit
+            x, y = x[mask], y[mask]
+
+            if len(x) == 0:
+                print(f"      警告: SlowStart={slowstart} 无有效数据点")
+                continue
+            # 先在等间隔数据上平滑，再抽稀（LTTB 的输出不等距，不能再做 Savitzky–Golay）
+            x, y = decimate(*smooth_curve(x, y))
+            lines.append((slowstart, x, y))
+
+        tasks.append({
+            'metric': metric,
+            'dataset': ds_name,
+            'x_limit': x_limit,
+            'lines': lines,
+            'save_path': os.path.join(spec['output_dir'],
+                                      spec['filename'].format(dataset=ds_name)),
+        })
+
+    return tasks
+
+
+def chart_hash(task):
+    """渲染任务输入的哈希：数据、截断位置和 RENDER_VERSION 都相同时图表不变"""
+    h = hashlib.sha1()
+    h.update(f"{RENDER_VERSION}|{task['metric']}|{task['dataset']}|{task['x_limit']}".encode('utf-8'))
+    for slowstart, x, y in task['lines']:
+        h.update(f"|{slowstart}|{len(x)}|".encode('utf-8'))
+        h.update(x.tobytes())
+        h.update(y.tobytes())
+    return h.hexdigest()
+
+
+@profiling.timed('render_chart', rows=lambda result: 1)
+def render_chart(task):
+    """渲染单张趋势图（在工作进程中执行），返回保存路径"""
+    spec = CHART_SPECS[task['metric']]
+    fig = _template_figure()
+    ax = fig.add_subplot()
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_linewidth(1.2)
+    ax.spines['bottom'].set_linewidth(1.2)
+
+    for i, (slowstart, x, y) in enumerate(task['lines']):
+        color = COLORS[i % len(COLORS)]
+        ax.plot(x, y,
+                label=f'SlowStart = {slowstart}',
+                color=color,
+                linewidth=2.8,
+                alpha=0.9)
+        ax.fill_between(x, y, alpha=0.12, color=color)
+
+    ax.set_title(spec['title'].format(dataset=task['dataset']),
+                 fontsize=17, fontweight='bold', pad=20)
+    ax.set_xlabel('执行时间 (s)', fontsize=14, labelpad=10)
+    ax.set_ylabel(spec['ylabel'], fontsize=14, labelpad=10)
+    ax.legend(frameon=False, fontsize=12, loc='best')
+    ax.grid(True, linestyle=':', alpha=0.6, color='gray', zorder=0)
+    ax.set_ylim(0, 105)
+    ax.set_xlim(0, task['x_limit'])
+
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(task['save_path']) or '.', exist_ok=True)
+    fig.savefig(task['save_path'], bbox_inches='tight', dpi=DPI, facecolor='white')
+    return task['save_path']
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(output_dir, manifest):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _render_all(tasks, workers):
+    """渲染任务列表，按完成顺序产出 (task, save_path 或异常)"""
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            try:
+                yield task, render_chart(task)
+            except Exception as e:
+                yield task, e
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        # 开启记录时工作进程的计时记录随结果带回
+        futures = {pool.submit(profiling.call_recorded, render_chart, task): task for task in tasks}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result, records = future.result()
+            except Exception as e:
+                yield futures[future], e
+                continue
+            profiling.merge_records(records)
+            yield futures[future], result
+
+
+@profiling.timed('render_charts', rows=lambda saved: sum(len(v) for v in saved.values()))
+def render_charts(averaged_data, metrics=('CPU', 'MEM'), workers=None, force=False):
+    """
+    用同一份平均结果渲染多个指标的趋势图
+    averaged_data: {dataset: {slowstart: DataFrame(Time_Step, CPU, MEM, ...)}}
+    workers 默认取 CPU 核数；force 时忽略哈希全部重绘
+    返回 {指标: [图片路径, ...]}
+    """
+    tasks = []
+    for metric in metrics:
+        tasks.extend(build_chart_tasks(averaged_data, metric))
+
+    manifests = {}
+    pending = []
+    for task in tasks:
+        output_dir = os.path.dirname(task['save_path'])
+        manifest = manifests.setdefault(output_dir, _load_manifest(output_dir))
+        task['hash'] = chart_hash(task)
+        name = os.path.basename(task['save_path'])
+        if (not force and manifest.get(name) == task['hash']
+                and os.path.exists(task['save_path'])):
+            print(f"  跳过（数据未变化）: {task['save_path']}")
+            continue
+        pending.append(task)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(pending))
+
+    if pending:
+        print(f"\n渲染 {len(pending)} 张图表（{max(workers, 1)} 个进程）...")
+
+    for task, result in _render_all(pending, workers):
+        name = os.path.basename(task['save_path'])
+        manifest = manifests[os.path.dirname(task['save_path'])]
+        if isinstance(result, Exception):
+            manifest.pop(name, None)
+            print(f"  渲染失败: {task['save_path']} ({result})")
+        else:
+            manifest[name] = task['hash']
+            print(f"  已保存: {result}")
+
+    for output_dir, manifest in manifests.items():
+        _save_manifest(output_dir, manifest)
+
+    saved = {metric: [] for metric in metrics}
+    for task in tasks:
+        if os.path.exists(task['save_path']):
+            saved[task['metric']].append(task['save_path'])
+    return saved
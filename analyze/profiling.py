@@ -0,0 +1,243 @@
+"""
+分析流水线的可选计时 / 资源记录
+
+默认关闭，stage() 只是一个空的上下文管理器。开启后（analyze.py --profile trace.json，
+或设置环境变量 MR_PROFILE=1；MR_PROFILE=trace.json / trace.csv 时 analyze.py 还会写出该文件）
+每个阶段记录一条：
+    阶段名、运行目录、墙钟时间、CPU 时间、处理行数、进程号、嵌套层级，
+    以及结束时进程的峰值 RSS（process_peak_rss_mb，进程启动以来的最大值）和阶段内峰值的增长
+    （peak_rss_delta_mb，阶段把进程峰值抬高了多少；峰值在阶段开始前已达到时为 0）
+阶段栈按线程分开；进程池 / 线程池中的工作者通过 call_recorded 把各自的记录随结果一起带回，
+由主线程挂到当前阶段下。
+write_trace 按扩展名写出 JSON 或 CSV；另可用 analyze.py --cprofile 导出 cProfile 统计。
+
+    with profiling.stage('parse_run', run=run_path) as rec:
+        df = ...
+        rec['rows'] = len(df)
+"""
+import os
+import sys
+import csv
+import json
+import time
+import functools
+import threading
+import contextlib
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，峰值 RSS 记为 None
+    resource = None
+
+
+ENV_VAR = 'MR_PROFILE'
+# enable() 写入的起始时间（Unix 秒），工作进程据此与主进程对齐 start_s
+ORIGIN_ENV_VAR = 'MR_PROFILE_ORIGIN'
+TRACE_COLUMNS = ('stage', 'run', 'parent', 'depth', 'start_s', 'wall_s', 'cpu_s', 'rows',
+                 'process_peak_rss_mb', 'peak_rss_delta_mb', 'pid')
+
+def _origin_from_env():
+    """环境变量中由 enable() 写入的起始时间；没有时（主进程）为当前时间"""
+    try:
+        return float(os.environ.get(ORIGIN_ENV_VAR, ''))
+    except ValueError:
+        return time.time()
+
+
+def env_trace_path():
+    """环境变量 MR_PROFILE 的值为 .json / .csv 路径时返回该路径，否则返回 None"""
+    value = os.environ.get(ENV_VAR, '')
+    return value if value.endswith(('.json', '.csv')) else None
+
+
+_enabled = os.environ.get(ENV_VAR, '') not in ('', '0')
+_records = []
+_records_lock = threading.Lock()
+# 每个线程各自的阶段栈（stack），以及 call_recorded 期间收集本线程记录的列表（sink）
+_local = threading.local()
+_origin = _origin_from_env()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _append(record):
+    """记录写入本线程的 sink（call_recorded 期间），否则加锁写入全局记录"""
+    sink = getattr(_local, 'sink', None)
+    if sink is not None:
+        sink.append(record)
+        return
+    with _records_lock:
+        _records.append(record)
+
+
+def enable():
+    """开启记录；同时把开关和起始时间写入环境变量，之后创建的工作进程也会记录"""
+    global _enabled
+    _enabled = True
+    if os.environ.get(ENV_VAR, '') in ('', '0'):
+        os.environ[ENV_VAR] = '1'
+    os.environ[ORIGIN_ENV_VAR] = repr(_origin)
+
+
+def enabled():
+    return _enabled
+
+
+def peak_rss_mb():
+    """本进程到目前为止的峰值 RSS（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 2)
+
+
+@contextlib.contextmanager
+def stage(name, run=None, rows=None):
+    """记录一个阶段；yield 的字典可在阶段内补充 rows 等字段"""
+    if not _enabled:
+        yield {}
+        return
+
+    stack = _stack()
+    record = {
+        'stage': name,
+        'run': run,
+        'parent': stack[-1]['stage'] if stack else None,
+        'depth': len(stack),
+        'start_s': round(time.time() - _origin, 4),
+        'rows': rows,
+        'pid': os.getpid(),
+    }
+    stack.append(record)
+    peak_before = peak_rss_mb()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield record
+    finally:
+        record['wall_s'] = round(time.perf_counter() - wall, 6)
+        record['cpu_s'] = round(time.process_time() - cpu, 6)
+        peak = peak_rss_mb()
+        record['process_peak_rss_mb'] = peak
+        record['peak_rss_delta_mb'] = round(peak - peak_before, 2) if peak is not None else None
+        stack.pop()
+        _append(record)
+
+
+def timed(name, rows=None):
+    """
+    装饰器形式的 stage：rows 为根据返回值计算处理行数的函数
+    关闭记录时直接调用原函数
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    record['rows'] = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def call_recorded(func, *args, **kwargs):
+    """
+    在工作进程 / 线程中调用 func，返回 (结果, 本线程在调用期间产生的记录)
+    主线程用 merge_records 把记录并入自己的 trace
+    """
+    # fork 出的工作进程继承了主进程当时的阶段栈，调用期间清空，层级从 0 开始
+    stack = _stack()
+    saved = stack[:]
+    del stack[:]
+    saved_sink = getattr(_local, 'sink', None)
+    new = _local.sink = []
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        stack[:] = saved
+        _local.sink = saved_sink
+    return result, new
+
+
+def merge_records(records):
+    """把工作进程 / 线程带回的记录并入 trace；顶层记录挂到当前线程的当前阶段下"""
+    stack = _stack()
+    current = stack[-1] if stack else None
+    for record in records:
+        if record['depth'] == 0 and current is not None:
+            record['parent'] = current['stage']
+        record['depth'] += len(stack)
+        _append(record)
+
+
+def map_recorded(pool, func, items, **map_kwargs):
+    """
+    pool.map 的记录版本：开启记录时带回工作进程 / 线程的记录并挂到当前阶段下，否则与 pool.map 相同
+    """
+    if not _enabled:
+        return list(pool.map(func, items, **map_kwargs))
+
+    results = []
+    for result, records in pool.map(functools.partial(call_recorded, func), items, **map_kwargs):
+        merge_records(records)
+        results.append(result)
+    return results
+
+
+def records():
+    with _records_lock:
+        return list(_records)
+
+
+def write_trace(path):
+    """按扩展名（.json / .csv）写出所有记录，返回记录数"""
+    rows = sorted(records(), key=lambda r: r['start_s'])
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=TRACE_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'argv': sys.argv, 'pid': os.getpid(), 'records': rows},
+                      f, ensure_ascii=False, indent=1)
+    return len(rows)
+
+
+def summarize(top=None):
+    """
+    按阶段汇总：[(阶段, 次数, 墙钟合计, CPU 合计, 行数合计, 最大峰值增长, 最大进程峰值 RSS), ...]，
+    按墙钟降序
+    """
+    totals = {}
+    for r in records():
+        t = totals.setdefault(r['stage'], [0, 0.0, 0.0, 0, None, None])
+        t[0] += 1
+        t[1] += r['wall_s']
+        t[2] += r['cpu_s']
+        t[3] += r['rows'] or 0
+        if r['process_peak_rss_mb'] is not None:
+            t[4] = max(t[4] or 0, r['peak_rss_delta_mb'])
+            t[5] = max(t[5] or 0, r['process_peak_rss_mb'])
+    summary = sorted(((name, *t) for name, t in totals.items()), key=lambda x: -x[2])
+    return summary[:top] if top else summary
+
+
+def print_summary(top=None):
+    print(f"\n{'阶段':<24} {'次数':>6} {'墙钟(s)':>10} {'CPU(s)':>10} {'行数':>12} "
+          f"{'峰值增长(MB)':>12} {'进程峰值(MB)':>12}")
+    for name, count, wall, cpu, rows, delta, peak in summarize(top):
+        delta_text = f'{delta:.1f}' if delta is not None else '-'
+        peak_text = f'{peak:.1f}' if peak is not None else '-'
+        print(f"{name:<24} {count:>6} {wall:>10.3f} {cpu:>10.3f} {rows:>12} {delta_text:>12} {peak_text:>12}")
@@ -0,0 +1,270 @@
+"""
+根据已有运行推荐 slowstart
+
+在运行索引（run_catalog）上拟合一个轻量的岭回归模型：
+    log(总耗时) = Σ  w_i(作业特征) × b_j(slowstart)
+作业特征为输入字节数、Map / Reduce 任务数、Shuffle 字节数（取对数）和集群平均 CPU，
+slowstart 基函数为 1, s, s²。预测新的输入大小时，没有给出的特征由输入字节数按历史运行
+的对数线性关系估算，于是只凭输入大小（如 2G、20G）就能在毫秒级给出各 slowstart 的
+预测耗时和推荐值，不需要重新扫一遍参数。
+
+模型只有少数几个数据集可学，推荐结果需要检验（check_recommendation）：输入大小超出训练范围
+（外推）、或各 slowstart 的预测差异小于模型残差时给出警告；输入大小与某个训练数据集相当时，
+以该数据集的实测最优为准（observed_best）。
+"""
+import re
+
+import numpy as np
+
+
+# (特征名, run_metrics 中的指标名)；cpu_mean 直接来自 runs 表
+FEATURES = (
+    ('input_bytes', 'HDFS读取(B)'),
+    ('map_tasks', 'Map任务数'),
+    ('reduce_tasks', 'Reduce任务数'),
+    ('shuffle_bytes', 'Shuffle字节数(B)'),
+    ('cpu_mean', None),
+)
+# 取对数的特征（量级跨越几个数量级）
+LOG_FEATURES = ('input_bytes', 'map_tasks', 'reduce_tasks', 'shuffle_bytes')
+SLOWSTART_DEGREE = 2
+RIDGE = 1e-2
+GRID_STEP = 0.05
+# 输入大小与训练数据集相差不超过该倍数时视为同一规模，可直接参考其实测结果
+SIZE_MATCH_RATIO = 1.1
+
+SIZE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*$', re.IGNORECASE)
+SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+
+def parse_size(text):
+    """'2G'、'500MB'、'1.5GB'、'104857600' 转为字节数（按 1024 进位）"""
+    match = SIZE_PATTERN.match(str(text))
+    if not match:
+        raise ValueError(f"无法识别的数据大小: {text}")
+    return float(match.group(1)) * SIZE_UNITS[match.group(2).upper()]
+
+
+def load_training_rows(catalog_path):
+    """从运行索引读取训练样本：每次运行的特征、slowstart 和总耗时"""
+    from run_catalog import query_runs
+
+    rows = query_runs(catalog_path, metrics=[metric for _, metric in FEATURES if metric])
+    samples = []
+    for row in rows:
+        if not row['total_time']:
+            continue
+        sample = {'dataset': row['dataset'], 'slowstart': row['slowstart'],
+                  'total_time': row['total_time']}
+        for name, metric in FEATURES:
+            sample[name] = row['cpu_mean'] if metric is None else row.get(metric)
+        if sample['input_bytes'] is None:
+            sample['input_bytes'] = parse_size(row['dataset'])
+        samples.append(sample)
+    return samples
+
+
+def _feature_matrix(samples, names):
+    """样本的特征矩阵（LOG_FEATURES 取对数），缺失值为 NaN"""
+    matrix = np.array([[np.nan if s.get(name) is None else s[name] for name in names]
+                       for s in samples], dtype=np.float64)
+    for j, name in enumerate(names):
+        if name in LOG_FEATURES:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                matrix[:, j] = np.log(np.where(matrix[:, j] > 0, matrix[:, j], np.nan))
+    return matrix
+
+
+def _slowstart_basis(slowstart):
+    return np.vander(np.asarray(slowstart, dtype=np.float64), SLOWSTART_DEGREE + 1, increasing=True)
+
+
+def _design(features, slowstart):
+    """每个作业特征（含常数项）与每个 slowstart 基函数的乘积"""
+    workload = np.hstack([np.ones((len(features), 1)), features])
+    basis = _slowstart_basis(slowstart)
+    return (workload[:, :, None] * basis[:, None, :]).reshape(len(features), -1)
+
+
+def fit_model(samples, ridge=RIDGE):
+    """
+    拟合推荐模型，返回模型字典（都是 numpy 数组，可直接传给 predict_times）
+    方差为 0 的特征（如所有运行都只有 1 个 Reduce）不参与拟合
+    """
+    if len(samples) < 2:
+        raise ValueError("训练样本不足，至少需要 2 次运行")
+
+    names = [name for name, _ in FEATURES]
+    raw = _feature_matrix(samples, names)
+    log_size = raw[:, 0]
+
+    # 每个特征对 log(输入字节) 的线性关系，用于补全缺失值和预测时估算
+    impute = np.zeros((len(names), 2))
+    for j in range(len(names)):
+        ok = ~np.isnan(raw[:, j])
+        if ok.sum() >= 2 and np.ptp(log_size[ok]) > 0:
+            impute[j] = np.polyfit(log_size[ok], raw[ok, j], 1)
+        elif ok.any():
+            impute[j] = (0.0, raw[ok, j].mean())
+        missing = ~ok
+        raw[missing, j] = np.polyval(impute[j], log_size[missing])
+
+    mean = raw.mean(axis=0)
+    std = raw.std(axis=0)
+    keep = std > 1e-9
+    features = (raw[:, keep] - mean[keep]) / std[keep]
+
+    slowstart = np.array([s['slowstart'] for s in samples], dtype=np.float64)
+    target = np.log([s['total_time'] for s in samples])
+    design = _design(features, slowstart)
+
+    # 岭回归：在最小二乘问题下方追加 sqrt(ridge)·I（常数项不惩罚）
+    penalty = np.sqrt(ridge) * np.eye(design.shape[1])
+    penalty[0, 0] = 0.0
+    coef, *_ = np.linalg.lstsq(np.vstack([design, penalty]),
+                               np.concatenate([target, np.zeros(design.shape[1])]), rcond=None)
+
+    residual = target - design @ coef
+    input_bytes = np.array([s['input_bytes'] for s in samples], dtype=np.float64)
+    return {
+        'names': np.array(names),
+        'keep': keep,
+        'mean': mean,
+        'std': std,
+        'impute': impute,
+        'coef': coef,
+        'slowstart_range': (float(slowstart.min()), float(slowstart.max())),
+        'rmse_log': float(np.sqrt(np.mean(residual ** 2))),
+        'n_samples': len(samples),
+        'datasets': sorted({s['dataset'] for s in samples}),
+        'size_range': (float(input_bytes.min()), float(input_bytes.max())),
+        'observed': observed_times(samples),
+    }
+
+
+def observed_times(samples):
+    """各数据集的实测结果：{数据集: (输入字节数中位数, {slowstart: 平均总耗时})}"""
+    grouped = {}
+    for s in samples:
+        sizes, times = grouped.setdefault(s['dataset'], ([], {}))
+        sizes.append(s['input_bytes'])
+        times.setdefault(s['slowstart'], []).append(s['total_time'])
+    return {dataset: (float(np.median(sizes)), {ss: float(np.mean(t)) for ss, t in times.items()})
+            for dataset, (sizes, times) in grouped.items()}
+
+
+def workload_features(model, input_bytes, **known):
+    """
+    新作业的特征向量（未标准化）：给出的特征（map_tasks=... 等）直接使用，
+    其余按训练数据中与 log(输入字节) 的线性关系估算
+    """
+    log_size = np.log(input_bytes)
+    values = np.empty(len(model['names']))
+    for j, name in enumerate(model['names']):
+        value = input_bytes if name == 'input_bytes' else known.get(name)
+        if value is None:
+            values[j] = np.polyval(model['impute'][j], log_size)
+        else:
+            values[j] = np.log(value) if name in LOG_FEATURES else value
+    return values
+
+
+def predict_times(model, input_bytes, slowstarts, **known):
+    """预测给定输入大小在各 slowstart 下的总耗时（秒）"""
+    raw = workload_features(model, input_bytes, **known)
+    keep = model['keep']
+    features = ((raw[keep] - model['mean'][keep]) / model['std'][keep])[None, :]
+    slowstarts = np.atleast_1d(np.asarray(slowstarts, dtype=np.float64))
+    design = _design(np.repeat(features, len(slowstarts), axis=0), slowstarts)
+    return np.exp(design @ model['coef'])
+
+
+def slowstart_grid(model, step=GRID_STEP):
+    """推荐时搜索的 slowstart 网格，限制在训练数据覆盖的范围内"""
+    low, high = model['slowstart_range']
+    return np.round(np.arange(low, high + step / 2, step), 3)
+
+
+def recommend(model, input_bytes, step=GRID_STEP, **known):
+    """返回 (推荐 slowstart, 预测耗时, 网格, 网格上的预测耗时)"""
+    grid = slowstart_grid(model, step)
+    times = predict_times(model, input_bytes, grid, **known)
+    best = int(np.argmin(times))
+    return float(grid[best]), float(times[best]), grid, times
+
+
+def observed_best(model, input_bytes):
+    """
+    输入大小与 input_bytes 相当（相差不超过 SIZE_MATCH_RATIO 倍）的训练数据集中实测平均耗时最短的设置
+    返回 (数据集, slowstart, 平均总耗时)；没有相当的数据集时返回 None
+    """
+    matches = [(abs(np.log(size / input_bytes)), dataset, times)
+               for dataset, (size, times) in model['observed'].items()
+               if abs(np.log(size / input_bytes)) <= np.log(SIZE_MATCH_RATIO)]
+    if not matches:
+        return None
+    _, dataset, times = min(matches, key=lambda m: m[0])
+    slowstart = min(times, key=times.get)
+    return dataset, slowstart, times[slowstart]
+
+
+def check_recommendation(model, input_bytes, times):
+    """推荐结果不可靠的原因列表：输入大小超出训练范围，或各 slowstart 的预测差异小于模型残差"""
+    warnings = []
+    low, high = model['size_range']
+    if input_bytes > high * SIZE_MATCH_RATIO or input_bytes < low / SIZE_MATCH_RATIO:
+        ratio = input_bytes / high if input_bytes > high else low / input_bytes
+        warnings.append(f"输入大小超出训练数据范围（{ratio:.1f} 倍），属于外推")
+    spread = float(np.log(np.max(times) / np.min(times)))
+    if spread < model['rmse_log']:
+        warnings.append(f"各 slowstart 的预测差异（log {spread:.3f}）小于模型残差 RMSE（{model['rmse_log']:.3f}），"
+                        f"推荐值不显著")
+    return warnings
+
+
+def _evaluate(model, test, step):
+    """用 model 预测 test 数据集：返回 (推荐 slowstart, 实测最优 slowstart, 各 slowstart 平均耗时的平均相对误差(%))"""
+    observed = {}
+    for s in test:
+        observed.setdefault(s['slowstart'], []).append(s['total_time'])
+    slowstarts = sorted(observed)
+    actual = np.array([np.mean(observed[ss]) for ss in slowstarts])
+    input_bytes = float(np.median([s['input_bytes'] for s in test]))
+    predicted = predict_times(model, input_bytes, slowstarts)
+
+    chosen, _, _, _ = recommend(model, input_bytes, step)
+    error = float(np.mean(np.abs(predicted - actual) / actual) * 100)
+    return chosen, slowstarts[int(np.argmin(actual))], error
+
+
+def in_sample_check(samples, ridge=RIDGE, step=GRID_STEP):
+    """
+    样本内检验：用全部数据拟合，再预测每个训练数据集
+    返回格式同 cross_validate；模型在训练数据上都选不对最优值时，外推结果更不可信
+    """
+    from common_utils import sort_dataset_key
+
+    model = fit_model(samples, ridge)
+    results = []
+    for dataset in sorted({s['dataset'] for s in samples}, key=sort_dataset_key):
+        test = [s for s in samples if s['dataset'] == dataset]
+        results.append((dataset, *_evaluate(model, test, step)))
+    return results
+
+
+def cross_validate(samples, ridge=RIDGE, step=GRID_STEP):
+    """
+    留一个数据集验证：用其余数据集拟合，预测该数据集的推荐值和各 slowstart 的平均耗时
+    返回 [(数据集, 推荐 slowstart, 实测最优 slowstart, 平均相对误差(%)), ...]
+    """
+    from common_utils import sort_dataset_key
+
+    results = []
+    for dataset in sorted({s['dataset'] for s in samples}, key=sort_dataset_key):
+        train = [s for s in samples if s['dataset'] != dataset]
+        test = [s for s in samples if s['dataset'] == dataset]
+        if len({s['dataset'] for s in train}) < 2:
+            continue
+        model = fit_model(train, ridge)
+        results.append((dataset, *_evaluate(model, test, step)))
+    return results
@@ -0,0 +1,171 @@
+"""
+按作业阶段的资源消耗：CPU 核·秒与内存 GB·秒
+
+result_cpu.csv 的 Avg_CPU 是各时间步均值的简单平均，与作业长短和所处阶段无关。这里把每次运行的
+monitor 采样与 job_stage_times 给出的阶段边界对齐，按时间积分各节点的 CPU% / MEM%：
+
+    核·秒  = CPU% / 100 × 每节点核数 × 秒
+    GB·秒  = MEM% / 100 × 每节点内存(GB) × 秒
+
+只统计作业窗口 [开始, 完成] 内的部分，并拆分为三个阶段：
+    Map            作业开始 ~ 第一条 reduce>0%（只有 Map 在运行）
+    Shuffle_Overlap 第一条 reduce>0% ~ Map 完成（Shuffle 与 Map 重叠）
+    Reduce_Tail    Map 完成 ~ 作业完成（剩余的 Shuffle 与 Reduce）
+每个采样的值保持到同一节点的下一个采样（最多 MAX_HOLD_STEPS 个采样间隔）。
+"""
+import os
+
+import numpy as np
+
+from common_utils import SAMPLING_INTERVAL
+
+
+# 每节点资源，默认取 config/yarn-site.xml 的 cpu-vcores 与 memory-mb（8192 MB）
+NODE_CORES = 2
+NODE_MEMORY_GB = 8.0
+# 采样缺失时，一个采样的值最多保持的采样间隔数
+MAX_HOLD_STEPS = 3
+
+PHASES = ('Map', 'Shuffle_Overlap', 'Reduce_Tail')
+
+RESOURCE_COLUMNS = (['Dataset', 'SlowStart', 'Run', 'Nodes', 'Job_Time(s)', 'Core_Seconds', 'GB_Seconds',
+                     'Utilization(%)']
+                    + [f'{phase}_Core_Seconds' for phase in PHASES]
+                    + [f'{phase}_GB_Seconds' for phase in PHASES])
+
+
+def sample_intervals(df):
+    """
+    单次运行每个采样覆盖的时间区间
+    返回 (起始秒, 结束秒)，秒数与 job_stage_times 同为本地时间戳；没有完整时间戳时返回 None
+    """
+    if 'Timestamp' not in df or not df['Timestamp'].notna().all():
+        return None
+
+    codes = df['Node'].astype('category').cat.codes.to_numpy()
+    start = df['Timestamp'].to_numpy('datetime64[ns]').astype(np.int64) / 1e9
+
+    # 按 (节点, 时间) 排序后，同一节点相邻采样之差即为前一个采样的保持时长
+    order = np.lexsort((start, codes))
+    codes = codes[order]
+    start = start[order]
+    gaps = np.diff(start)
+    same_node = codes[1:] == codes[:-1]
+    step = float(np.median(gaps[same_node])) if same_node.any() else float(SAMPLING_INTERVAL)
+
+    # 每个节点的最后一个采样保持一个采样间隔
+    duration = np.full(len(start), step)
+    duration[:-1][same_node] = np.minimum(gaps[same_node], MAX_HOLD_STEPS * step)
+
+    intervals = np.empty((len(start), 2))
+    intervals[order, 0] = start
+    intervals[order, 1] = start + duration
+    return intervals[:, 0], intervals[:, 1]
+
+
+def phase_edges(times):
+    """job_stage_times 的结果转为 PHASES 各阶段的边界（长度 len(PHASES) + 1）"""
+    shuffle_start = times['shuffle_start']
+    if shuffle_start is None:
+        shuffle_start = times['map_done']
+    overlap_start = min(max(shuffle_start, times['start']), times['map_done'])
+    return np.array([times['start'], overlap_start, times['map_done'], times['job_done']], dtype=np.float64)
+
+
+def integrate_run(df, times, cores=NODE_CORES, memory_gb=NODE_MEMORY_GB):
+    """
+    单次运行按阶段积分的核·秒与 GB·秒
+    返回字典（键与 RESOURCE_COLUMNS 一致，不含 Dataset / SlowStart / Run）；采样没有时间戳时返回 None
+    """
+    intervals = sample_intervals(df)
+    if intervals is None:
+        return None
+    start, end = intervals
+
+    # (采样, 阶段) 的重叠秒数
+    edges = phase_edges(times)
+    overlap = np.clip(np.minimum(end[:, None], edges[None, 1:])
+                      - np.maximum(start[:, None], edges[None, :-1]), 0, None)
+
+    core_seconds = (df['CPU'].to_numpy(dtype=np.float64) / 100 * cores) @ overlap
+    gb_seconds = (df['MEM'].to_numpy(dtype=np.float64) / 100 * memory_gb) @ overlap
+
+    nodes = df['Node'].nunique()
+    job_time = float(edges[-1] - edges[0])
+    capacity = nodes * cores * job_time
+    usage = {
+        'Nodes': nodes,
+        'Job_Time(s)': job_time,
+        'Core_Seconds': float(core_seconds.sum()),
+        'GB_Seconds': float(gb_seconds.sum()),
+        # 作业窗口内按时间加权的集群 CPU 利用率
+        'Utilization(%)': float(core_seconds.sum() / capacity * 100) if capacity > 0 else None,
+    }
+    for i, phase in enumerate(PHASES):
+        usage[f'{phase}_Core_Seconds'] = float(core_seconds[i])
+        usage[f'{phase}_GB_Seconds'] = float(gb_seconds[i])
+    return usage
+
+
+def resource_report(base_dir='./MapReduceLog', workers=None, executor='process', use_cache=True,
+                    cores=NODE_CORES, memory_gb=NODE_MEMORY_GB):
+    """对目录下的所有运行做资源积分，返回每次运行一行的 DataFrame"""
+    import pandas as pd
+    from common_utils import discover_runs, _load_runs, job_stage_times
+    from run_cache import default_cache_dir
+
+    groups = discover_runs(base_dir)
+    run_paths = [p for _, _, paths in groups for p in paths]
+    cache_dir = default_cache_dir(base_dir) if use_cache else None
+    results = iter(_load_runs(run_paths, workers, executor, cache_dir))
+
+    rows = []
+    for dataset, slowstart, paths in groups:
+        for run_idx, run_path in enumerate(paths, 1):
+            df, _ = next(results)
+            if df is None or df.empty:
+                continue
+            times = job_stage_times(os.path.join(run_path, 'job_output.log'))
+            if times is None:
+                print(f"  [跳过] {run_path}: 没有完整的作业进度")
+                continue
+            usage = integrate_run(df, times, cores, memory_gb)
+            if usage is None:
+                print(f"  [跳过] {run_path}: monitor 采样没有时间戳，无法与作业阶段对齐")
+                continue
+            rows.append({'Dataset': dataset, 'SlowStart': slowstart, 'Run': run_idx, **usage})
+
+    return pd.DataFrame(rows, columns=RESOURCE_COLUMNS)
+
+
+def main(base_dir='./MapReduceLog', output_dir='Analysis_Results', workers=None,
+         executor='process', use_cache=True, cores=NODE_CORES, memory_gb=NODE_MEMORY_GB):
+    from common_utils import sort_dataset_key
+
+    usage = resource_report(base_dir, workers, executor, use_cache, cores, memory_gb)
+    if usage.empty:
+        print("未找到可与作业阶段对齐的 monitor 数据")
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    usage_path = os.path.join(output_dir, 'result_resource.csv')
+    usage.to_csv(usage_path, index=False, float_format='%.2f')
+    print(f"  已保存: {usage_path}")
+
+    metrics = [c for c in RESOURCE_COLUMNS if c not in ('Dataset', 'SlowStart', 'Run')]
+    summary = usage.groupby(['Dataset', 'SlowStart'], sort=False)[metrics].mean()
+    summary.insert(0, 'Runs', usage.groupby(['Dataset', 'SlowStart'], sort=False).size())
+    summary_path = os.path.join(output_dir, 'result_resource_summary.csv')
+    summary.reset_index().to_csv(summary_path, index=False, float_format='%.2f')
+    print(f"  已保存: {summary_path}")
+
+    print(f"\n各组平均（每节点 {cores} 核 / {memory_gb:g} GB）:")
+    for dataset in sorted(usage['Dataset'].unique(), key=sort_dataset_key):
+        group = summary.loc[dataset]
+        for slowstart, row in group.iterrows():
+            phases = ' / '.join(f"{row[f'{phase}_Core_Seconds']:.0f}" for phase in PHASES)
+            print(f"  {dataset:>6} SS {slowstart}: 耗时 {row['Job_Time(s)']:.0f}s  "
+                  f"核·秒 {row['Core_Seconds']:.0f} ({phases})  GB·秒 {row['GB_Seconds']:.0f}  "
+                  f"利用率 {row['Utilization(%)']:.1f}%")
+        print(f"  {dataset:>6} 核·秒最少: SS {group['Core_Seconds'].idxmin()}  "
+              f"GB·秒最少: SS {group['GB_Seconds'].idxmin()}  耗时最短: SS {group['Job_Time(s)'].idxmin()}")
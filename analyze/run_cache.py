@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+
+# 解析逻辑或缓存格式变化时递增，使旧缓存全部失效
+CACHE_VERSION = 6
+CACHE_DIR_NAME = '.parse_cache'
+
+
+def default_cache_dir(base_dir):
+    """默认缓存目录：<base_dir>/.parse_cache"""
+    return os.path.join(base_dir, CACHE_DIR_NAME)
+
+
+def run_signature(run_path):
+    """运行目录下各文件（monitor.log、job_output.log、*.jhist 等）的 {文件名: [大小, mtime_ns]}"""
+    signature = {}
+    try:
+        entries = sorted(os.scandir(run_path), key=lambda e: e.name)
+    except OSError:
+        return signature
+    for entry in entries:
+        if entry.is_file():
+            st = entry.stat()
+            signature[entry.name] = [st.st_size, st.st_mtime_ns]
+    return signature
+
+
+def _cache_path(cache_dir, run_path):
+    key = hashlib.sha1(os.path.abspath(run_path).encode('utf-8')).hexdigest()[:20]
+    return os.path.join(cache_dir, f'{key}.npz')
+
+
+def _encode_frame(df, arrays):
+    """把 DataFrame 按列写入 arrays，字符串 / 分类列编码为整数码 + 字典，数值列保持原类型"""
+    import pandas as pd
+
+    columns = []
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object or isinstance(values.dtype, (pd.StringDtype, pd.CategoricalDtype)):
+            codes, uniques = pd.factorize(values)
+            arrays[f'code:{col}'] = codes.astype(np.int32)
+            arrays[f'dict:{col}'] = np.asarray(uniques, dtype=str)
+            columns.append([col, 'str'])
+        else:
+            arrays[f'col:{col}'] = values.to_numpy()
+            columns.append([col, 'num'])
+    return columns
+
+
+def _decode_frame(columns, npz):
+    """字符串列还原为分类列（与 parse_monitor_log 的 Node 列一致）"""
+    import pandas as pd
+
+    data = {}
+    for col, kind in columns:
+        if kind == 'str':
+            data[col] = pd.Categorical.from_codes(npz[f'code:{col}'],
+                                                  categories=list(npz[f'dict:{col}']))
+        else:
+            data[col] = npz[f'col:{col}']
+    return pd.DataFrame(data)
+
+
+def load_cached_run(cache_dir, run_path, monitor=True):
+    """
+    读取某次运行的缓存
+    命中返回 (monitor DataFrame 或 None, stage 字典或 None)，未命中或缓存损坏返回 None
+    monitor=False 时不解码 monitor 数据（不需要 pandas），第一项总是 None
+    """
+    path = _cache_path(cache_dir, run_path)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            meta = json.loads(str(npz['meta']))
+            if (meta.get('version') != CACHE_VERSION
+                    or meta.get('run_path') != os.path.abspath(run_path)
+                    or meta.get('signature') != run_signature(run_path)):
+                return None
+
+            columns = meta['monitor_columns']
+            df = _decode_frame(columns, npz) if monitor and columns is not None else None
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return df, meta['stage_info']
+
+
+def save_cached_run(cache_dir, run_path, df, stage_info, signature=None):
+    """写入某次运行的解析结果；signature 应取自解析之前，避免记录到解析期间被改写的文件"""
+    os.makedirs(cache_dir, exist_ok=True)
+
+    arrays = {}
+    columns = _encode_frame(df, arrays) if df is not None else None
+    meta = {
+        'version': CACHE_VERSION,
+        'run_path': os.path.abspath(run_path),
+        'signature': signature if signature is not None else run_signature(run_path),
+        'monitor_columns': columns,
+        'stage_info': stage_info,
+    }
+    arrays['meta'] = np.array(json.dumps(meta, ensure_ascii=False))
+
+    path = _cache_path(cache_dir, run_path)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
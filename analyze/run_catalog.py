@@ -0,0 +1,229 @@
+"""
+实验运行目录的 SQLite 索引
+
+每次运行一行（数据集、slowstart、运行时间、文件路径、阶段耗时、CPU / MEM 汇总），
+阶段字典和计数器中的所有指标另存于 run_metrics 表。ingest 只解析目录中新增的运行，
+之后按数据集 / slowstart / 时间的查询都走索引，不再遍历目录或重新解析日志。
+"""
+import os
+import json
+import sqlite3
+import datetime
+
+from common_utils import discover_runs, sort_dataset_key, _load_runs
+
+
+CATALOG_NAME = '.catalog.sqlite'
+SCHEMA_VERSION = 1
+
+# runs 表中直接存放的常用阶段指标：(列名, stage 字典中的键)
+STAGE_COLUMNS = (
+    ('total_time', '总耗时(s)'),
+    ('map_time', 'Map耗时(s)'),
+    ('shuffle_time', 'Shuffle耗时(s)'),
+    ('sort_time', 'Sort耗时(s)'),
+    ('reduce_time', 'Reduce耗时(s)'),
+    ('overlap_ratio', 'Shuffle重叠比(%)'),
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_path TEXT NOT NULL UNIQUE,
+    dataset TEXT NOT NULL,
+    dataset_mb INTEGER NOT NULL,
+    slowstart REAL NOT NULL,
+    run_time TEXT,
+    monitor_log TEXT,
+    job_log TEXT,
+    jhist TEXT,
+    signature TEXT NOT NULL,
+    ingested_at TEXT NOT NULL,
+    samples INTEGER,
+    cpu_mean REAL,
+    cpu_max REAL,
+    mem_mean REAL,
+    mem_max REAL,
+    {', '.join(f'{column} REAL' for column, _ in STAGE_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_runs_dataset_ss ON runs (dataset, slowstart);
+CREATE INDEX IF NOT EXISTS idx_runs_ss ON runs (slowstart);
+CREATE INDEX IF NOT EXISTS idx_runs_time ON runs (run_time);
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_metrics_name ON run_metrics (name, value);
+"""
+
+
+def default_catalog_path(base_dir):
+    """默认索引文件：<base_dir>/.catalog.sqlite"""
+    return os.path.join(base_dir, CATALOG_NAME)
+
+
+def open_catalog(path):
+    """打开（必要时创建）索引数据库"""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA journal_mode = WAL')
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version not in (0, SCHEMA_VERSION):
+        conn.close()
+        raise RuntimeError(f"索引 {path} 的版本为 {version}，当前为 {SCHEMA_VERSION}，请删除后重新 ingest")
+    conn.executescript(SCHEMA)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return conn
+
+
+def parse_run_time(run_path):
+    """运行目录名 20251128_191109 对应的时间（ISO 格式字符串），无法解析时返回 None"""
+    try:
+        t = datetime.datetime.strptime(os.path.basename(run_path.rstrip(os.sep)), '%Y%m%d_%H%M%S')
+    except ValueError:
+        return None
+    return t.isoformat(sep=' ')
+
+
+def monitor_summary(df):
+    """单次运行的集群 CPU / MEM 汇总：各时间步集群均值的平均值和最大值"""
+    if df is None or df.empty:
+        return {'samples': 0}
+    per_step = df.groupby('Time_Step')[['CPU', 'MEM']].mean()
+    return {
+        'samples': len(df),
+        'cpu_mean': float(per_step['CPU'].mean()),
+        'cpu_max': float(per_step['CPU'].max()),
+        'mem_mean': float(per_step['MEM'].mean()),
+        'mem_max': float(per_step['MEM'].max()),
+    }
+
+
+def _run_files(run_path):
+    from jhist_parser import find_jhist
+
+    files = {}
+    for column, name in (('monitor_log', 'monitor.log'), ('job_log', 'job_output.log')):
+        path = os.path.join(run_path, name)
+        files[column] = path if os.path.exists(path) else None
+    files['jhist'] = find_jhist(run_path)
+    return files
+
+
+def _insert_run(conn, dataset, slowstart, run_path, signature, df, stage_info):
+    stage_info = stage_info or {}
+    row = {
+        'run_path': os.path.abspath(run_path),
+        'dataset': dataset,
+        'dataset_mb': sort_dataset_key(dataset),
+        'slowstart': slowstart,
+        'run_time': parse_run_time(run_path),
+        'signature': json.dumps(signature, sort_keys=True),
+        'ingested_at': datetime.datetime.now().isoformat(sep=' ', timespec='seconds'),
+        **_run_files(run_path),
+        **monitor_summary(df),
+    }
+    for column, key in STAGE_COLUMNS:
+        row[column] = stage_info.get(key)
+
+    conn.execute('DELETE FROM runs WHERE run_path = ?', (row['run_path'],))
+    columns = ', '.join(row)
+    placeholders = ', '.join(f':{c}' for c in row)
+    cur = conn.execute(f'INSERT INTO runs ({columns}) VALUES ({placeholders})', row)
+    conn.executemany('INSERT INTO run_metrics (run_id, name, value) VALUES (?, ?, ?)',
+                     [(cur.lastrowid, name, float(value)) for name, value in stage_info.items()
+                      if isinstance(value, (int, float))])
+
+
+def ingest_runs(base_dir='./MapReduceLog', catalog_path=None, refresh=False,
+                workers=None, executor='process', use_cache=True, chunked=False):
+    """
+    把 base_dir 下尚未收录的运行加入索引，返回新收录（或更新）的运行数
+    refresh 时同时比较文件签名，重新收录有改动的运行
+    """
+    from run_cache import default_cache_dir, run_signature
+
+    if not os.path.exists(base_dir):
+        print(f"错误：找不到目录 {base_dir}")
+        return 0
+
+    catalog_path = catalog_path or default_catalog_path(base_dir)
+    conn = open_catalog(catalog_path)
+    known = {path: signature for path, signature in
+             conn.execute('SELECT run_path, signature FROM runs')}
+
+    pending = []
+    for dataset, slowstart, paths in discover_runs(base_dir):
+        for run_path in paths:
+            abs_path = os.path.abspath(run_path)
+            if abs_path not in known:
+                pending.append((dataset, slowstart, run_path, run_signature(run_path)))
+            elif refresh:
+                signature = run_signature(run_path)
+                if json.dumps(signature, sort_keys=True) != known[abs_path]:
+                    pending.append((dataset, slowstart, run_path, signature))
+
+    print(f"索引中已有 {len(known)} 次运行，待收录 {len(pending)} 次")
+    if pending:
+        cache_dir = default_cache_dir(base_dir) if use_cache else None
+        if cache_dir is not None and chunked:
+            cache_dir = os.path.join(cache_dir, 'steps')
+        results = _load_runs([p[2] for p in pending], workers, executor, cache_dir,
+                             chunked=chunked)
+        with conn:
+            for (dataset, slowstart, run_path, signature), (df, stage_info) in zip(pending, results):
+                _insert_run(conn, dataset, slowstart, run_path, signature, df, stage_info)
+
+    conn.close()
+    print(f"索引已更新: {catalog_path}")
+    return len(pending)
+
+
+def query_runs(catalog_path, dataset=None, min_slowstart=None, max_slowstart=None,
+               since=None, until=None, metrics=None, limit=None):
+    """
+    按条件查询索引，返回字典列表（按数据集大小、slowstart、运行时间排序）
+    since / until 为 datetime 或 ISO 字符串；metrics 为要附带的 run_metrics 指标名列表
+    """
+    conditions = []
+    params = []
+    if dataset is not None:
+        conditions.append('dataset = ?')
+        params.append(dataset.upper())
+    if min_slowstart is not None:
+        conditions.append('slowstart >= ?')
+        params.append(min_slowstart)
+    if max_slowstart is not None:
+        conditions.append('slowstart <= ?')
+        params.append(max_slowstart)
+    if since is not None:
+        conditions.append('run_time >= ?')
+        params.append(str(since))
+    if until is not None:
+        conditions.append('run_time <= ?')
+        params.append(str(until))
+
+    where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+    sql = f'SELECT * FROM runs{where} ORDER BY dataset_mb, slowstart, run_time'
+    if limit is not None:
+        sql += f' LIMIT {int(limit)}'
+
+    conn = open_catalog(catalog_path)
+    rows = [dict(row) for row in conn.execute(sql, params)]
+    if metrics and rows:
+        by_id = {row['id']: row for row in rows}
+        for row in rows:
+            row.update(dict.fromkeys(metrics))
+        # 只取满足同样条件的运行的指标（走 run_metrics 的主键）
+        marks = ', '.join('?' * len(metrics))
+        metric_sql = (f'SELECT m.run_id, m.name, m.value FROM runs '
+                      f'JOIN run_metrics m ON m.run_id = runs.id{where}'
+                      f'{" AND" if where else " WHERE"} m.name IN ({marks})')
+        for run_id, name, value in conn.execute(metric_sql, params + list(metrics)):
+            if run_id in by_id:
+                by_id[run_id][name] = value
+    conn.close()
+    return rows
@@ -0,0 +1,170 @@
+"""
+多轮实验的统计层：稳健离群剔除、中位数、批量 bootstrap 置信区间，以及带显著性标记的最优 slowstart 选择
+
+每个 (数据集, slowstart, 指标) 是一组样本（通常只有 3 轮）。所有组补齐成一个矩阵后，
+bootstrap 重抽样一次性在 NumPy 中完成，不按组、不按抽样次数循环。
+"""
+import numpy as np
+
+
+# 修正 z 分数（0.6745 * |x - 中位数| / MAD）超过该值视为离群（Iglewicz & Hoaglin）
+OUTLIER_Z = 3.5
+# 同时要求偏离中位数超过该比例：只有 3 轮时 MAD 很小，单靠 z 分数会误剔除正常波动
+OUTLIER_REL = 0.1
+N_BOOT = 2000
+CONFIDENCE = 0.95
+
+
+def robust_outlier_mask(values, z=OUTLIER_Z):
+    """
+    返回与 values 等长的布尔数组，True 表示离群
+    修正 z 分数超过 z 且相对中位数偏离超过 OUTLIER_REL 才算离群；
+    样本少于 3 个时不剔除；最多剔除到只剩一半样本
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mask = np.zeros(len(values), dtype=bool)
+    if len(values) < 3:
+        return mask
+
+    median = np.median(values)
+    deviation = np.abs(values - median)
+    mad = np.median(deviation)
+    relative = deviation > OUTLIER_REL * abs(median)
+    if mad > 0:
+        mask = (0.6745 * deviation / mad > z) & relative
+    else:
+        mask = relative
+
+    if mask.sum() > len(values) // 2:
+        return np.zeros(len(values), dtype=bool)
+    return mask
+
+
+def robust_upper_limit(values):
+    """去掉离群的过大值后的最大值；没有离群时就是最大值"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return None
+    mask = robust_outlier_mask(values) & (values > np.median(values))
+    return float(values[~mask].max())
+
+
+def bootstrap_means(matrix, counts, n_boot=N_BOOT, seed=0):
+    """
+    批量 bootstrap：matrix 为 (组数, 最大样本数)，每行前 counts[i] 个为有效样本
+    返回 (组数, n_boot) 的重抽样均值
+    """
+    rng = np.random.default_rng(seed)
+    n_groups, width = matrix.shape
+    counts = np.asarray(counts)
+
+    # 每组在 [0, count) 内有放回抽样；超出 count 的位置不参与求和
+    idx = (rng.random((n_groups, n_boot, width)) * counts[:, None, None]).astype(np.intp)
+    samples = np.take_along_axis(np.broadcast_to(matrix[:, None, :], idx.shape), idx, axis=2)
+    valid = np.arange(width) < counts[:, None]
+    sums = np.where(valid[:, None, :], samples, 0.0).sum(axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts[:, None]
+
+
+def run_statistics(stage_data, metrics=None, n_boot=N_BOOT, confidence=CONFIDENCE,
+                   seed=0, reject_outliers=True):
+    """
+    对 {dataset: {slowstart: [stage 字典, ...]}} 中每个 (数据集, slowstart, 指标) 做统计
+    返回 (stats, boot)：
+      stats 为 DataFrame(Dataset, SlowStart, Metric, N, N_Used, Outliers, Mean_All, Mean, Median, Std,
+                         CI_Low, CI_High)，Mean 等为剔除离群后的结果
+      boot 为与 stats 行对齐的 (行数, n_boot) bootstrap 均值矩阵，供 select_best 做显著性判断
+    """
+    import pandas as pd
+
+    keys = []
+    groups = []
+    for dataset, ss_dict in stage_data.items():
+        for slowstart, stage_list in ss_dict.items():
+            names = metrics
+            if names is None:
+                names = dict.fromkeys(k for stage in stage_list for k, v in stage.items()
+                                      if isinstance(v, (int, float)))
+            for metric in names:
+                values = [stage[metric] for stage in stage_list
+                          if stage.get(metric) is not None]
+                if values:
+                    keys.append((dataset, slowstart, metric))
+                    groups.append(np.asarray(values, dtype=np.float64))
+
+    columns = ['Dataset', 'SlowStart', 'Metric', 'N', 'N_Used', 'Outliers', 'Mean_All',
+               'Mean', 'Median', 'Std', 'CI_Low', 'CI_High']
+    if not groups:
+        return pd.DataFrame(columns=columns), np.empty((0, n_boot))
+
+    # 剔除离群后补齐成矩阵（NaN 填充）
+    used = []
+    outliers = []
+    for values in groups:
+        mask = robust_outlier_mask(values) if reject_outliers else np.zeros(len(values), dtype=bool)
+        used.append(values[~mask])
+        outliers.append(','.join(f'{v:g}' for v in values[mask]))
+
+    counts = np.array([len(v) for v in used])
+    matrix = np.full((len(used), counts.max()), np.nan)
+    for i, values in enumerate(used):
+        matrix[i, :len(values)] = values
+
+    boot = bootstrap_means(matrix, counts, n_boot, seed)
+    alpha = (1 - confidence) / 2
+    ci_low, ci_high = np.quantile(boot, [alpha, 1 - alpha], axis=1)
+
+    stats = pd.DataFrame(keys, columns=['Dataset', 'SlowStart', 'Metric'])
+    stats['N'] = [len(v) for v in groups]
+    stats['N_Used'] = counts
+    stats['Outliers'] = outliers
+    stats['Mean_All'] = [v.mean() for v in groups]
+    stats['Mean'] = np.nanmean(matrix, axis=1)
+    stats['Median'] = np.nanmedian(matrix, axis=1)
+    stats['Std'] = [v.std(ddof=1) if len(v) > 1 else np.nan for v in used]
+    stats['CI_Low'] = ci_low
+    stats['CI_High'] = ci_high
+    return stats[columns], boot
+
+
+def select_best(stats, boot, metric, direction='min', confidence=CONFIDENCE):
+    """
+    每个数据集按（剔除离群后的）均值选出最优 slowstart，并与次优比较
+    P_Better 为 bootstrap 中最优设置优于次优设置的比例（相等记一半），
+    不低于 confidence 时 Significant 为 True，否则需要更多轮次才能区分
+    返回 DataFrame(Dataset, Metric, Best_SlowStart, Best_Mean, Runner_Up, Runner_Up_Mean,
+                   P_Better, Significant)
+    """
+    import pandas as pd
+
+    rows = []
+    selected = stats[stats['Metric'] == metric]
+    for dataset, group in selected.groupby('Dataset', sort=False):
+        order = group['Mean'].sort_values(ascending=(direction == 'min')).index
+        best = order[0]
+        row = {
+            'Dataset': dataset,
+            'Metric': metric,
+            'Best_SlowStart': group.at[best, 'SlowStart'],
+            'Best_Mean': group.at[best, 'Mean'],
+            'Runner_Up': None,
+            'Runner_Up_Mean': None,
+            'P_Better': None,
+            'Significant': False,
+        }
+        if len(order) > 1:
+            runner = order[1]
+            b, r = boot[stats.index.get_loc(best)], boot[stats.index.get_loc(runner)]
+            better = (b < r) if direction == 'min' else (b > r)
+            p_better = float(better.mean() + 0.5 * (b == r).mean())
+            row.update({
+                'Runner_Up': group.at[runner, 'SlowStart'],
+                'Runner_Up_Mean': group.at[runner, 'Mean'],
+                'P_Better': round(p_better, 3),
+                'Significant': p_better >= confidence,
+            })
+        rows.append(row)
+
+    return pd.DataFrame(rows, columns=['Dataset', 'Metric', 'Best_SlowStart', 'Best_Mean',
+                                       'Runner_Up', 'Runner_Up_Mean', 'P_Better', 'Significant'])
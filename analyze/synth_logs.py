@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+合成实验日志生成器
+
+按与真实采集相同的格式写出 monitor.log 和 job_output.log，目录结构与 run_batch.sh 一致：
+    <base_dir>/_<数据集>_slowstart_<ss>/<时间戳>/{monitor.log, job_output.log}
+节点数、作业时长、采样间隔、每组运行次数都可配置；同样的参数和 seed 生成完全相同的文件，
+用于在真实日志之外测量解析和平均化的扩展性（见 benchmark.py）。
+
+    python analyze/synth_logs.py /tmp/synth --nodes 20 --duration 1800 --runs 3
+"""
+import os
+import sys
+import argparse
+import datetime
+
+import numpy as np
+
+
+DEFAULT_DATASETS = ('100MB', '1G')
+DEFAULT_SLOWSTARTS = (0.2, 0.5, 0.8, 1.0)
+# 合成日志的起始时间（固定，保证输出可复现）
+BASE_TIME = datetime.datetime(2025, 11, 28, 19, 0, 0)
+BYTES_PER_MB = 1024 * 1024
+# 每个 Map 任务处理的数据量（HDFS 块大小）
+SPLIT_BYTES = 128 * BYTES_PER_MB
+# 合成作业总耗时最短的 slowstart
+SLOWSTART_OPTIMUM = 0.6
+
+
+def dataset_bytes(dataset):
+    """'100MB' / '5G' 对应的字节数"""
+    from recommend import parse_size
+    return int(parse_size(dataset))
+
+
+def job_timeline(duration, slowstart, rng):
+    """
+    作业各阶段在 [0, duration] 内的时刻（秒）
+    Map 占大部分时间；Reduce 在 Map 进度达到 slowstart 时启动，Shuffle 在 Map 结束后不久完成
+    """
+    map_end = duration * rng.uniform(0.78, 0.86)
+    map_start = min(12.0, duration * 0.05)
+    reduce_start = map_start + (map_end - map_start) * slowstart
+    shuffle_end = min(duration * 0.97, map_end + duration * rng.uniform(0.02, 0.05))
+    return {
+        'map_start': map_start,
+        'map_end': map_end,
+        'reduce_start': reduce_start,
+        'shuffle_end': shuffle_end,
+        'end': float(duration),
+    }
+
+
+def monitor_samples(n_nodes, timeline, interval, rng):
+    """
+    各节点每个采样时刻的 CPU / MEM（数组形状为 (时间步, 节点)）
+    Map 阶段 CPU 接近饱和，其余时间为低负载；内存随 Map 逐步上升，作业结束后回落
+    """
+    times = np.arange(0.0, timeline['end'] + 10.0, interval)
+    in_map = (times >= timeline['map_start']) & (times <= timeline['map_end'])
+    in_reduce = (times >= timeline['reduce_start']) & (times <= timeline['shuffle_end'])
+
+    # 每个节点的负载强度略有差异
+    strength = rng.uniform(0.85, 1.0, n_nodes)
+    base = np.where(in_map[:, None], 95.0 * strength, 12.0)
+    base = base + np.where(in_reduce[:, None], 15.0, 0.0)
+    cpu = np.clip(base + rng.normal(0, 6.0, (len(times), n_nodes)), 0, 100)
+
+    progress = np.clip((times - timeline['map_start'])
+                       / (timeline['map_end'] - timeline['map_start']), 0, 1)
+    mem = 20 + 30 * progress[:, None] * strength + rng.normal(0, 3.0, (len(times), n_nodes))
+    mem = np.where(times[:, None] > timeline['end'], 22.0, mem)
+    return times, np.round(cpu, 2), np.clip(np.round(mem), 0, 100).astype(int)
+
+
+def format_time(t):
+    return t.strftime('%Y-%m-%d %H:%M:%S') + f',{t.microsecond // 1000:03d}'
+
+
+def write_monitor_log(path, start, nodes, times, cpu, mem, timestamps=True):
+    """按 monitor_real.py 的格式写出：每个时间步各节点一行，以 ---- 分隔"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"===== Real Performance Monitor Started at {start:%Y-%m-%d %H:%M:%S} =====\n")
+        for step, t in enumerate(times):
+            prefix = format_time(start + datetime.timedelta(seconds=float(t))) + ' ' if timestamps else ''
+            lines = [f"{prefix}[{node}] CPU: {cpu[step, i]:.2f}% | MEM: {mem[step, i]}%"
+                     for i, node in enumerate(nodes)]
+            f.write('\n'.join(lines) + '\n----\n')
+        f.write("===== Job Finished =====\n")
+        f.write(f"===== Total Duration: {int(times[-1])}s =====\n")
+
+
+def job_counters(size_bytes, rng):
+    """与数据量成比例的 Hadoop 计数器（分组 -> [(名称, 值), ...]）"""
+    maps = max(1, int(np.ceil(size_bytes / SPLIT_BYTES)))
+    map_records = int(size_bytes * 0.157)
+    materialized = int(size_bytes * 0.445)
+    cpu_ms = int(size_bytes / BYTES_PER_MB * rng.uniform(1150, 1300))
+    return maps, {
+        'File System Counters': [
+            ('FILE: Number of bytes read', materialized),
+            ('FILE: Number of bytes written', int(materialized * 2.6)),
+            ('HDFS: Number of bytes read', size_bytes),
+            ('HDFS: Number of bytes written', int(size_bytes * 0.094)),
+        ],
+        'Job Counters ': [
+            ('Killed map tasks', int(rng.integers(0, 4))),
+            ('Launched map tasks', maps + int(rng.integers(0, 4))),
+            ('Launched reduce tasks', 1),
+        ],
+        'Map-Reduce Framework': [
+            ('Map output records', map_records),
+            ('Map output materialized bytes', materialized),
+            ('Reduce shuffle bytes', materialized),
+            ('Spilled Records', int(map_records * 0.377)),
+            ('GC time elapsed (ms)', int(cpu_ms * rng.uniform(0.2, 0.26))),
+            ('CPU time spent (ms)', cpu_ms),
+            ('Physical memory (bytes) snapshot', int(size_bytes * 318)),
+        ],
+    }
+
+
+def write_job_log(path, start, timeline, slowstart, size_bytes, dataset, job_id, rng):
+    """按 run_mr_real.sh 的格式写出：表头、进度行、计数器块和结束标记"""
+    maps, counters = job_counters(size_bytes, rng)
+    launch = start + datetime.timedelta(seconds=1)
+
+    def at(seconds):
+        return format_time(launch + datetime.timedelta(seconds=float(seconds)))
+
+    lines = [
+        "===== Running MapReduce Job =====",
+        f"Input : /wiki{dataset.lower()}",
+        f"Output: /_{dataset.lower()}",
+        f"Slowstart: {slowstart}",
+        f"Date  : {start:%Y-%m-%d %H:%M:%S}",
+        "=================================",
+        f"{at(0)} INFO input.FileInputFormat: Total input files to process : {maps}",
+        f"{at(0.5)} INFO mapreduce.JobSubmitter: number of splits:{maps}",
+        f"{at(1)} INFO mapreduce.Job: Running job: {job_id}",
+        f"{at(timeline['map_start'] - 1)} INFO mapreduce.Job: Job {job_id} running in uber mode : false",
+    ]
+
+    # 进度行：大约每秒一行，只在进度变化时输出
+    last = None
+    for t in np.arange(timeline['map_start'], timeline['end'] + 0.5, 1.0):
+        map_pct = int(np.clip((t - timeline['map_start'])
+                              / (timeline['map_end'] - timeline['map_start']), 0, 1) * 100)
+        if t < timeline['reduce_start']:
+            red_pct = 0
+        elif t <= timeline['shuffle_end']:
+            red_pct = int(33 * (t - timeline['reduce_start'])
+                          / max(timeline['shuffle_end'] - timeline['reduce_start'], 1))
+        else:
+            red_pct = 67 + int(33 * (t - timeline['shuffle_end'])
+                               / max(timeline['end'] - timeline['shuffle_end'], 1))
+        red_pct = min(red_pct, 100)
+        if (map_pct, red_pct) != last:
+            lines.append(f"{at(t + rng.uniform(0, 0.3))} INFO mapreduce.Job:  map {map_pct}% reduce {red_pct}%")
+            last = (map_pct, red_pct)
+
+    lines.append(f"{at(timeline['end'] + 1)} INFO mapreduce.Job: Job {job_id} completed successfully")
+    lines.append(f"{at(timeline['end'] + 1)} INFO mapreduce.Job: Counters: "
+                 f"{sum(len(v) for v in counters.values())}")
+    for group, items in counters.items():
+        lines.append(f"\t{group}")
+        lines.extend(f"\t\t{name}={value}" for name, value in items)
+    lines.append("[INFO] MapReduce job finished.")
+    lines.append("[INFO] Monitor stopped.")
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def generate_run(run_path, dataset, slowstart, start, nodes=3, duration=600.0, interval=1.0,
+                 seed=0, timestamps=True, job_id='job_1764325814997_0001'):
+    """生成一次运行的 monitor.log 和 job_output.log，返回 (monitor 行数, job 行数)"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(run_path, exist_ok=True)
+
+    node_names = [f'worker{i + 1}-syn' for i in range(nodes)]
+    timeline = job_timeline(duration, slowstart, rng)
+    times, cpu, mem = monitor_samples(nodes, timeline, interval, rng)
+
+    monitor_log = os.path.join(run_path, 'monitor.log')
+    job_log = os.path.join(run_path, 'job_output.log')
+    write_monitor_log(monitor_log, start, node_names, times, cpu, mem, timestamps)
+    write_job_log(job_log, start, timeline, slowstart, dataset_bytes(dataset), dataset, job_id, rng)
+
+    with open(job_log, 'rb') as f:
+        job_lines = sum(1 for _ in f)
+    return len(times) * (nodes + 1) + 3, job_lines
+
+
+def generate_archive(base_dir, datasets=DEFAULT_DATASETS, slowstarts=DEFAULT_SLOWSTARTS, runs=3,
+                     nodes=3, duration=600.0, interval=1.0, seed=0, timestamps=True):
+    """
+    生成完整的实验目录；作业时长按数据集大小相对第一个数据集线性放大（duration 为第一个数据集
+    在最优 slowstart 下的时长）
+    返回统计 {'runs': 运行数, 'monitor_lines': ..., 'job_lines': ..., 'bytes': ...}
+    """
+    stats = {'runs': 0, 'monitor_lines': 0, 'job_lines': 0, 'bytes': 0}
+    reference = dataset_bytes(datasets[0])
+    rng = np.random.default_rng(seed)
+    start = BASE_TIME
+    job_seq = 0
+
+    for dataset in datasets:
+        scale = dataset_bytes(dataset) / reference
+        for slowstart in slowstarts:
+            ss_dir = os.path.join(base_dir, f'_{dataset.lower()}_slowstart_{slowstart}')
+            for _ in range(runs):
+                job_seq += 1
+                # 总耗时随 slowstart 呈 U 形（SLOWSTART_OPTIMUM 附近最短），另加 ±2% 的轮次波动
+                run_duration = (duration * scale * (1 + 0.5 * (slowstart - SLOWSTART_OPTIMUM) ** 2)
+                                * rng.uniform(0.98, 1.02))
+                run_path = os.path.join(ss_dir, start.strftime('%Y%m%d_%H%M%S'))
+                monitor_lines, job_lines = generate_run(
+                    run_path, dataset, slowstart, start, nodes, run_duration, interval,
+                    seed=seed * 100003 + job_seq, timestamps=timestamps,
+                    job_id=f'job_1764325814997_{job_seq:04d}')
+
+                stats['runs'] += 1
+                stats['monitor_lines'] += monitor_lines
+                stats['job_lines'] += job_lines
+                stats['bytes'] += sum(os.path.getsize(os.path.join(run_path, name))
+                                      for name in os.listdir(run_path))
+                start += datetime.timedelta(seconds=int(run_duration) + 30)
+
+    return stats
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="生成合成的 monitor.log / job_output.log")
+    parser.add_argument('base_dir', help="输出目录（与 MapReduceLog 结构相同）")
+    parser.add_argument('--datasets', nargs='+', default=list(DEFAULT_DATASETS),
+                        help="数据集大小，如 100MB 1G 5G")
+    parser.add_argument('--slowstarts', type=float, nargs='+', default=list(DEFAULT_SLOWSTARTS))
+    parser.add_argument('--runs', type=int, default=3, help="每个 数据集 x slowstart 的运行次数")
+    parser.add_argument('--nodes', type=int, default=3, help="节点数")
+    parser.add_argument('--duration', type=float, default=600.0,
+                        help="第一个数据集的作业时长（秒），其余按数据量放大")
+    parser.add_argument('--interval', type=float, default=1.0, help="采样间隔（秒）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--legacy', action='store_true', help="不带采样时间戳（旧版 monitor_real.sh 格式）")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    stats = generate_archive(args.base_dir, args.datasets, args.slowstarts, args.runs, args.nodes,
+                             args.duration, args.interval, args.seed, not args.legacy)
+    print(f"已生成 {stats['runs']} 次运行: monitor {stats['monitor_lines']} 行，"
+          f"job {stats['job_lines']} 行，共 {stats['bytes'] / BYTES_PER_MB:.1f} MB -> {args.base_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
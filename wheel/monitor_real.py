@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+并发采集各 Worker 节点的 CPU / 内存占用（monitor_real.sh 的异步版本）
+
+每个节点只建立一条持久的 ssh 连接（ControlMaster 复用），远端常驻一个读取进程；
+每个采样周期同时向所有节点发出请求，CPU 利用率由相邻两次 /proc/stat 的差分得到，
+不再需要 sleep 1。输出格式与 monitor_real.sh 一致，可直接由 parse_monitor_log 解析：
+
+    ===== Real Performance Monitor Started at ... =====
+    2025-11-28 19:11:13,464 [worker1-zzh] CPU: 8.00% | MEM: 20%
+    ...
+    ----
+
+节点列表默认读取 config/workers（可用 --workers-file 给出多个集群的 workers 文件，
+或用 --nodes 直接指定），找不到时使用内置的 NODES。
+
+--format binary 时写出定长二进制采样文件（格式见 analyze/monitor_binary.py）：每个节点的采样
+先进入定长环形缓冲，缓冲写满（--ring-steps 个周期）或退出时按 (时间步, 节点) 顺序批量写入，
+分析端可直接 memory-map，也可用 monitor_binary.py 转换回上面的文本格式。
+
+本地测试时使用 --transport local --proc-root DIR，从 DIR/<节点名>/proc/stat 和
+DIR/<节点名>/proc/meminfo 读取伪造的 /proc 文件代替 ssh。
+
+用法: python3 monitor_real.py <logfile> [--interval 1] [--watch-yarn] [--format binary]
+"""
+import os
+import sys
+import time
+import heapq
+import shlex
+import array
+import shutil
+import signal
+import struct
+import asyncio
+import argparse
+import datetime
+import tempfile
+
+
+# Worker 节点列表（没有 workers 文件时使用）
+NODES = ["worker1-zzh", "worker2-zrt", "worker3-haz"]
+DEFAULT_WORKERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config', 'workers')
+
+# 二进制采样文件的布局，须与 analyze/monitor_binary.py 的 HEADER_DTYPE / SAMPLE_DTYPE 一致
+BINARY_MAGIC = b'MRMONBIN'
+BINARY_VERSION = 1
+NODE_NAME_BYTES = 64
+# 魔数、版本、节点数、启动时刻、结束时刻（写完前为 0）、UTC 偏移（秒）、保留
+HEADER = struct.Struct('<8sIIddiI')
+HEADER_END_OFFSET = 24
+# 采样时刻、时间步、节点下标、MEM%、填充、CPU%
+RECORD = struct.Struct('<dIHBxf')
+# 每个节点环形缓冲的容量（采样周期数），写满时批量落盘
+RING_STEPS = 60
+
+# 远端常驻读取进程：每读到一行请求，输出一次 /proc/stat 的 cpu 行和内存信息
+END_MARK = '@@END'
+REMOTE_READER = (
+    'while read -r _; do '
+    'head -n 1 {root}/proc/stat; '
+    'grep -E "^(MemTotal|MemAvailable):" {root}/proc/meminfo; '
+    'echo ' + END_MARK + '; '
+    'done'
+)
+
+
+def format_timestamp(ts):
+    """与 Hadoop 日志一致的时间戳格式：2025-11-28 19:11:13,464"""
+    dt = datetime.datetime.fromtimestamp(ts)
+    return dt.strftime('%Y-%m-%d %H:%M:%S') + f',{dt.microsecond // 1000:03d}'
+
+
+def parse_reading(lines):
+    """解析一次读取结果，返回 (cpu_total, cpu_idle, mem_total_kb, mem_avail_kb)"""
+    cpu_total = cpu_idle = mem_total = mem_avail = None
+    for line in lines:
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == 'cpu':
+            # 与 monitor_real.sh 相同：user..steal 求和，idle 单独取出
+            values = [int(v) for v in fields[1:8]]
+            cpu_total = sum(values)
+            cpu_idle = values[3]
+        elif fields[0] == 'MemTotal:':
+            mem_total = int(fields[1])
+        elif fields[0] == 'MemAvailable:':
+            mem_avail = int(fields[1])
+
+    if None in (cpu_total, cpu_idle, mem_total, mem_avail):
+        raise ValueError(f"无法解析采样结果: {lines!r}")
+    return cpu_total, cpu_idle, mem_total, mem_avail
+
+
+def cpu_percent(prev, cur):
+    """两次读数之间的 CPU 利用率 (%)"""
+    cpu_diff = cur[0] - prev[0]
+    idle_diff = cur[1] - prev[1]
+    if cpu_diff <= 0:
+        return 0.0
+    return (1 - idle_diff / cpu_diff) * 100
+
+
+def mem_percent(reading):
+    """内存占用率 (%)：(MemTotal - MemAvailable) / MemTotal"""
+    _, _, total, avail = reading
+    return (total - avail) / total * 100 if total else 0.0
+
+
+def format_sample(ts, node, cpu, mem):
+    """单个节点一次采样的日志行"""
+    return f"{format_timestamp(ts)} [{node}] CPU: {cpu:.2f}% | MEM: {mem:.0f}%"
+
+
+def read_workers(paths):
+    """读取 Hadoop workers 文件（每行一个节点，忽略空行和 # 注释），多个文件按顺序合并去重"""
+    nodes = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                node = line.split('#', 1)[0].strip()
+                if node and node not in nodes:
+                    nodes.append(node)
+    return nodes
+
+
+class NodeRing:
+    """单个节点的定长环形缓冲：预分配 capacity 条定长记录，按写入顺序取出"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buf = bytearray(capacity * RECORD.size)
+        self.steps = array.array('I', bytes(4 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def full(self):
+        return self.count == self.capacity
+
+    def push(self, step, ts, node_idx, cpu, mem):
+        pos = (self.head + self.count) % self.capacity
+        RECORD.pack_into(self.buf, pos * RECORD.size, ts, step, node_idx, mem, cpu)
+        self.steps[pos] = step
+        if self.full():
+            # 调用方在写满时落盘，正常不会覆盖；万一发生则丢弃最旧的一条
+            self.head = (self.head + 1) % self.capacity
+        else:
+            self.count += 1
+
+    def drain(self, node_idx):
+        """取出所有记录：[(时间步, 节点下标, 记录字节), ...]，并清空缓冲"""
+        items = []
+        for i in range(self.count):
+            pos = (self.head + i) % self.capacity
+            items.append((self.steps[pos], node_idx,
+                          bytes(self.buf[pos * RECORD.size:(pos + 1) * RECORD.size])))
+        self.head = (self.head + self.count) % self.capacity
+        self.count = 0
+        return items
+
+
+class TextSampleWriter:
+    """monitor.log 文本格式：每个周期写一组采样行和 ---- 分隔"""
+
+    def __init__(self, path, nodes):
+        self.nodes = nodes
+        self.out = open(path, 'a', encoding='utf-8')
+
+    def start(self, start_ts):
+        started = datetime.datetime.fromtimestamp(start_ts).strftime('%Y-%m-%d %H:%M:%S')
+        self.out.write(f"===== Real Performance Monitor Started at {started} =====\n")
+        self.out.flush()
+
+    def write_step(self, step, ts, samples):
+        lines = [format_sample(ts, self.nodes[i], cpu, mem) for i, cpu, mem in samples]
+        self.out.write('\n'.join(lines) + '\n----\n')
+        self.out.flush()
+
+    def close(self, start_ts, end_ts):
+        self.out.write("===== Job Finished =====\n")
+        self.out.write(f"===== Total Duration: {int(end_ts - start_ts)}s =====\n")
+        self.out.close()
+
+
+class BinarySampleWriter:
+    """定长二进制采样文件：采样先进入各节点的环形缓冲，写满或退出时批量写入"""
+
+    def __init__(self, path, nodes, ring_steps=RING_STEPS):
+        self.nodes = nodes
+        self.rings = [NodeRing(ring_steps) for _ in nodes]
+        self.out = open(path, 'wb')
+
+    def start(self, start_ts):
+        utc_offset = time.localtime(start_ts).tm_gmtoff
+        self.out.write(HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(self.nodes),
+                                   start_ts, 0.0, utc_offset, 0))
+        for node in self.nodes:
+            self.out.write(node.encode('utf-8')[:NODE_NAME_BYTES].ljust(NODE_NAME_BYTES, b'\0'))
+        self.out.flush()
+
+    def write_step(self, step, ts, samples):
+        for i, cpu, mem in samples:
+            self.rings[i].push(step, ts, i, cpu, min(max(round(mem), 0), 255))
+        if any(ring.full() for ring in self.rings):
+            self.flush()
+
+    def flush(self):
+        """各节点缓冲按 (时间步, 节点下标) 归并后一次写入"""
+        batches = [ring.drain(i) for i, ring in enumerate(self.rings)]
+        records = b''.join(record for _, _, record in heapq.merge(*batches))
+        if records:
+            self.out.write(records)
+            self.out.flush()
+
+    def close(self, start_ts, end_ts):
+        self.flush()
+        # 写入结束时刻，分析端据此输出总耗时
+        self.out.seek(HEADER_END_OFFSET)
+        self.out.write(struct.pack('<d', end_ts))
+        self.out.close()
+
+
+class NodeReader:
+    """单个节点上常驻的远端读取进程"""
+
+    def __init__(self, node, transport='ssh', proc_root='', control_dir=None):
+        self.node = node
+        self.transport = transport
+        self.proc_root = proc_root
+        self.control_dir = control_dir
+        self.proc = None
+        self.prev = None
+
+    def command(self):
+        if self.transport == 'local':
+            root = os.path.join(self.proc_root, self.node)
+            return ['sh', '-c', REMOTE_READER.format(root=shlex.quote(root))]
+
+        control_path = os.path.join(self.control_dir, '%r@%h:%p')
+        return ['ssh',
+                '-o', 'BatchMode=yes',
+                '-o', 'ControlMaster=auto',
+                '-o', f'ControlPath={control_path}',
+                '-o', 'ControlPersist=60',
+                self.node,
+                'sh -c ' + shlex.quote(REMOTE_READER.format(root=''))]
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            *self.command(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL)
+
+    async def read(self):
+        """请求一次读数，返回 (cpu_total, cpu_idle, mem_total_kb, mem_avail_kb)"""
+        if self.proc is None or self.proc.returncode is not None:
+            await self.start()
+
+        self.proc.stdin.write(b'\n')
+        await self.proc.stdin.drain()
+
+        lines = []
+        while True:
+            raw = await self.proc.stdout.readline()
+            if not raw:
+                raise ConnectionError(f"{self.node} 的远端读取进程已退出")
+            line = raw.decode('utf-8', 'replace').strip()
+            if line == END_MARK:
+                break
+            lines.append(line)
+        return parse_reading(lines)
+
+    async def close(self):
+        if self.proc is not None and self.proc.returncode is None:
+            self.proc.stdin.close()
+            try:
+                await asyncio.wait_for(self.proc.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                self.proc.kill()
+                await self.proc.wait()
+
+        if self.transport == 'ssh':
+            # 关闭复用的 ControlMaster 连接
+            control_path = os.path.join(self.control_dir, '%r@%h:%p')
+            proc = await asyncio.create_subprocess_exec(
+                'ssh', '-O', 'exit', '-o', f'ControlPath={control_path}', self.node,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+            await proc.wait()
+
+    def reset(self):
+        """连接出错后丢弃进程，下个周期重连并重新建立 CPU 基线"""
+        if self.proc is not None and self.proc.returncode is None:
+            self.proc.kill()
+        self.proc = None
+        self.prev = None
+
+
+async def yarn_job_running():
+    """与 monitor_real.sh 相同：yarn application -list 中是否还有 RUNNING 的作业"""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            'yarn', 'application', '-list',
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL)
+    except OSError:
+        return False
+    out, _ = await proc.communicate()
+    return b'RUNNING' in out
+
+
+async def sample_node(reader, timeout):
+    """采样单个节点，返回 (reading, error)"""
+    try:
+        return await asyncio.wait_for(reader.read(), timeout=timeout), None
+    except (asyncio.TimeoutError, OSError, ValueError) as e:
+        reader.reset()
+        return None, e
+
+
+async def run_monitor(logfile, nodes, interval=1.0, transport='ssh', proc_root='',
+                      watch_yarn=False, max_samples=None, stop_event=None, fmt='text',
+                      ring_steps=RING_STEPS):
+    """
+    主循环：每个周期并发采样所有节点，按 fmt（text / binary）写入 logfile
+    直到收到 SIGTERM / SIGINT、yarn 作业结束（watch_yarn）或达到 max_samples 个周期
+    """
+    stop_event = stop_event or asyncio.Event()
+    control_dir = tempfile.mkdtemp(prefix='mr-monitor-')
+    readers = [NodeReader(node, transport, proc_root, control_dir) for node in nodes]
+    if fmt == 'binary':
+        writer = BinarySampleWriter(logfile, nodes, ring_steps)
+    else:
+        writer = TextSampleWriter(logfile, nodes)
+
+    start_time = time.time()
+    loop = asyncio.get_running_loop()
+    writer.start(start_time)
+
+    samples = 0
+    next_tick = loop.time()
+    try:
+        while not stop_event.is_set():
+            if watch_yarn and not await yarn_job_running():
+                break
+
+            ts = time.time()
+            results = await asyncio.gather(
+                *(sample_node(r, interval) for r in readers))
+
+            step_samples = []
+            for i, (reader, (reading, error)) in enumerate(zip(readers, results)):
+                if error is not None:
+                    print(f"[WARN] {reader.node} 采样失败: {error}", file=sys.stderr)
+                    continue
+                if reader.prev is not None:
+                    step_samples.append((i, cpu_percent(reader.prev, reading), mem_percent(reading)))
+                reader.prev = reading
+
+            # 第一轮只建立 CPU 基线，不输出
+            if step_samples:
+                writer.write_step(samples, ts, step_samples)
+                samples += 1
+                if max_samples is not None and samples >= max_samples:
+                    break
+
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # 采样落后时跳过错过的周期，不做补偿性的连续采样
+                next_tick = loop.time()
+                delay = 0
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await asyncio.gather(*(r.close() for r in readers), return_exceptions=True)
+        shutil.rmtree(control_dir, ignore_errors=True)
+        writer.close(start_time, time.time())
+
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="并发采集 Worker 节点 CPU / 内存占用")
+    parser.add_argument('logfile', help="输出的 monitor.log（--format binary 时为 monitor.bin）路径")
+    parser.add_argument('--nodes', nargs='+', default=None, help="节点列表（优先于 --workers-file）")
+    parser.add_argument('--workers-file', nargs='+', default=None,
+                        help="Hadoop workers 文件，可给出多个集群的文件（默认 config/workers）")
+    parser.add_argument('--format', choices=['text', 'binary'], default='text', help="输出格式")
+    parser.add_argument('--ring-steps', type=int, default=RING_STEPS,
+                        help="binary 格式每个节点环形缓冲的周期数，写满时批量落盘")
+    parser.add_argument('--interval', type=float, default=1.0, help="采样间隔（秒）")
+    parser.add_argument('--transport', choices=['ssh', 'local'], default='ssh',
+                        help="ssh：远程节点；local：读取 --proc-root 下的伪造 /proc")
+    parser.add_argument('--proc-root', default='', help="local 模式下各节点 /proc 的根目录")
+    parser.add_argument('--watch-yarn', action='store_true',
+                        help="yarn 中没有 RUNNING 作业时自动退出")
+    parser.add_argument('--max-samples', type=int, default=None, help="最多采样的周期数")
+    args = parser.parse_args(argv)
+
+    nodes = args.nodes
+    if nodes is None:
+        if args.workers_file:
+            nodes = read_workers(args.workers_file)
+        elif os.path.exists(DEFAULT_WORKERS_FILE):
+            nodes = read_workers([DEFAULT_WORKERS_FILE])
+        nodes = nodes or NODES
+
+    async def runner():
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop_event.set)
+        return await run_monitor(args.logfile, nodes, args.interval,
+                                 args.transport, args.proc_root,
+                                 args.watch_yarn, args.max_samples, stop_event,
+                                 args.format, args.ring_steps)
+
+    asyncio.run(runner())
+
+
+if __name__ == '__main__':
+    main()
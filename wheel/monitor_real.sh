@@ -2,8 +2,13 @@
 
 LOGFILE=$1
 
-# Worker 节点列表
-NODES=("worker1-zzh" "worker2-zrt" "worker3-haz")
+# Worker 节点列表：默认读取 config/workers（可用 WORKERS_FILE 指定），找不到时使用内置列表
+WORKERS_FILE=${WORKERS_FILE:-"$(dirname "$0")/../config/workers"}
+if [[ -f "$WORKERS_FILE" ]]; then
+    NODES=($(sed -e 's/#.*//' "$WORKERS_FILE"))
+else
+    NODES=("worker1-zzh" "worker2-zrt" "worker3-haz")
+fi
 
 echo "===== Real Performance Monitor Started at $(date) =====" >> "$LOGFILE"
 
@@ -56,7 +61,9 @@ while true; do
         # 采样内存
         mem_usage=$(get_mem_usage $NODE)
 
-        echo "[$NODE] CPU: ${cpu_usage}% | MEM: ${mem_usage}%" >> "$LOGFILE"
+        # 行首带采样时间戳（与 Hadoop 日志格式一致），便于与作业进度按时间对齐
+        ts=$(date '+%Y-%m-%d %H:%M:%S,%3N')
+        echo "$ts [$NODE] CPU: ${cpu_usage}% | MEM: ${mem_usage}%" >> "$LOGFILE"
     done
 
     echo "----" >> "$LOGFILE"
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+slowstart 自适应实验调度（替代 run_batch.sh）
+
+日志目录结构与 run_batch.sh 相同：<log_dir>/<输出名>_slowstart_<ss>/<时间戳>/。
+不再对固定的 SLOWSTART_VALUES 各跑 RUNS_PER_SS 次，而是按已有结果决定下一次运行：
+
+  1. 每个候选值先跑 --min-runs 次；
+  2. 每一轮（rung）结束后按均值保留较好的一半（successive halving）；
+  3. 只剩两个以内的候选时，在最优值与相邻已试值之间取中点继续细化（--refine 次）；
+  4. 某个候选的置信区间半宽不超过均值的 --ci-tol 时不再重复，达到 --max-runs 也不再重复；
+  5. 最后一个候选收敛、或用完 --budget 次运行时结束。
+
+目录中已有的同名运行会先被读入，中断后重新执行即可接着调度。
+
+单次运行默认调用 run_mr_real.sh（通过 RUN_LOG_DIR 传入日志目录），可用 --submit 换成任意命令，
+例如用假的 hadoop 测试：HADOOP_CMD=/tmp/fake_hadoop python3 run_experiments.py ...
+
+用法: python3 run_experiments.py <input_path> <output_path> [--values 0.2 0.4 ...] [--budget 30]
+"""
+import os
+import sys
+import math
+import time
+import shlex
+import argparse
+import datetime
+import subprocess
+
+
+WHEEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_VALUES = [0.2, 0.4, 0.6, 0.8, 1.0]
+DEFAULT_LOG_DIR = os.path.expanduser('~/code/MapReduceLog')
+DEFAULT_SUBMIT = 'bash {wheel}/run_mr_real.sh {input} {output} {slowstart}'
+
+# 细化时相邻候选的最小间距
+MIN_STEP = 0.05
+# 双侧 95% t 分布分位数（自由度 1~10），更大的自由度用 2.0 近似
+T_975 = (None, 12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228)
+
+
+def format_slowstart(ss):
+    """与 run_batch.sh 的目录名一致：0.2、0.35、1.0"""
+    text = f'{round(ss, 3):.3f}'.rstrip('0')
+    return text + '0' if text.endswith('.') else text
+
+
+def confidence_interval(values):
+    """均值及 95% 置信区间半宽（t 分布）；少于 2 个样本时半宽为 inf"""
+    n = len(values)
+    if n == 0:
+        return None, math.inf
+    mean = sum(values) / n
+    if n < 2:
+        return mean, math.inf
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+    t = T_975[n - 1] if n - 1 < len(T_975) else 2.0
+    return mean, t * std / math.sqrt(n)
+
+
+def load_existing(log_dir, name, metric):
+    """读取目录中已有的同名运行，返回 {slowstart: [指标值, ...]}"""
+    from common_utils import parse_run
+
+    results = {}
+    prefix = f'{name}_slowstart_'
+    if not os.path.isdir(log_dir):
+        return results
+
+    for folder in sorted(os.listdir(log_dir)):
+        if not folder.startswith(prefix):
+            continue
+        try:
+            ss = float(folder[len(prefix):])
+        except ValueError:
+            continue
+        ss_dir = os.path.join(log_dir, folder)
+        for run in sorted(os.listdir(ss_dir)):
+            run_path = os.path.join(ss_dir, run)
+            if not os.path.isdir(run_path):
+                continue
+            _, stage_info = parse_run(run_path, monitor=False)
+            if stage_info and stage_info.get(metric) is not None:
+                results.setdefault(round(ss, 3), []).append(stage_info[metric])
+    return results
+
+
+class Scheduler:
+    """successive halving + 中点细化 + 置信区间早停的调度状态"""
+
+    def __init__(self, values, results=None, min_runs=2, max_runs=5, ci_tol=0.03,
+                 refine=2, direction='min'):
+        self.results = {round(ss, 3): list(v) for ss, v in (results or {}).items()}
+        self.active = sorted({round(ss, 3) for ss in values})
+        for ss in self.active:
+            self.results.setdefault(ss, [])
+        self.min_runs = min_runs
+        self.max_runs = max_runs
+        self.ci_tol = ci_tol
+        self.refine_left = refine
+        self.direction = direction
+        self.rung = 0
+
+    def settled(self, ss):
+        """置信区间已足够窄，或已达到最大次数"""
+        values = self.results[ss]
+        if len(values) >= self.max_runs:
+            return True
+        mean, half = confidence_interval(values)
+        return len(values) >= self.min_runs and half <= self.ci_tol * abs(mean)
+
+    def ranked(self, candidates):
+        """按均值从好到差排序（还没有结果的排在最后）"""
+        def key(ss):
+            mean, _ = confidence_interval(self.results[ss])
+            if mean is None:
+                return math.inf
+            return mean if self.direction == 'min' else -mean
+        return sorted(candidates, key=key)
+
+    def _refine(self):
+        """在最优值与相邻已试值之间加入中点候选，返回是否加入了新候选"""
+        best = self.ranked(self.active)[0]
+        tried = sorted(ss for ss, v in self.results.items() if v)
+        i = tried.index(best)
+        added = []
+        for neighbour in (tried[i - 1] if i > 0 else None,
+                          tried[i + 1] if i + 1 < len(tried) else None):
+            if neighbour is None or abs(neighbour - best) < 2 * MIN_STEP:
+                continue
+            mid = round((best + neighbour) / 2, 3)
+            if not self.results.get(mid):
+                self.results.setdefault(mid, [])
+                added.append(mid)
+        self.active = sorted(set(self.active) | set(added))
+        return bool(added)
+
+    def next_slowstart(self):
+        """下一次要运行的 slowstart；调度结束时返回 None"""
+        while True:
+            target = self.min_runs + self.rung
+            # 本轮还没跑够、也没有收敛的候选：先补跑次数最少的
+            pending = [ss for ss in self.active
+                       if len(self.results[ss]) < target and not self.settled(ss)]
+            if pending:
+                return min(pending, key=lambda ss: (len(self.results[ss]), ss))
+
+            if len(self.active) > 2:
+                keep = math.ceil(len(self.active) / 2)
+                dropped = self.ranked(self.active)[keep:]
+                self.active = sorted(self.ranked(self.active)[:keep])
+                print(f"[SCHED] 第 {self.rung + 1} 轮结束，淘汰 {[format_slowstart(s) for s in dropped]}")
+            elif self.refine_left > 0:
+                self.refine_left -= 1
+                if self._refine():
+                    print(f"[SCHED] 细化候选: {[format_slowstart(s) for s in self.active]}")
+                    continue
+
+            if (len(self.active) <= 2 and self.refine_left == 0
+                    and all(self.settled(ss) for ss in self.active)):
+                return None
+            self.rung += 1
+
+    def best(self):
+        tried = [ss for ss, v in self.results.items() if v]
+        return self.ranked(tried)[0] if tried else None
+
+
+def new_run_dir(log_dir, name, ss):
+    """<log_dir>/<name>_slowstart_<ss>/<时间戳>，同一秒内的重复运行等到下一秒"""
+    ss_dir = os.path.join(log_dir, f'{name}_slowstart_{format_slowstart(ss)}')
+    while True:
+        run_dir = os.path.join(ss_dir, datetime.datetime.now().strftime('%Y%m%d_%H%M%S'))
+        if not os.path.exists(run_dir):
+            os.makedirs(run_dir)
+            return run_dir
+        time.sleep(0.2)
+
+
+def run_once(submit, input_path, output_path, ss, log_dir, name, metric):
+    """执行一次运行，返回 (运行目录, 指标值或 None)"""
+    from common_utils import parse_run
+
+    run_dir = new_run_dir(log_dir, name, ss)
+    command = submit.format(wheel=shlex.quote(WHEEL_DIR), input=shlex.quote(input_path),
+                            output=shlex.quote(output_path), slowstart=format_slowstart(ss))
+    print(f"[INFO] slowstart={format_slowstart(ss)} 日志目录: {run_dir}")
+
+    env = dict(os.environ, RUN_LOG_DIR=run_dir)
+    result = subprocess.run(shlex.split(command), env=env, cwd=WHEEL_DIR)
+    if result.returncode != 0:
+        print(f"[WARN] 运行命令退出码 {result.returncode}")
+
+    _, stage_info = parse_run(run_dir, monitor=False)
+    value = stage_info.get(metric) if stage_info else None
+    if value is None:
+        print(f"[WARN] 无法从 {run_dir} 解析 {metric}")
+    return run_dir, value
+
+
+def print_summary(scheduler, metric):
+    print("============================================")
+    print(f" {metric} 汇总（均值 ± 95% 置信区间半宽）")
+    print("============================================")
+    for ss in sorted(scheduler.results):
+        values = scheduler.results[ss]
+        if not values:
+            continue
+        mean, half = confidence_interval(values)
+        half_text = f'{half:.2f}' if math.isfinite(half) else '-'
+        flag = '  <- 最优' if ss == scheduler.best() else ''
+        print(f"  SlowStart {format_slowstart(ss):>5}: {mean:8.2f} ± {half_text:>6}  ({len(values)} 次){flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="slowstart 自适应实验调度")
+    parser.add_argument('input', help="HDFS 输入路径")
+    parser.add_argument('output', help="HDFS 输出路径（basename 作为日志目录前缀，如 _100mb）")
+    parser.add_argument('--values', type=float, nargs='+', default=DEFAULT_VALUES,
+                        help="初始候选 slowstart")
+    parser.add_argument('--log-dir', default=DEFAULT_LOG_DIR, help="MapReduceLog 目录")
+    parser.add_argument('--analyze-dir', default=os.path.join(WHEEL_DIR, '..', 'analyze'),
+                        help="analyze 脚本目录（用于解析运行结果）")
+    parser.add_argument('--metric', default='总耗时(s)', help="优化的指标（stage 字典中的键）")
+    parser.add_argument('--maximize', action='store_true', help="指标越大越好（默认越小越好）")
+    parser.add_argument('--min-runs', type=int, default=2, help="每个候选至少运行的次数")
+    parser.add_argument('--max-runs', type=int, default=5, help="每个候选最多运行的次数")
+    parser.add_argument('--ci-tol', type=float, default=0.03,
+                        help="置信区间半宽不超过均值的该比例时停止重复")
+    parser.add_argument('--refine', type=int, default=2, help="中点细化的次数")
+    parser.add_argument('--budget', type=int, default=30, help="本次最多运行的作业数")
+    parser.add_argument('--pause', type=float, default=2, help="两次运行之间的等待（秒）")
+    parser.add_argument('--submit', default=DEFAULT_SUBMIT,
+                        help="单次运行的命令模板，可用 {wheel} {input} {output} {slowstart}；"
+                             "日志目录通过环境变量 RUN_LOG_DIR 传入")
+    parser.add_argument('--no-resume', action='store_true', help="不读取目录中已有的运行")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.abspath(args.analyze_dir))
+
+    name = os.path.basename(args.output.rstrip('/'))
+    existing = {} if args.no_resume else load_existing(args.log_dir, name, args.metric)
+    if existing:
+        print(f"[INFO] 读取已有运行: " +
+              ', '.join(f'{format_slowstart(ss)}×{len(v)}' for ss, v in sorted(existing.items())))
+
+    scheduler = Scheduler(args.values, existing, args.min_runs, args.max_runs, args.ci_tol,
+                          args.refine, 'max' if args.maximize else 'min')
+
+    runs = 0
+    while runs < args.budget:
+        ss = scheduler.next_slowstart()
+        if ss is None:
+            break
+        if runs:
+            time.sleep(args.pause)
+
+        print("============================================")
+        print(f" Running slowstart = {format_slowstart(ss)} (第 {runs + 1} 次作业)")
+        print("============================================")
+        _, value = run_once(args.submit, args.input, args.output, ss,
+                            args.log_dir, name, args.metric)
+        runs += 1
+        if value is None:
+            # 解析失败的运行不计入结果，但计入预算，避免无限重试
+            continue
+        scheduler.results[ss].append(value)
+        mean, half = confidence_interval(scheduler.results[ss])
+        print(f"[INFO] slowstart {format_slowstart(ss)}: {args.metric}={value:.2f}，"
+              f"当前均值 {mean:.2f} ± {half:.2f}")
+    else:
+        print(f"[WARN] 已用完预算 {args.budget} 次运行")
+
+    print_summary(scheduler, args.metric)
+    print(f" 共运行 {runs} 次作业，日志保存在: {args.log_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,7 +17,7 @@ fi
 # 使用外部传入的 RUN_LOG_DIR
 ###############################
 if [ -z "$RUN_LOG_DIR" ]; then
-    echo "[ERROR] RUN_LOG_DIR is not set! This script must be called from run_batch.sh"
+    echo "[ERROR] RUN_LOG_DIR is not set! This script must be called from run_batch.sh or run_experiments.py"
     exit 1
 fi
 
@@ -25,12 +25,23 @@ mkdir -p "$RUN_LOG_DIR"
 echo "[INFO] Log directory for this run: $RUN_LOG_DIR"
 
 MONITOR_LOG="$RUN_LOG_DIR/monitor.log"
+# 可用 HADOOP_CMD / HDFS_CMD 替换提交命令（例如用假的 hadoop 测试 run_experiments.py）
+HADOOP_CMD=${HADOOP_CMD:-hadoop}
+HDFS_CMD=${HDFS_CMD:-hdfs}
 JOB_LOG="$RUN_LOG_DIR/job_output.log"
 
 ###############################
 # 启动监控
 ###############################
-bash "$HOME/code/wheel/monitor_real.sh" "$MONITOR_LOG" &
+# 默认使用并发采集器 monitor_real.py；MONITOR_IMPL=sh 时回退到逐节点串行的 monitor_real.sh
+# MONITOR_FORMAT=binary 时写出定长二进制的 monitor.bin（可用 analyze/monitor_binary.py 转回文本）
+if [ "$MONITOR_IMPL" = "sh" ]; then
+    bash "$HOME/code/wheel/monitor_real.sh" "$MONITOR_LOG" &
+elif [ "$MONITOR_FORMAT" = "binary" ]; then
+    python3 "$HOME/code/wheel/monitor_real.py" "$RUN_LOG_DIR/monitor.bin" --format binary &
+else
+    python3 "$HOME/code/wheel/monitor_real.py" "$MONITOR_LOG" &
+fi
 MONITOR_PID=$!
 echo "[INFO] Performance monitor started, PID=$MONITOR_PID"
 sleep 1
@@ -48,11 +59,13 @@ sleep 1
 } > "$JOB_LOG"
 
 # 删除旧 HDFS 输出（避免冲突）
-hdfs dfs -rm -r -f "$OUTPUT" >/dev/null 2>&1
+$HDFS_CMD dfs -rm -r -f "$OUTPUT" >/dev/null 2>&1
 
-hadoop jar /usr/local/hadoop/share/hadoop/mapreduce/hadoop-mapreduce-examples-3.3.4.jar \
+# 作业历史默认写成 Avro 二进制，analyze/jhist_parser.py 只读 Avro-Json，提交时指定 json 格式
+$HADOOP_CMD jar /usr/local/hadoop/share/hadoop/mapreduce/hadoop-mapreduce-examples-3.3.4.jar \
     wordcount \
     -D mapreduce.job.reduce.slowstart.completedmaps=$SLOWSTART \
+    -D mapreduce.jobhistory.jhist.format=json \
     -D mapreduce.input.fileinputformat.input.dir.recursive=true \
     "$INPUT" "$OUTPUT" 2>&1 | tee -a "$JOB_LOG"
 
@@ -65,6 +78,22 @@ kill $MONITOR_PID >/dev/null 2>&1
 wait $MONITOR_PID 2>/dev/null
 
 echo "[INFO] Monitor stopped." | tee -a "$JOB_LOG"
+
+###############################
+# 拷贝作业历史文件 (.jhist)
+###############################
+# JobHistory 先写入 intermediate-done-dir，稍后才移动到 done-dir，两处都尝试几次
+JOB_ID=$(grep -oE 'job_[0-9]+_[0-9]+' "$JOB_LOG" | head -n 1)
+if [ -n "$JOB_ID" ]; then
+    for attempt in 1 2 3 4 5; do
+        if $HDFS_CMD dfs -get "/mr-history/tmp/*/${JOB_ID}*.jhist" "$RUN_LOG_DIR/" >/dev/null 2>&1 || \
+           $HDFS_CMD dfs -get "/mr-history/done/*/*/*/*/${JOB_ID}*.jhist" "$RUN_LOG_DIR/" >/dev/null 2>&1; then
+            echo "[INFO] Job history copied for $JOB_ID"
+            break
+        fi
+        sleep 2
+    done
+fi
 echo "[INFO] Logs saved to: $RUN_LOG_DIR"
 
 exit 0